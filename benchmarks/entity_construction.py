@@ -0,0 +1,77 @@
+"""Compare validated and trusted construction of Job entities.
+
+Usage: python -m benchmarks.entity_construction [rows] [repeat]
+
+Records are built the way JobSQLGateway returns them: the mapper has already
+converted enums, asyncpg has converted uuids and datetimes.
+"""
+
+import sys
+import timeit
+import uuid
+from datetime import datetime, timezone
+
+from src.application.domain.entity.job import (
+    EmploymentType,
+    Job,
+    JobStatus,
+    WorkSettingType,
+)
+from src.application.domain.enums.country import Country
+from src.application.infrastructure.repository.job import JobRepository
+from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
+
+
+def records(n: int) -> list[dict]:
+    countries = list(Country)
+    now = datetime.now(timezone.utc)
+    user_id = uuid.uuid4()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "title": f"Engineer {i}",
+            "company": f"Company {i % 100}",
+            "description": "Lorem ipsum dolor sit amet " * 20,
+            "country": countries[i % len(countries)],
+            "city": "City",
+            "work_setting_type": WorkSettingType.HYBRID,
+            "status": JobStatus.APPLIED,
+            "employment_type": EmploymentType.FULLTIME,
+            "notes": None,
+            "external_id": str(i),
+            "platform": "linkedin",
+            "url": f"https://example.com/{i}",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+class ValidatingJobRepository(JobRepository):
+    trusted = False
+
+
+def main(rows: int = 10_000, repeat: int = 5) -> None:
+    data = records(rows)
+    results = {}
+    for name, repository_class in (
+        ("validated", ValidatingJobRepository),
+        ("trusted", JobRepository),
+    ):
+        repository = repository_class(InMemoryGateway([]))
+        assert repository._build(data[0]) == Job(**data[0])
+        results[name] = min(
+            timeit.repeat(
+                lambda: repository._build_all(data),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        print(f"{name:>10}: {results[name] * 1000:8.1f} ms per {rows} rows")
+    print(f"   speedup: {results['validated'] / results['trusted']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -1,10 +1,14 @@
 #! /usr/bin/env python
 import asyncio
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 from functools import wraps
 from pathlib import Path
 from typing import Any, Dict, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import typer
 
@@ -32,6 +36,16 @@ from src.application.manage.resume_main_info import ManageResumeMainInfo
 from src.application.manage.resume_template import ManageResumeTemplate
 from src.application.manage.user import ManageUser
 from src.application.use_case.job.add_job import add_job as add_job_use_case
+from src.application.use_case.job.export_jobs import (
+    ExportFormat,
+    export_jobs as export_jobs_use_case,
+)
+from src.application.use_case.job.import_jobs import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_WORKERS,
+    ImportFailure,
+    import_jobs as import_jobs_use_case,
+)
 from src.application.use_case.resume_main_info.add_resume_main_info import (
     add_resume_main_info as add_resume_main_info_use_case,
 )
@@ -46,9 +60,14 @@ from src.application.use_case.resume_template.update_resume_template import (
 )
 
 # Core Imports
+from src.core.domain.context import ctx
+from src.core.gateway.cached.cached_gateway import CachedGateway
 from src.core.gateway.sql.asyncpg_sql_database import AsyncpgSQLDatabase
+from src.core.gateway.sql.instrumentation import Instrumentation, SlowQueryLog
+from src.core.repository.base.filter import ComparisonFilter, ComparisonOperator, Filter
 from src.core.repository.base.pagination import PageOptions
 from src.core.responses.response import ResponseTypes
+from src.core.tracing import tracer
 
 # from src.application.use_case.delete_job import delete_job as delete_job_use_case
 # from src.application.use_case.list_jobs import list_jobs as list_jobs_use_case
@@ -56,12 +75,17 @@ from src.core.responses.response import ResponseTypes
 
 app = typer.Typer(help="Job Tracker CLI Tool")
 
-db = AsyncpgSQLDatabase(get_database_url("production"))
+db = AsyncpgSQLDatabase(
+    get_database_url("production"),
+    instrumentation=Instrumentation(
+        [SlowQueryLog(float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500")) / 1000)]
+    ),
+)
 
 job_gateway = JobSQLGateway(db)
-manage_job = ManageJob(JobRepository(job_gateway))
+manage_job = ManageJob(JobRepository(CachedGateway(job_gateway)))
 user_gateway = UserSQLGateway(db)
-manage_user = ManageUser(UserRepository(user_gateway))
+manage_user = ManageUser(UserRepository(CachedGateway(user_gateway)))
 resume_main_info_gateway = ResumeMainInfoSQLGateway(db)
 manage_resume_main_info = ManageResumeMainInfo(
     ResumeMainInfoRepository(resume_main_info_gateway)
@@ -72,10 +96,23 @@ manage_resume_template = ManageResumeTemplate(
 )
 
 
+# Set TRACE_FILE to append a timing breakdown of every command (JSON lines)
+TRACE_FILE = os.getenv("TRACE_FILE")
+tracer.enabled = TRACE_FILE is not None
+
+
 def typer_async(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        return asyncio.run(f(*args, **kwargs))
+        async def run():
+            ctx.correlation_id = uuid4()
+            return await f(*args, **kwargs)
+
+        try:
+            return asyncio.run(run())
+        finally:
+            if TRACE_FILE is not None:
+                tracer.export(TRACE_FILE)
 
     return wrapper
 
@@ -170,6 +207,84 @@ async def add_job(
         typer.echo(f"Job creation failed: {response.value}")
 
 
+@app.command()
+@typer_async
+async def import_jobs(
+    paths: list[Path] = typer.Argument(
+        ..., help="YAML or NDJSON files, or directories containing them."
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE, help="Number of jobs per insert statement."
+    ),
+    workers: int = typer.Option(
+        DEFAULT_WORKERS, help="Number of parsing processes (default: number of CPUs)."
+    ),
+    default_country: Optional[str] = typer.Option(
+        None, help="Country (ISO code) of the jobs without one, e.g. remote jobs."
+    ),
+    fast: bool = typer.Option(
+        False, help="Insert with COPY, e.g. an export into an empty database."
+    ),
+):
+    """Import jobs saved by the Chrome extension (or exported with export-jobs);
+    re-importing updates them, unless --fast."""
+
+    def on_failure(failure: ImportFailure):
+        for error in failure.errors:
+            typer.echo(
+                f"{failure.source}: {error['parameter']}: {error['message']}",
+                err=True,
+            )
+
+    with ProcessPoolExecutor(workers) as executor:
+        result = await import_jobs_use_case(
+            paths,
+            manage_job,
+            on_failure,
+            batch_size=batch_size,
+            executor=executor,
+            workers=workers,
+            default_country=(
+                None if default_country is None else Country(default_country)
+            ),
+            fast=fast,
+        )
+    typer.echo(
+        f"Imported {result.imported} jobs ({result.failed} failed) "
+        f"in {result.seconds:.1f}s ({result.rate:.0f} jobs/s)."
+    )
+
+
+@app.command()
+@typer_async
+async def export_jobs(
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="File to write (default: stdout)."
+    ),
+    format: ExportFormat = typer.Option(
+        ExportFormat.NDJSON.value, "--format", "-f", help="File format."
+    ),
+):
+    """Export all jobs; import-jobs reads back NDJSON."""
+    try:
+        if output is None:
+            result = await export_jobs_use_case(
+                manage_job, sys.stdout.buffer, format=format
+            )
+        else:
+            with open(output, "wb") as fp:
+                result = await export_jobs_use_case(manage_job, fp, format=format)
+    except RuntimeError as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(code=1)
+    # on stderr, so that it doesn't end up in the export
+    typer.echo(
+        f"Exported {result.exported} jobs in {result.seconds:.1f}s "
+        f"({result.rate:.0f} jobs/s).",
+        err=True,
+    )
+
+
 @app.command()
 @typer_async
 async def delete_job(
@@ -183,6 +298,70 @@ async def delete_job(
         typer.echo("Error:")
 
 
+def job_filters(
+    status: list[JobStatus] | None,
+    company: str | None,
+    older_than_days: int | None,
+) -> list[Filter]:
+    filters: list[Filter] = []
+    if status:
+        filters.append(Filter(field="status", values=status))
+    if company is not None:
+        filters.append(Filter(field="company", values=[company]))
+    if older_than_days is not None:
+        before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        filters.append(
+            ComparisonFilter(
+                field="updated_at", operator=ComparisonOperator.LT, values=[before]
+            )
+        )
+    return filters
+
+
+@app.command()
+@typer_async
+async def update_jobs(
+    set_status: JobStatus = typer.Option(..., help="New status of the jobs."),
+    status: list[JobStatus] = typer.Option(
+        None, "--status", "-s", help="Only jobs with this status."
+    ),
+    company: str = typer.Option(None, "--company", "-c", help="Only this company."),
+    older_than_days: int = typer.Option(
+        None, help="Only jobs not updated in this many days."
+    ),
+    update_all: bool = typer.Option(False, "--all", help="Update all jobs."),
+):
+    """Update all matching jobs at once, e.g. archive old rejected jobs:
+    update-jobs --set-status archived --status rejected --older-than-days 90"""
+    filters = job_filters(status, company, older_than_days)
+    if not filters and not update_all:
+        typer.echo("Error: give a filter, or --all to update all jobs.", err=True)
+        raise typer.Exit(code=1)
+    ids = await manage_job.update_where(filters, {"status": set_status}, all=update_all)
+    typer.echo(f"Updated {len(ids)} jobs.")
+
+
+@app.command()
+@typer_async
+async def delete_jobs(
+    status: list[JobStatus] = typer.Option(
+        None, "--status", "-s", help="Only jobs with this status."
+    ),
+    company: str = typer.Option(None, "--company", "-c", help="Only this company."),
+    older_than_days: int = typer.Option(
+        None, help="Only jobs not updated in this many days."
+    ),
+    delete_all: bool = typer.Option(False, "--all", help="Delete all jobs."),
+):
+    """Delete all matching jobs at once."""
+    filters = job_filters(status, company, older_than_days)
+    if not filters and not delete_all:
+        typer.echo("Error: give a filter, or --all to delete all jobs.", err=True)
+        raise typer.Exit(code=1)
+    ids = await manage_job.destroy_where(filters, all=delete_all)
+    typer.echo(f"Deleted {len(ids)} jobs.")
+
+
 @app.command()
 @typer_async
 async def delete_user(
@@ -227,21 +406,23 @@ async def list_jobs(
     #     "date_applied__gt": date_applied_gt,
     #     "date_applied__lt": date_applied_lt,
     # }
-    offset = 0
+    cursor = None
     total_retrieved = 0
 
     while True:
-        # Prepare pagination options
+        # Prepare pagination options; keyset pagination keeps deep pages cheap
         params = PageOptions(
             limit=2,
-            offset=offset,
             order_by="created_at",
             ascending=True,
-            # cursor=datetime
+            cursor=cursor,
         )
 
-        # Fetch a page of jobs
-        response = await manage_job.list(params=params)
+        # Fetch a page of jobs, skipping the (large) columns we don't print and
+        # the count (the cursor tells whether there is a next page)
+        response = await manage_job.values(
+            [], ["title", "company", "status"], params=params, total=False
+        )
 
         # Check for success
         if not response.items:
@@ -249,16 +430,18 @@ async def list_jobs(
 
         # Display retrieved jobs
         for job in response.items:
-            typer.echo(f"{job.id}: {job.title} at {job.company} ({job.status})")
+            typer.echo(
+                f"{job['id']}: {job['title']} at {job['company']} ({job['status']})"
+            )
 
         # Update pagination details
         total_retrieved += len(response.items)
-        offset += len(response.items)
+        cursor = response.next_cursor
 
-        typer.echo(f"Retrieved {total_retrieved}/{response.total} jobs.")
+        typer.echo(f"Retrieved {total_retrieved} jobs.")
 
         # Break if all jobs are retrieved
-        if total_retrieved >= response.total:
+        if cursor is None:
             break
 
 
@@ -286,7 +469,7 @@ async def update_job(
     }
     data = {k: v for k, v in data.items() if v is not None}
 
-    response = await manage_job.update(UUID(job_id), data)
+    response = await manage_job.patch(UUID(job_id), data)
     if response:
         (f"Job '{job_id}' updated successfully.")
     else:
@@ -11,6 +11,21 @@ import psycopg2
 import typer
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
+from src.application.infrastructure.sql.models.metadata import metadata
+from src.application.requests.job.list_jobs import (
+    ACCEPTED_FILTERS,
+    SEARCH_FIELD,
+    SEARCH_FILTER,
+)
+from src.core.gateway.sql.asyncpg_sql_database import compile
+from src.core.gateway.sql.index_advisor import (
+    DISABLE_SEQSCAN,
+    FilterShape,
+    explain,
+    full_scans,
+    read_shapes,
+)
+
 app = typer.Typer(help="Management CLI for Job Tracker")
 
 
@@ -112,6 +127,20 @@ def run_sql(statements: list):
     conn.close()
 
 
+def list_jobs_filter_shapes() -> list[FilterShape]:
+    """The filters of list_jobs, on their own and within the jobs of a user"""
+    shapes = []
+    for key in ACCEPTED_FILTERS:
+        if key == SEARCH_FILTER:
+            filter = (SEARCH_FIELD, "search")
+        else:
+            field, _, operator = key.partition("__")
+            filter = (field, operator or "eq")
+        shapes.append(FilterShape("jobs", (filter,)))
+        shapes.append(FilterShape("jobs", (("user_id", "eq"), filter)))
+    return shapes
+
+
 def wait_for_logs(cmdline: list, message: str):
     """Wait for a specific message in Docker logs."""
     logs = subprocess.check_output(cmdline)
@@ -155,6 +184,51 @@ def init_postgres():
         )
 
 
+@app.command()
+def index_advisor(
+    trace_file: Optional[str] = typer.Option(
+        None,
+        help="Check the filter shapes in this trace (see TRACE_FILE) "
+        "instead of the filters of list_jobs.",
+    ),
+    limit: int = typer.Option(100, help="Number of most recent shapes to check."),
+):
+    """
+    Report the filter shapes whose queries can't use an index (PostgreSQL 16+).
+    """
+    configure_app(os.getenv("APPLICATION_CONFIG"))
+    shapes = read_shapes(trace_file, limit) if trace_file else list_jobs_filter_shapes()
+
+    conn = psycopg2.connect(
+        dbname=os.getenv("APPLICATION_DB"),
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+        host=os.getenv("POSTGRES_HOSTNAME"),
+        port=os.getenv("POSTGRES_PORT"),
+    )
+    unindexed = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute(DISABLE_SEQSCAN)
+        for shape in shapes:
+            table = metadata.tables.get(shape.table)
+            if table is None:
+                typer.echo(f"unknown    {shape}")
+                continue
+            cursor.execute(explain(compile(shape.query(table))[0]))
+            (plan,) = cursor.fetchone()
+            scans = full_scans(plan)
+            unindexed += bool(scans)
+            typer.echo(f"{'FULL SCAN' if scans else 'ok':10} {shape}")
+        cursor.close()
+    finally:
+        conn.close()
+
+    typer.echo(f"{unindexed} of {len(shapes)} filter shapes can't use an index.")
+    if unindexed:
+        raise typer.Exit(code=1)
+
+
 @app.command()
 def test(args: list[str] = typer.Argument(..., help="Arguments to pass to pytest")):
     """
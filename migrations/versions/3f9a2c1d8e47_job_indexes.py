@@ -0,0 +1,81 @@
+"""Job indexes
+
+Revision ID: 3f9a2c1d8e47
+Revises: 7c07850af9e8
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a2c1d8e47"
+down_revision: Union[str, None] = "7c07850af9e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_STATUSES = sa.text("status IN ('ADDED', 'APPLIED', 'INTERVIEWING', 'OFFERED')")
+
+
+def upgrade() -> None:
+    # CONCURRENTLY does not lock the tables for writes, but can't run in a
+    # transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_jobs_user_id_created_at",
+            "jobs",
+            ["user_id", "created_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_jobs_user_id_status",
+            "jobs",
+            ["user_id", "status"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_jobs_user_id_updated_at_active",
+            "jobs",
+            ["user_id", "updated_at"],
+            postgresql_where=ACTIVE_STATUSES,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_jobs_created_at_active",
+            "jobs",
+            ["created_at"],
+            postgresql_where=ACTIVE_STATUSES,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_jobs_company", "jobs", ["company"], postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_jobs_country_city",
+            "jobs",
+            ["country", "city"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_resume_main_info_user_id",
+            "resume_main_info",
+            ["user_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, name in [
+            ("resume_main_info", "ix_resume_main_info_user_id"),
+            ("jobs", "ix_jobs_country_city"),
+            ("jobs", "ix_jobs_company"),
+            ("jobs", "ix_jobs_created_at_active"),
+            ("jobs", "ix_jobs_user_id_updated_at_active"),
+            ("jobs", "ix_jobs_user_id_status"),
+            ("jobs", "ix_jobs_user_id_created_at"),
+        ]:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
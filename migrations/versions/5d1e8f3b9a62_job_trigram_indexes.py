@@ -0,0 +1,42 @@
+"""Job trigram indexes
+
+Revision ID: 5d1e8f3b9a62
+Revises: 9b4e7d2a6c15
+Create Date: 2026-10-18 12:14:41.518203
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d1e8f3b9a62"
+down_revision: Union[str, None] = "9b4e7d2a6c15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_jobs_company_trgm": "company",
+    "ix_jobs_title_trgm": "title",
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES.items():
+            op.create_index(
+                name,
+                "jobs",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name="jobs", postgresql_concurrently=True)
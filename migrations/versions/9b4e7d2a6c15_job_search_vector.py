@@ -0,0 +1,54 @@
+"""Job search vector
+
+Revision ID: 9b4e7d2a6c15
+Revises: 3f9a2c1d8e47
+Create Date: 2026-10-18 11:02:17.904131
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "9b4e7d2a6c15"
+down_revision: Union[str, None] = "3f9a2c1d8e47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "jobs",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', title), 'A') || "
+                "setweight(to_tsvector('english', company), 'A') || "
+                "setweight(to_tsvector('english', description), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_jobs_search_vector",
+            "jobs",
+            ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_jobs_search_vector",
+            table_name="jobs",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("jobs", "search_vector")
@@ -0,0 +1,50 @@
+"""Job natural keys
+
+Revision ID: c83a6e0f4d19
+Revises: 5d1e8f3b9a62
+Create Date: 2026-10-18 13:40:09.263114
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c83a6e0f4d19"
+down_revision: Union[str, None] = "5d1e8f3b9a62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the placeholder of the Chrome extension for a posting without url; it would
+    # make every such posting of a user a duplicate
+    op.execute("UPDATE jobs SET url = NULL WHERE url = 'N/A'")
+    # fails on existing duplicates, which have to be resolved first
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_jobs_user_id_platform_external_id",
+            "jobs",
+            ["user_id", "platform", "external_id"],
+            unique=True,
+            postgresql_where=sa.text(
+                "platform IS NOT NULL AND external_id IS NOT NULL"
+            ),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "uq_jobs_user_id_url",
+            "jobs",
+            ["user_id", "url"],
+            unique=True,
+            postgresql_where=sa.text("url IS NOT NULL"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in ("uq_jobs_user_id_url", "uq_jobs_user_id_platform_external_id"):
+            op.drop_index(name, table_name="jobs", postgresql_concurrently=True)
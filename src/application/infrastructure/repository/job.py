@@ -3,4 +3,5 @@ from src.core.repository.base.repository import Repository
 
 
 class JobRepository(Repository[Job]):
-    pass
+    # Rows come typed from asyncpg (and JobMapper for enums)
+    trusted = True
@@ -3,4 +3,4 @@ from src.core.repository.base.repository import Repository
 
 
 class UserRepository(Repository[User]):
-    pass
+    trusted = True
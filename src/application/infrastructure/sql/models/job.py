@@ -1,14 +1,32 @@
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, MetaData, String, Table, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    MetaData,
+    String,
+    Table,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 
 from src.application.domain.entity.job import EmploymentType, JobStatus, WorkSettingType
 from src.application.domain.enums.country import Country
 
 job_metadata = MetaData()
 
+# Searched by TextSearchFilter; matches in the title or company rank higher
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', company), 'A') || "
+    "setweight(to_tsvector('english', description), 'B')"
+)
+
 job_table = Table(
     "jobs",
     job_metadata,
@@ -30,4 +48,68 @@ job_table = Table(
         "created_at", DateTime(timezone=True), nullable=False, default=datetime.utcnow
     ),
     Column("updated_at", DateTime(timezone=True), nullable=True),
+    Column(
+        "search_vector",
+        TSVECTOR,
+        Computed(SEARCH_VECTOR, persisted=True),
+        info={"filter_only": True},
+    ),
+)
+
+# Jobs that still need attention; most views only list these
+ACTIVE_JOB_STATUSES = (
+    JobStatus.ADDED,
+    JobStatus.APPLIED,
+    JobStatus.INTERVIEWING,
+    JobStatus.OFFERED,
+)
+
+# Indexes for the per-user views and the filters of list_jobs (ACCEPTED_FILTERS)
+Index("ix_jobs_user_id_created_at", job_table.c.user_id, job_table.c.created_at)
+Index("ix_jobs_user_id_status", job_table.c.user_id, job_table.c.status)
+Index(
+    "ix_jobs_user_id_updated_at_active",
+    job_table.c.user_id,
+    job_table.c.updated_at,
+    postgresql_where=job_table.c.status.in_(ACTIVE_JOB_STATUSES),
+)
+Index(
+    "ix_jobs_created_at_active",
+    job_table.c.created_at,
+    postgresql_where=job_table.c.status.in_(ACTIVE_JOB_STATUSES),
+)
+Index("ix_jobs_company", job_table.c.company)
+Index("ix_jobs_country_city", job_table.c.country, job_table.c.city)
+Index("ix_jobs_search_vector", job_table.c.search_vector, postgresql_using="gin")
+# Natural keys of captured postings, to ingest them idempotently (see
+# Manage.ingest); partial, so that jobs without them are never duplicates
+Index(
+    "uq_jobs_user_id_platform_external_id",
+    job_table.c.user_id,
+    job_table.c.platform,
+    job_table.c.external_id,
+    unique=True,
+    postgresql_where=job_table.c.platform.is_not(None)
+    & job_table.c.external_id.is_not(None),
+)
+Index(
+    "uq_jobs_user_id_url",
+    job_table.c.user_id,
+    job_table.c.url,
+    unique=True,
+    postgresql_where=job_table.c.url.is_not(None),
+)
+# Trigram indexes for the case-insensitive prefix and substring filters (and
+# autocomplete); these need the pg_trgm extension
+Index(
+    "ix_jobs_company_trgm",
+    job_table.c.company,
+    postgresql_using="gin",
+    postgresql_ops={"company": "gin_trgm_ops"},
+)
+Index(
+    "ix_jobs_title_trgm",
+    job_table.c.title,
+    postgresql_using="gin",
+    postgresql_ops={"title": "gin_trgm_ops"},
 )
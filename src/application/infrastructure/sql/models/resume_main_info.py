@@ -1,7 +1,16 @@
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import ARRAY, Column, DateTime, ForeignKey, MetaData, String, Table
+from sqlalchemy import (
+    ARRAY,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    MetaData,
+    String,
+    Table,
+)
 from sqlalchemy.dialects.postgresql import UUID
 
 resume_main_info_metadata = MetaData()
@@ -26,3 +35,5 @@ resume_main_info_table = Table(
     ),
     Column("updated_at", DateTime(timezone=True), nullable=True),
 )
+
+Index("ix_resume_main_info_user_id", resume_main_info_table.c.user_id)
@@ -1,65 +1,92 @@
+from collections.abc import Iterable, Mapping
 from typing import Any, Dict
 
 from src.application.domain.entity.job import EmploymentType, JobStatus, WorkSettingType
 from src.application.domain.enums.country import Country
 from src.core.repository.base.mapper import Mapper
 
+FIELDS = (
+    "id",
+    "user_id",
+    "title",
+    "company",
+    "description",
+    "country",
+    "city",
+    "work_setting_type",
+    "status",
+    "employment_type",
+    "notes",
+    "external_id",
+    "platform",
+    "url",
+    "created_at",
+    "updated_at",
+)
+ENUM_FIELDS = ("country", "work_setting_type", "status", "employment_type")
+
+# Enum members by name, looked up once instead of through Enum.__getitem__ per row
+COUNTRIES = dict(Country.__members__)
+WORK_SETTING_TYPES = dict(WorkSettingType.__members__)
+JOB_STATUSES = dict(JobStatus.__members__)
+EMPLOYMENT_TYPES = dict(EmploymentType.__members__)
+
 
 class JobMapper(Mapper):
     async def to_internal(self, external: Dict[str, Any]) -> Dict[str, Any]:
-        return {
-            "id": external.get("id"),
-            "user_id": external.get("user_id"),
-            "title": external.get("title"),
-            "company": external.get("company"),
-            "description": external.get("description"),
-            "country": (
-                Country[external["country"]] if external.get("country") else None
-            ),
-            "city": external.get("city"),
-            "work_setting_type": (
-                WorkSettingType[external["work_setting_type"]]
-                if external.get("work_setting_type")
-                else None
-            ),
-            "status": JobStatus[external["status"]] if external.get("status") else None,
-            "employment_type": (
-                EmploymentType[external["employment_type"]]
-                if external.get("employment_type")
-                else None
-            ),
-            "notes": external.get("notes"),
-            "external_id": external.get("external_id"),
-            "platform": external.get("platform"),
-            "url": external.get("url"),
-            "created_at": external.get("created_at"),
-            "updated_at": external.get("updated_at"),
-        }
+        return self.to_internal_many([external])[0]
 
     async def to_external(self, internal: Dict[str, Any]) -> Dict[str, Any]:
-        return {
-            "id": internal["id"],
-            "user_id": internal["user_id"],
-            "title": internal["title"],
-            "company": internal["company"],
-            "description": internal["description"],
-            "country": internal["country"].name,
-            "city": internal["city"],
-            "work_setting_type": (
-                internal["work_setting_type"].name
-                if internal.get("work_setting_type")
-                else None
-            ),
-            "status": internal["status"].name if internal.get("status") else None,
-            "employment_type": (
-                internal["employment_type"].name
-                if internal.get("employment_type")
-                else None
-            ),
-            "notes": internal.get("notes"),
-            "external_id": internal.get("external_id"),
-            "platform": internal.get("platform"),
-            "url": internal.get("url"),
-            "created_at": internal.get("created_at"),
-            "updated_at": internal.get("updated_at"),
-        }
+        return self.to_external_many([internal])[0]
+
+    def to_internal_many(
+        self, externals: Iterable[Mapping[str, Any]]
+    ) -> list[Dict[str, Any]]:
+        result = []
+        for external in externals:
+            get = external.get
+            country = get("country")
+            work_setting_type = get("work_setting_type")
+            status = get("status")
+            employment_type = get("employment_type")
+            result.append(
+                {
+                    "id": get("id"),
+                    "user_id": get("user_id"),
+                    "title": get("title"),
+                    "company": get("company"),
+                    "description": get("description"),
+                    "country": COUNTRIES[country] if country else None,
+                    "city": get("city"),
+                    "work_setting_type": (
+                        WORK_SETTING_TYPES[work_setting_type]
+                        if work_setting_type
+                        else None
+                    ),
+                    "status": JOB_STATUSES[status] if status else None,
+                    "employment_type": (
+                        EMPLOYMENT_TYPES[employment_type] if employment_type else None
+                    ),
+                    "notes": get("notes"),
+                    "external_id": get("external_id"),
+                    "platform": get("platform"),
+                    "url": get("url"),
+                    "created_at": get("created_at"),
+                    "updated_at": get("updated_at"),
+                }
+            )
+        return result
+
+    def to_external_many(
+        self, internals: Iterable[Mapping[str, Any]]
+    ) -> list[Dict[str, Any]]:
+        # Only the fields that are present are mapped, so that partial records
+        # (projections) work too
+        return [
+            {
+                key: (value.name if key in ENUM_FIELDS and value is not None else value)
+                for key, value in internal.items()
+                if key in FIELDS
+            }
+            for internal in internals
+        ]
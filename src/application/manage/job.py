@@ -3,4 +3,5 @@ from src.core.manage import Manage
 
 
 class ManageJob(Manage[Job]):
-    pass
+    # tracked by the user, not by (re-)capturing the posting
+    ingest_keep = ("status", "notes")
@@ -3,8 +3,13 @@ from datetime import datetime
 from typing import Any, Dict, Optional, Union
 
 from src.core.base_request import InvalidRequest, ValidRequest
-from src.core.repository.base.filter import ComparisonFilter, ComparisonOperator, Filter
-from src.core.repository.base.pagination import PageOptions
+from src.core.repository.base.filter import (
+    ComparisonFilter,
+    ComparisonOperator,
+    Filter,
+    TextSearchFilter,
+)
+from src.core.repository.base.pagination import PageOptions, decode_cursor
 
 DATE_FILTERS = [
     "created_at__eq",
@@ -22,7 +27,19 @@ TEXT_FILTERS = [
     "city",
 ]
 
-ACCEPTED_FILTERS = DATE_FILTERS + TEXT_FILTERS
+# Case-insensitive prefix and substring matches, e.g. for autocomplete
+PATTERN_FILTERS = [
+    "company__startswith",
+    "company__contains",
+    "title__startswith",
+    "title__contains",
+]
+
+# Full-text search in the title, company and description (web search syntax)
+SEARCH_FILTER = "q"
+SEARCH_FIELD = "search_vector"
+
+ACCEPTED_FILTERS = DATE_FILTERS + TEXT_FILTERS + PATTERN_FILTERS + [SEARCH_FILTER]
 
 
 class ListJobsValidRequest(ValidRequest):
@@ -73,6 +90,23 @@ def build_job_list_request(
                             values=[parsed_value],
                         )
                     )
+                elif key in PATTERN_FILTERS:
+                    if not isinstance(value, str) or not value:
+                        raise ValueError("Must be a non-empty string")
+                    field, operator = key.split("__")
+                    filter_objects.append(
+                        ComparisonFilter(
+                            field=field,
+                            operator=ComparisonOperator(operator),
+                            values=[value],
+                        )
+                    )
+                elif key == SEARCH_FILTER:
+                    if not isinstance(value, str) or not value.strip():
+                        raise ValueError("Must be a non-empty string")
+                    filter_objects.append(
+                        TextSearchFilter(field=SEARCH_FIELD, values=[value])
+                    )
                 else:
                     filter_objects.append(
                         Filter(
@@ -89,6 +123,14 @@ def build_job_list_request(
     if params:
         try:
             params_object = PageOptions(**params)
+            if params_object.cursor is not None:
+                decode_cursor(params_object.cursor, params_object.order_by)
+            if params_object.rank:
+                if not any(isinstance(x, TextSearchFilter) for x in filter_objects):
+                    raise ValueError(f"rank requires a '{SEARCH_FILTER}' filter")
+                if params_object.cursor is not None:
+                    raise ValueError("rank can't be combined with a cursor")
         except Exception as e:
-            invalid_req.add_error(key, str(e))
+            invalid_req.add_error("params", str(e))
+            return invalid_req
     return ListJobsValidRequest(filters=filter_objects, params=params_object)
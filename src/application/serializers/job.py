@@ -1,8 +1,19 @@
+from datetime import date
+from enum import Enum
 from json import JSONEncoder
 from typing import Any
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from src.application.domain.entity.job import Job
 
+# All fields, in the order of the entity
+JOB_FIELDS = tuple(Job.model_fields)
+
 
 class JobJsonEncoder(JSONEncoder):
     def default(self, o: Any) -> Any:
@@ -16,3 +27,37 @@ class JobJsonEncoder(JSONEncoder):
             }
         # Default fallback
         return super().default(o)
+
+
+def to_primitive(o: Any) -> Any:
+    """UUIDs, datetimes and enums as JSON (and CSV) values; others unchanged"""
+    if isinstance(o, Enum):
+        # values, like the Chrome extension writes them (e.g. "DE", "added")
+        return o.value
+    if isinstance(o, UUID):
+        return str(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    return o
+
+
+def _default(o: Any) -> Any:
+    result = to_primitive(o)
+    if result is o:
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+    return result
+
+
+# Compact like orjson, which is used if installed
+_encoder = JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_jobs_ndjson(jobs: list[Job]) -> bytes:
+    """Jobs as NDJSON (UTF-8) with all fields, which import-jobs reads back"""
+    if orjson is not None:
+        # serializes UUIDs, datetimes and enums (by value) natively
+        dumps = orjson.dumps
+        option = orjson.OPT_APPEND_NEWLINE
+        return b"".join([dumps(vars(x), option=option) for x in jobs])
+    encode = _encoder.encode
+    return "".join([encode(vars(x)) + "\n" for x in jobs]).encode()
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import os
+import textwrap
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+import yaml
+from pydantic import ValidationError
+
+from src.application.domain.entity.job import (
+    EmploymentType,
+    Job,
+    JobStatus,
+    WorkSettingType,
+)
+from src.application.domain.enums.country import Country
+from src.application.requests.job.add_job import (
+    AddJobInvalidRequest,
+    build_add_job_request,
+)
+from src.core.manage import Manage
+
+YAML_SUFFIXES = (".yaml", ".yml")
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+DEFAULT_BATCH_SIZE = 500
+# Documents per task of a worker process
+DEFAULT_CHUNK_SIZE = 50
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# The Chrome extension writes this for values it could not find
+MISSING = "N/A"
+# ... and a YAML block scalar indicator into the description string
+BLOCK_PREFIX = "|\n"
+
+ENUM_FIELDS: dict[str, type[Enum]] = {
+    "status": JobStatus,
+    "work_setting_type": WorkSettingType,
+    "employment_type": EmploymentType,
+}
+
+
+@dataclass(frozen=True)
+class Document:
+    """The text of one job: a YAML file or a line of an NDJSON file"""
+
+    source: str  # the path, with the line number for NDJSON
+    text: str
+    ndjson: bool = False
+
+
+@dataclass(frozen=True)
+class ImportFailure:
+    source: str
+    errors: list[dict[str, str]]
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Imported jobs per second"""
+        return self.imported / self.seconds if self.seconds else 0.0
+
+
+def read_documents(paths: Iterable[Path]) -> Iterator[Document]:
+    """The documents in the files and (not recursively) directories, lazily"""
+    for path in paths:
+        if path.is_dir():
+            yield from read_documents(
+                sorted(
+                    x
+                    for x in path.iterdir()
+                    if x.suffix in YAML_SUFFIXES + NDJSON_SUFFIXES
+                )
+            )
+        elif path.suffix in NDJSON_SUFFIXES:
+            with open(path) as fp:
+                for number, line in enumerate(fp, 1):
+                    if line.strip():
+                        yield Document(f"{path}:{number}", line, ndjson=True)
+        else:
+            yield Document(str(path), path.read_text())
+
+
+def _to_enum(enum: type[Enum], value: Any) -> Any:
+    # by value ("remote") or by name ("REMOTE"); others are left to validation
+    if isinstance(value, str):
+        for member in enum:
+            if value.lower() in (member.value, member.name.lower()):
+                return member
+    return value
+
+
+def normalize(data: dict[str, Any]) -> dict[str, Any]:
+    """Map the values written by the Chrome extension to the domain"""
+    result = {k: v for k, v in data.items() if v not in (MISSING, "", None)}
+    description = result.get("description")
+    if isinstance(description, str) and description.startswith(BLOCK_PREFIX):
+        result["description"] = textwrap.dedent(description[len(BLOCK_PREFIX) :])
+    if isinstance(result.get("description"), str):
+        result["description"] = result["description"].strip()
+    country = result.get("country")
+    if isinstance(country, str):
+        # an ISO code ("DE") or a name ("Germany")
+        code = country.upper()
+        if code in Country._value2member_map_:
+            result["country"] = Country(code)
+        elif country in Country.__members__:
+            result["country"] = Country[country]
+    for field, enum in ENUM_FIELDS.items():
+        if field in result:
+            result[field] = _to_enum(enum, result[field])
+    return result
+
+
+def parse_documents(
+    documents: list[Document], default_country: Country | None = None
+) -> list[Job | ImportFailure]:
+    """Parse and validate documents; runs in a worker process"""
+    result: list[Job | ImportFailure] = []
+    for document in documents:
+        try:
+            if document.ndjson:
+                data = json.loads(document.text)
+            else:
+                data = yaml.safe_load(document.text)
+        except (ValueError, yaml.YAMLError) as e:
+            message = str(e).replace("\n", " ")
+            result.append(
+                ImportFailure(document.source, [{"parameter": "", "message": message}])
+            )
+            continue
+        if isinstance(data, dict):
+            data = normalize(data)
+            if default_country is not None:
+                data.setdefault("country", default_country)
+        request = build_add_job_request(data)
+        if isinstance(request, AddJobInvalidRequest):
+            result.append(ImportFailure(document.source, request.errors))
+            continue
+        try:
+            result.append(Job.create(**request.data))
+        except ValidationError as e:
+            errors = [
+                {"parameter": ".".join(map(str, x["loc"])), "message": x["msg"]}
+                for x in e.errors()
+            ]
+            result.append(ImportFailure(document.source, errors))
+    return result
+
+
+def _chunks(documents: Iterator[Document], size: int) -> Iterator[list[Document]]:
+    while chunk := list(islice(documents, size)):
+        yield chunk
+
+
+async def import_jobs(
+    paths: Iterable[Path],
+    manager: Manage[Job],
+    on_failure: Callable[[ImportFailure], None],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    executor: Executor | None = None,
+    workers: int = DEFAULT_WORKERS,
+    default_country: Country | None = None,
+    fast: bool = False,
+) -> ImportResult:
+    """Ingest jobs from YAML and NDJSON files (see Manage.ingest).
+
+    The documents are parsed and validated in a process pool (`executor`, or one
+    of its own), and written in batches of `batch_size`. At most a few chunks per
+    worker (of the `workers` of the pool) are in flight, so
+    memory use is bound by the batch and chunk sizes, not by the number of files.
+    Importing the same files again updates the jobs instead of duplicating them.
+
+    With `fast`, the jobs are inserted in bulk instead (see Manage.copy_in), e.g.
+    to load an export into an empty database; a job that exists fails its batch.
+
+    A batch that fails to write fails all its documents; the import goes on with
+    the next one (and the batches before it stay imported). Jobs with the same
+    natural key in a batch are imported (and counted) once.
+    """
+    start = time.perf_counter()
+    result = ImportResult()
+    loop = asyncio.get_running_loop()
+    parse = partial(parse_documents, default_country=default_country)
+    pool = executor or ProcessPoolExecutor(workers)
+    max_pending = 2 * workers
+    # the sources of a chunk, and its results (in the same order)
+    pending: deque[tuple[list[str], asyncio.Future[list[Job | ImportFailure]]]] = (
+        deque()
+    )
+    batch: list[Job | dict[str, Any]] = []
+    sources: list[str] = []
+
+    async def write() -> None:
+        try:
+            if fast:
+                result.imported += await manager.copy_in(batch)
+            else:
+                ingested = await manager.ingest_many(batch, batch_size=batch_size)
+                # of the jobs with the same natural key only one is ingested
+                result.imported += len({x.id for x in ingested})
+        except Exception as e:
+            message = str(e) or e.__class__.__name__
+            result.failed += len(batch)
+            for source in sources:
+                on_failure(
+                    ImportFailure(source, [{"parameter": "", "message": message}])
+                )
+        batch.clear()
+        sources.clear()
+
+    async def collect() -> None:
+        chunk_sources, future = pending.popleft()
+        for source, x in zip(chunk_sources, await future):
+            if isinstance(x, ImportFailure):
+                result.failed += 1
+                on_failure(x)
+            else:
+                batch.append(x)
+                sources.append(source)
+        if len(batch) >= batch_size:
+            await write()
+
+    try:
+        for chunk in _chunks(read_documents(paths), chunk_size):
+            pending.append(
+                ([x.source for x in chunk], loop.run_in_executor(pool, parse, chunk))
+            )
+            if len(pending) >= max_pending:
+                await collect()
+        while pending:
+            await collect()
+        if batch:
+            await write()
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+    result.seconds = time.perf_counter() - start
+    return result
@@ -14,13 +14,8 @@ async def update_job(data, job_manager: Manage):
         return ResponseFailure(ResponseTypes.PARAMETERS_ERROR, request.errors)
 
     try:
-        # Fetch the existing job from the repository
-        job = await job_manager.retrieve(request.data["id"])
-        if not job:
-            return ResponseFailure(ResponseTypes.RESOURCE_ERROR, "Job not found.")
-        # Save the updated job back to the repository
-        await job_manager.update(job.id, data)
-        job = await job_manager.retrieve(request.data["id"])
+        # Update the given fields in place (raises DoesNotExist if there's no job)
+        job = await job_manager.patch(request.data["id"], data)
         return ResponseSuccess(job)
     except ValueError as e:
         return ResponseFailure(ResponseTypes.PARAMETERS_ERROR, str(e))
@@ -3,14 +3,18 @@ from uuid import UUID
 
 
 class DoesNotExist(Exception):
-    def __init__(self, name: str, id: UUID | None = None):
+    def __init__(self, name: str, id: UUID | None = None, ids: list[Any] | None = None):
         super().__init__()
         self.name = name
         self.id = id
+        self.ids = ids
 
     def __str__(self):
         if self.id:
             return f"does not exist: {self.name} with id={self.id}"
+        elif self.ids:
+            ids = ", ".join(map(str, self.ids))
+            return f"does not exist: {self.name} with ids={ids}"
         else:
             return f"does not exist: {self.name}"
 
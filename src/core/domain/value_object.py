@@ -1,6 +1,7 @@
-from typing import Any, Dict, Type, TypeVar
+from functools import lru_cache
+from typing import Annotated, Any, Dict, Type, TypeVar
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 # Generic type variables
 T = TypeVar("T", bound="ValueObject")
@@ -10,6 +11,14 @@ class ValidationError(TypeError):
     """Raised when validation fails for a ValueObject."""
 
 
+@lru_cache(maxsize=None)
+def _field_adapter(cls: Type["ValueObject"], name: str) -> TypeAdapter:
+    field = cls.__pydantic_fields__[name]
+    if not field.metadata:
+        return TypeAdapter(field.annotation)
+    return TypeAdapter(Annotated[field.annotation, *field.metadata])
+
+
 class ValueObject(BaseModel):
     """
     Types that have no identity (these are just complex values like a datetime).
@@ -22,6 +31,40 @@ class ValueObject(BaseModel):
         """
         return cls(**values)
 
+    @classmethod
+    def from_trusted(cls: Type[T], values: Dict[str, Any]) -> T:
+        """
+        Creates an instance from values that already have the field types
+        (e.g. loaded from the database), skipping validation.
+        The instance takes ownership of `values`; don't modify it afterwards.
+        """
+        if (
+            values.keys() != cls.__pydantic_fields__.keys()
+            or cls.__private_attributes__
+        ):
+            # model_construct fills in defaults and drops unknown keys
+            return cls.model_construct(**values)
+        # Like model_construct, minus the per-field default handling
+        instance = cls.__new__(cls)
+        object.__setattr__(instance, "__dict__", values)
+        object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+        object.__setattr__(instance, "__pydantic_extra__", None)
+        object.__setattr__(instance, "__pydantic_private__", None)
+        return instance
+
+    @classmethod
+    def validate_fields(cls, **values: Any) -> Dict[str, Any]:
+        """
+        Validates some of the fields on their own, e.g. for a partial update.
+        Unknown fields are dropped, like the constructor does.
+        Model validators are not run.
+        """
+        return {
+            name: _field_adapter(cls, name).validate_python(value)
+            for name, value in values.items()
+            if name in cls.__pydantic_fields__
+        }
+
     def update(self: T, **values: Dict[str, Any]) -> T:
         """
         Updates the ValueObject by returning a new instance with modified values.
@@ -0,0 +1,190 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable, Collection
+from copy import deepcopy
+from datetime import datetime
+from typing import Any, Hashable
+from uuid import UUID
+
+from src.core.domain.context import ctx
+from src.core.repository.base.filter import Filter
+from src.core.repository.base.gateway import DEFAULT_CHUNK_SIZE, Gateway
+from src.core.repository.base.pagination import PageOptions
+
+DEFAULT_MAX_BATCH_SIZE = 100
+
+# id -> the futures of the callers waiting for that record
+Batch = dict[Any, list[asyncio.Future]]
+
+
+class BatchingGateway(Gateway):
+    """Coalesces concurrent `get` calls into one query (like a DataLoader).
+
+    Ids requested during the same event loop iteration are fetched with a single
+    `filter` on id, after which every caller gets its own copy of the record (or
+    None). A batch is sent early once it holds `max_batch_size` ids.
+
+    Batches are per tenant in the context, and the query runs in the context of
+    the first caller of the batch.
+
+    Everything else is passed to the wrapped gateway.
+    """
+
+    def __init__(self, gateway: Gateway, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        self.gateway = gateway
+        self.max_batch_size = max_batch_size
+        self.batches = 0  # number of queries, for monitoring
+        self._pending: dict[Hashable, Batch] = {}
+        self._tasks: set[asyncio.Task] = set()  # keep a reference while running
+
+    def _key(self, loop: asyncio.AbstractEventLoop) -> Hashable:
+        tenant = ctx.tenant
+        return (loop, tenant.id if tenant is not None else None)
+
+    async def get(self, id: Any) -> dict[str, Any] | None:
+        loop = asyncio.get_running_loop()
+        key = self._key(loop)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = {}
+            loop.call_soon(self._dispatch, key, batch)
+        future = loop.create_future()
+        batch.setdefault(id, []).append(future)
+        if len(batch) >= self.max_batch_size:
+            self._dispatch(key, batch)
+        return await future
+
+    def _dispatch(self, key: Hashable, batch: Batch) -> None:
+        if self._pending.get(key) is not batch:
+            return  # already sent
+        del self._pending[key]
+        self.batches += 1
+        task = asyncio.ensure_future(self._load(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load(self, batch: Batch) -> None:
+        try:
+            records = await self.gateway.filter(
+                [Filter(field="id", values=list(batch))], params=None
+            )
+        except BaseException as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        record_lut = {x["id"]: x for x in records}
+        for id, futures in batch.items():
+            record = record_lut.get(id)
+            for i, future in enumerate(futures):
+                if not future.done():  # the caller may have been cancelled
+                    future.set_result(record if i == 0 else deepcopy(record))
+
+    async def get_many(
+        self, ids: list[Any], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> list[dict[str, Any] | None]:
+        return await self.gateway.get_many(ids, chunk_size=chunk_size)
+
+    async def add(self, item: dict[str, Any]) -> dict[str, Any]:
+        return await self.gateway.add(item)
+
+    async def add_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        return await self.gateway.add_many(items, batch_size=batch_size)
+
+    async def copy_in(self, items: list[dict[str, Any]]) -> int:
+        return await self.gateway.copy_in(items)
+
+    async def update(
+        self, item: dict[str, Any], if_unmodified_since: datetime | None = None
+    ) -> dict[str, Any]:
+        return await self.gateway.update(item, if_unmodified_since)
+
+    async def patch(
+        self,
+        id: Any,
+        values: dict[str, Any],
+        if_unmodified_since: datetime | None = None,
+    ) -> dict[str, Any]:
+        return await self.gateway.patch(id, values, if_unmodified_since)
+
+    async def update_transactional(
+        self, id: UUID, func: Callable[[dict[str, Any]], dict[str, Any]]
+    ) -> dict[str, Any]:
+        return await self.gateway.update_transactional(id, func)
+
+    async def ingest(
+        self, item: dict[str, Any], keep: Collection[str] = ()
+    ) -> dict[str, Any]:
+        return await self.gateway.ingest(item, keep=keep)
+
+    async def ingest_many(
+        self,
+        items: list[dict[str, Any]],
+        keep: Collection[str] = (),
+        batch_size: int | None = None,
+    ) -> list[dict[str, Any]]:
+        return await self.gateway.ingest_many(items, keep=keep, batch_size=batch_size)
+
+    async def upsert(self, item: dict[str, Any]) -> dict[str, Any]:
+        return await self.gateway.upsert(item)
+
+    async def upsert_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        return await self.gateway.upsert_many(items, batch_size=batch_size)
+
+    async def remove(self, id: Any) -> bool:
+        return await self.gateway.remove(id)
+
+    async def update_where(
+        self, filters: list[Filter], values: dict[str, Any]
+    ) -> list[Any]:
+        return await self.gateway.update_where(filters, values)
+
+    async def remove_where(self, filters: list[Filter]) -> list[Any]:
+        return await self.gateway.remove_where(filters)
+
+    async def filter(
+        self, filters: list[Filter], params: PageOptions | None = None
+    ) -> list[dict[str, Any]]:
+        return await self.gateway.filter(filters, params=params)
+
+    async def filter_with_total(
+        self, filters: list[Filter], params: PageOptions
+    ) -> tuple[list[dict[str, Any]], int]:
+        return await self.gateway.filter_with_total(filters, params)
+
+    async def stream(
+        self, filters: list[Filter], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        async for records in self.gateway.stream(filters, chunk_size=chunk_size):
+            yield records
+
+    async def copy_out(
+        self, filters: list[Filter]
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        async for records in self.gateway.copy_out(filters):
+            yield records
+
+    def cursor_for(self, item: dict[str, Any], params: PageOptions) -> str:
+        return self.gateway.cursor_for(item, params)
+
+    async def count(self, filters: list[Filter]) -> int:
+        return await self.gateway.count(filters)
+
+    async def exists(self, filters: list[Filter]) -> bool:
+        return await self.gateway.exists(filters)
+
+    async def distinct(
+        self, field: str, filters: list[Filter], limit: int | None = None
+    ) -> list[Any]:
+        return await self.gateway.distinct(field, filters, limit=limit)
+
+    async def facets(
+        self, filters: list[Filter], fields: list[str]
+    ) -> dict[str, dict[Any, int]]:
+        return await self.gateway.facets(filters, fields)
@@ -0,0 +1,281 @@
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Collection
+from copy import deepcopy
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Hashable, TypeVar
+from uuid import UUID
+
+from src.core.domain.context import ctx
+from src.core.repository.base.filter import Filter
+from src.core.repository.base.gateway import DEFAULT_CHUNK_SIZE, Gateway
+from src.core.repository.base.pagination import PageOptions
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 60.0
+
+R = TypeVar("R")
+
+
+@dataclass
+class CacheInfo:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachedGateway(Gateway):
+    """Read-through cache of records by id in front of another Gateway.
+
+    `get` is served from a bounded LRU cache whose entries expire after `ttl`
+    seconds. Misses are cached as well (for `negative_ttl` seconds). Writes
+    through this gateway refresh the cached record, or drop it if they fail.
+    Writes that bypass it (other processes, bulk queries on the wrapped gateway)
+    are only seen after the entry expires, so keep `ttl` short.
+
+    Entries are keyed by the tenant in the context and the id, so that tenants
+    of a multitenant gateway never see each other's records.
+
+    Everything else (`filter`, `count`, ...) is passed to the wrapped gateway.
+    """
+
+    def __init__(
+        self,
+        gateway: Gateway,
+        maxsize: int = DEFAULT_MAXSIZE,
+        ttl: float = DEFAULT_TTL,
+        negative_ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.gateway = gateway
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # key -> (expires at, record or None for a miss)
+        self._entries: OrderedDict[Hashable, tuple[float, dict[str, Any] | None]] = (
+            OrderedDict()
+        )
+
+    def _key(self, id: Any) -> Hashable:
+        tenant = ctx.tenant
+        return (tenant.id if tenant is not None else None, id)
+
+    def _set(self, id: Any, record: dict[str, Any] | None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if record is not None else self.negative_ttl
+        key = self._key(id)
+        self._entries[key] = (self.clock() + ttl, deepcopy(record))
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, id: Any) -> None:
+        self._entries.pop(self._key(id), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self._entries),
+            maxsize=self.maxsize,
+        )
+
+    def _lookup(self, id: Any) -> tuple[bool, dict[str, Any] | None]:
+        # (whether there was a valid entry, a copy of its record)
+        key = self._key(id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, record = entry
+            if expires_at > self.clock():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return True, deepcopy(record)
+            del self._entries[key]
+        self.misses += 1
+        return False, None
+
+    async def get(self, id: Any) -> dict[str, Any] | None:
+        found, record = self._lookup(id)
+        if not found:
+            record = await self.gateway.get(id)
+            self._set(id, record)
+        return record
+
+    async def get_many(
+        self, ids: list[Any], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> list[dict[str, Any] | None]:
+        records = {}
+        missing = []
+        for id in dict.fromkeys(ids):
+            found, records[id] = self._lookup(id)
+            if not found:
+                missing.append(id)
+        if missing:
+            fetched = await self.gateway.get_many(missing, chunk_size=chunk_size)
+            for id, record in zip(missing, fetched):
+                self._set(id, record)
+                records[id] = record
+        return [records[x] for x in ids]
+
+    async def _write(self, id: Any, write: Awaitable[R]) -> R:
+        # drop the entry first: if the write fails the record is in an unknown state
+        if id is not None:
+            self.invalidate(id)
+        return await write
+
+    async def add(self, item: dict[str, Any]) -> dict[str, Any]:
+        result = await self._write(item.get("id"), self.gateway.add(item))
+        self._set(result["id"], result)
+        return result
+
+    async def add_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        for item in items:
+            self.invalidate(item.get("id"))
+        result = await self.gateway.add_many(items, batch_size=batch_size)
+        for record in result:
+            self._set(record["id"], record)
+        return result
+
+    async def copy_in(self, items: list[dict[str, Any]]) -> int:
+        # nothing is returned to cache
+        for item in items:
+            self.invalidate(item.get("id"))
+        return await self.gateway.copy_in(items)
+
+    async def update(
+        self, item: dict[str, Any], if_unmodified_since: datetime | None = None
+    ) -> dict[str, Any]:
+        result = await self._write(
+            item.get("id"), self.gateway.update(item, if_unmodified_since)
+        )
+        self._set(result["id"], result)
+        return result
+
+    async def patch(
+        self,
+        id: Any,
+        values: dict[str, Any],
+        if_unmodified_since: datetime | None = None,
+    ) -> dict[str, Any]:
+        result = await self._write(
+            id, self.gateway.patch(id, values, if_unmodified_since)
+        )
+        self._set(result["id"], result)
+        return result
+
+    async def update_transactional(
+        self, id: UUID, func: Callable[[dict[str, Any]], dict[str, Any]]
+    ) -> dict[str, Any]:
+        result = await self._write(id, self.gateway.update_transactional(id, func))
+        self._set(result["id"], result)
+        return result
+
+    async def ingest(
+        self, item: dict[str, Any], keep: Collection[str] = ()
+    ) -> dict[str, Any]:
+        # the id of the result is only known afterwards
+        result = await self.gateway.ingest(item, keep=keep)
+        self._set(result["id"], result)
+        return result
+
+    async def ingest_many(
+        self,
+        items: list[dict[str, Any]],
+        keep: Collection[str] = (),
+        batch_size: int | None = None,
+    ) -> list[dict[str, Any]]:
+        result = await self.gateway.ingest_many(items, keep=keep, batch_size=batch_size)
+        for record in result:
+            self._set(record["id"], record)
+        return result
+
+    async def upsert(self, item: dict[str, Any]) -> dict[str, Any]:
+        result = await self._write(item.get("id"), self.gateway.upsert(item))
+        self._set(result["id"], result)
+        return result
+
+    async def upsert_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        for item in items:
+            self.invalidate(item.get("id"))
+        result = await self.gateway.upsert_many(items, batch_size=batch_size)
+        for record in result:
+            self._set(record["id"], record)
+        return result
+
+    async def remove(self, id: Any) -> bool:
+        return await self._write(id, self.gateway.remove(id))
+
+    async def update_where(
+        self, filters: list[Filter], values: dict[str, Any]
+    ) -> list[Any]:
+        # the ids are only known afterwards; a failed write changes nothing
+        result = await self.gateway.update_where(filters, values)
+        for id in result:
+            self.invalidate(id)
+        return result
+
+    async def remove_where(self, filters: list[Filter]) -> list[Any]:
+        result = await self.gateway.remove_where(filters)
+        for id in result:
+            self.invalidate(id)
+        return result
+
+    async def filter(
+        self, filters: list[Filter], params: PageOptions | None = None
+    ) -> list[dict[str, Any]]:
+        return await self.gateway.filter(filters, params=params)
+
+    async def filter_with_total(
+        self, filters: list[Filter], params: PageOptions
+    ) -> tuple[list[dict[str, Any]], int]:
+        return await self.gateway.filter_with_total(filters, params)
+
+    async def stream(
+        self, filters: list[Filter], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        async for records in self.gateway.stream(filters, chunk_size=chunk_size):
+            yield records
+
+    async def copy_out(
+        self, filters: list[Filter]
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        async for records in self.gateway.copy_out(filters):
+            yield records
+
+    def cursor_for(self, item: dict[str, Any], params: PageOptions) -> str:
+        return self.gateway.cursor_for(item, params)
+
+    async def count(self, filters: list[Filter]) -> int:
+        return await self.gateway.count(filters)
+
+    async def exists(self, filters: list[Filter]) -> bool:
+        return await self.gateway.exists(filters)
+
+    async def distinct(
+        self, field: str, filters: list[Filter], limit: int | None = None
+    ) -> list[Any]:
+        return await self.gateway.distinct(field, filters, limit=limit)
+
+    async def facets(
+        self, filters: list[Filter], fields: list[str]
+    ) -> dict[str, dict[Any, int]]:
+        return await self.gateway.facets(filters, fields)
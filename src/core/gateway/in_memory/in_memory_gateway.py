@@ -1,18 +1,115 @@
-from collections.abc import Callable
+import operator
+import re
+from collections.abc import Callable, Collection, Sequence
 from copy import deepcopy
 from datetime import datetime
 from typing import Any
 from uuid import UUID
 
 from src.core.domain.exceptions import AlreadyExists, Conflict, DoesNotExist
-from src.core.repository.base.filter import Filter
-from src.core.repository.base.gateway import Gateway
-from src.core.repository.base.pagination import PageOptions
+from src.core.repository.base.filter import (
+    ComparisonFilter,
+    ComparisonOperator,
+    Filter,
+    TextSearchFilter,
+)
+from src.core.repository.base.gateway import (
+    DEFAULT_CHUNK_SIZE,
+    Gateway,
+    facet_counts,
+)
+from src.core.repository.base.pagination import PageOptions, decode_cursor
+
+WORD_REGEX = re.compile(r"\w+")
+# a (negated) quoted phrase or word of a web search query
+TERM_REGEX = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+
+
+def _words(text: str) -> list[str]:
+    return WORD_REGEX.findall(text.lower())
+
+
+def _contains(words: list[str], phrase: list[str]) -> bool:
+    n = len(phrase)
+    return any(words[i : i + n] == phrase for i in range(len(words) - n + 1))
+
+
+def _text_search_matches(record: dict[str, Any], filter: TextSearchFilter) -> bool:
+    """Like websearch_to_tsquery, but matching whole words (no stemming).
+
+    Without `filter.field` in the record (e.g. a generated tsvector column) all
+    its text values are searched.
+    """
+    value = record.get(filter.field)
+    if not isinstance(value, str):
+        value = " ".join(x for x in record.values() if isinstance(x, str))
+    words = _words(value)
+    # "or" binds weaker than the implicit "and"
+    groups: list[list[tuple[bool, list[str]]]] = [[]]
+    for match in TERM_REGEX.finditer(filter.values[0]):
+        negated, phrase, word_negated, word = match.groups()
+        if word is not None and word.lower() == "or":
+            groups.append([])
+            continue
+        terms = _words(phrase if phrase is not None else word)
+        if terms:
+            groups[-1].append((bool(negated or word_negated), terms))
+    return any(
+        group and all(_contains(words, terms) != negated for negated, terms in group)
+        for group in groups
+    )
+
+
+COMPARISONS: dict[ComparisonOperator, Callable[[Any, Any], bool]] = {
+    ComparisonOperator.EQ: operator.eq,
+    ComparisonOperator.NE: operator.ne,
+    ComparisonOperator.LT: operator.lt,
+    ComparisonOperator.LE: operator.le,
+    ComparisonOperator.GT: operator.gt,
+    ComparisonOperator.GE: operator.ge,
+    ComparisonOperator.STARTSWITH: lambda x, y: x.lower().startswith(y.lower()),
+    ComparisonOperator.CONTAINS: lambda x, y: y.lower() in x.lower(),
+    ComparisonOperator.ILIKE: lambda x, y: _like_regex(y).fullmatch(x) is not None,
+}
+
+
+def _like_regex(pattern: str) -> re.Pattern:
+    # a backslash escapes the next character, like in PostgreSQL
+    parts = re.split(r"(\\.|%|_)", pattern)
+    wildcards = {"%": ".*", "_": "."}
+    return re.compile(
+        "".join(
+            wildcards.get(x) or re.escape(x[1:] if x.startswith("\\") else x)
+            for x in parts
+        ),
+        re.IGNORECASE | re.DOTALL,
+    )
+
+
+def _comparison_matches(record: dict[str, Any], filter: ComparisonFilter) -> bool:
+    value = record.get(filter.field)
+    if value is None:  # like NULL in SQL
+        return False
+    return COMPARISONS[filter.operator](value, filter.values[0])
+
+
+def _matches(record: dict[str, Any], filter: Filter) -> bool:
+    if isinstance(filter, TextSearchFilter):
+        return _text_search_matches(record, filter)
+    if isinstance(filter, ComparisonFilter):
+        return _comparison_matches(record, filter)
+    return record.get(filter.field) in filter.values
 
 
 class InMemoryGateway(Gateway):
-    def __init__(self, data: list[dict[str, Any]]):
+    def __init__(
+        self,
+        data: list[dict[str, Any]],
+        unique_keys: Sequence[Sequence[str]] = (),
+    ):
         self.data = {x["id"]: deepcopy(x) for x in data}
+        # natural keys for ingest, like the (partial) unique indexes of a table
+        self.unique_keys = [tuple(x) for x in unique_keys]
 
     def _get_next_id(self) -> int:
         if len(self.data) == 0:
@@ -23,12 +120,43 @@ class InMemoryGateway(Gateway):
     def _paginate(
         self, objs: list[dict[str, Any]], params: PageOptions
     ) -> list[dict[str, Any]]:
+        def key(value: Any, id: Any) -> tuple[Any, ...]:
+            return (value is None, value, id)
+
         objs = sorted(
             objs,
-            key=lambda x: (x.get(params.order_by) is None, x.get(params.order_by)),
+            key=lambda x: key(x.get(params.order_by), x["id"]),
             reverse=not params.ascending,
         )
-        return objs[params.offset : params.offset + params.limit]
+        if params.cursor is None:
+            objs = objs[params.offset : params.offset + params.limit]
+        else:
+            cursor = decode_cursor(params.cursor, params.order_by)
+            position = key(cursor.value, cursor.id)
+            if params.ascending:
+                objs = [
+                    x for x in objs if key(x.get(params.order_by), x["id"]) > position
+                ]
+            else:
+                objs = [
+                    x for x in objs if key(x.get(params.order_by), x["id"]) < position
+                ]
+            objs = objs[: params.limit]
+        projection = params.projection()
+        if projection is not None:
+            self._check_fields(projection)
+            objs = [{k: x[k] for k in projection if k in x} for x in objs]
+        return objs
+
+    def _check_fields(self, fields: list[str]) -> None:
+        # like SQLGateway; there is no schema, so a field is known if any record
+        # has it (and nothing can be checked without records)
+        if not self.data:
+            return
+        known = set().union(*self.data.values())
+        for field in fields:
+            if field not in known:
+                raise ValueError(f"Unknown field: {field}")
 
     async def filter(
         self, filters: list[Filter], params: PageOptions | None = None
@@ -36,7 +164,7 @@ class InMemoryGateway(Gateway):
         result = []
         for x in self.data.values():
             for filter in filters:
-                if x.get(filter.field) not in filter.values:
+                if not _matches(x, filter):
                     break
             else:
                 result.append(deepcopy(x))
@@ -44,6 +172,15 @@ class InMemoryGateway(Gateway):
             result = self._paginate(result, params)
         return result
 
+    async def facets(
+        self, filters: list[Filter], fields: list[str]
+    ) -> dict[str, dict[Any, int]]:
+        # one pass, without copying the records like filter does
+        records = (
+            x for x in self.data.values() if all(_matches(x, f) for f in filters)
+        )
+        return facet_counts(records, fields)
+
     async def add(self, item: dict[str, Any]) -> dict[str, Any]:
         item = item.copy()
         id_ = item.pop("id", None)
@@ -56,6 +193,24 @@ class InMemoryGateway(Gateway):
         self.data[id_] = {"id": id_, **item}
         return deepcopy(self.data[id_])
 
+    async def add_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        # all-or-nothing, like the SQL transaction
+        seen = set(self.data)
+        for item in items:
+            id_ = item.get("id")
+            if id_ is not None:
+                if id_ in seen:
+                    raise AlreadyExists(id_)
+                seen.add(id_)
+        return [await self.add(x) for x in items]
+
+    async def get_many(
+        self, ids: list[Any], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> list[dict[str, Any] | None]:
+        return [deepcopy(self.data[x]) if x in self.data else None for x in ids]
+
     async def update(
         self, item: dict[str, Any], if_unmodified_since: datetime | None = None
     ) -> dict[str, Any]:
@@ -68,6 +223,21 @@ class InMemoryGateway(Gateway):
         existing.update(item)
         return deepcopy(existing)
 
+    async def ingest(
+        self, item: dict[str, Any], keep: Collection[str] = ()
+    ) -> dict[str, Any]:
+        for key in self.unique_keys:
+            values = [item.get(x) for x in key]
+            if None in values:
+                continue
+            for existing in self.data.values():
+                if [existing.get(x) for x in key] == values:
+                    kept = {"id", "created_at", *key, *keep}
+                    existing.update({k: v for k, v in item.items() if k not in kept})
+                    return deepcopy(existing)
+            break
+        return await self.add(item)
+
     async def remove(self, id: UUID) -> bool:
         if id not in self.data:
             return False
@@ -1,10 +1,13 @@
 import subprocess
 import tempfile
 
+from src.core.tracing import tracer
+
 
 class Latex2PDFRendererGateway:
     """Gateway to render PDFs from LaTeX templates."""
 
+    @tracer.traced("rendering")
     def render_pdf(self, template: str) -> bytes:
         """
         Render a PDF from a LaTeX template and context.
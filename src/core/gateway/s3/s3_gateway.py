@@ -93,6 +93,10 @@ class S3Gateway(Gateway):
             for x in result.get("Contents", [])
         ]
 
+    def cursor_for(self, item: dict[str, Any], params: PageOptions) -> str:
+        # S3 paginates by key natively
+        return item["id"]
+
     async def remove(self, id: str) -> bool:
         await self.provider.client.delete_object(
             Bucket=self.provider.bucket,
@@ -1,7 +1,9 @@
+import asyncio
 import json
 import re
-from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator, Mapping, Sequence
+from contextlib import asynccontextmanager, suppress
+from time import perf_counter
 from typing import Any
 
 try:
@@ -13,17 +15,26 @@ except ImportError:
     UniqueViolationError = SerializationError = Exception
     Connection = object
 from async_lru import alru_cache
+from sqlalchemy import Table
 from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
-from sqlalchemy.sql import Executable
+from sqlalchemy.sql import Executable, Select
 
 from src.core.domain.exceptions import AlreadyExists, Conflict
+from src.core.repository.base.gateway import DEFAULT_CHUNK_SIZE
 
+from .binary_copy import BinaryCopyDecoder
+from .instrumentation import Instrumentation
 from .sql_provider import SQLDatabase, SQLProvider
+from .statement_cache import DEFAULT_MAXSIZE, StatementCache
 
 UNIQUE_VIOLATION_DETAIL_REGEX = re.compile(
     r"Key\s\((?P<key>.*)\)=\((?P<value>.*)\)\s+already exists"
 )
 DIALECT = asyncpg_dialect()
+# shared by everything that does not bring its own cache
+STATEMENT_CACHE = StatementCache(DIALECT)
+# Chunks of decoded rows that copy_out reads ahead of the consumer
+COPY_OUT_QUEUE_SIZE = 4
 
 
 def convert_unique_violation_error(
@@ -37,21 +48,129 @@ def convert_unique_violation_error(
 
 
 def compile(
-    query: Executable, bind_params: dict[str, Any] | None = None
+    query: Executable,
+    bind_params: dict[str, Any] | None = None,
+    cache: StatementCache = STATEMENT_CACHE,
 ) -> tuple[Any, ...]:
     # Rendering SQLAlchemy expressions to SQL, see:
     # - https://docs.sqlalchemy.org/en/20/faq/sqlexpressions.html
-    # Note that this circumvents the SQLAlchemy caching system and almost certainly
-    # will deteriorate performance when using complex query (compared to the
-    # standard sqlalchemy .execute)
-    compiled = query.compile(
-        dialect=DIALECT, compile_kwargs={"render_postcompile": True}
-    )
-    params = (
-        compiled.params if bind_params is None else {**compiled.params, **bind_params}
+    # This circumvents the SQLAlchemy caching system, so we keep our own cache of
+    # rendered SQL per statement shape (see StatementCache).
+    return cache.compile(query, bind_params)
+
+
+async def fetch_instrumented(
+    connection: Connection,
+    args: tuple[Any, ...],
+    instrumentation: Instrumentation | None,
+    compile_time: float = 0.0,
+    acquire_time: float = 0.0,
+) -> Sequence[Mapping[str, Any]]:
+    start = perf_counter()
+    count = None
+    try:
+        rows = await connection.fetch(*args)
+        count = len(rows)
+    except UniqueViolationError as e:
+        raise convert_unique_violation_error(e)
+    except SerializationError:
+        raise Conflict("could not execute query due to concurrent update")
+    finally:
+        if instrumentation is not None:
+            instrumentation.record(
+                args[0],
+                compile_time=compile_time,
+                acquire_time=acquire_time,
+                execute_time=perf_counter() - start,
+                rows=count,
+            )
+    return rows
+
+
+async def copy_in_instrumented(
+    connection: Connection,
+    table: Table,
+    records: Sequence[Mapping[str, Any]],
+    instrumentation: Instrumentation | None,
+    acquire_time: float = 0.0,
+) -> int:
+    if not records:
+        return 0
+    columns = list(records[0])
+    start = perf_counter()
+    count = None
+    try:
+        status = await connection.copy_records_to_table(
+            table.name,
+            records=[tuple(x[k] for k in columns) for x in records],
+            columns=columns,
+            schema_name=table.schema,
+        )
+        count = int(status.split()[-1])  # "COPY n"
+        return count
+    except UniqueViolationError as e:
+        raise convert_unique_violation_error(e)
+    finally:
+        if instrumentation is not None:
+            instrumentation.record(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN",
+                acquire_time=acquire_time,
+                execute_time=perf_counter() - start,
+                rows=count,
+            )
+
+
+async def copy_out_instrumented(
+    connection: Connection,
+    query: Select,
+    bind_params: dict[str, Any] | None,
+    cache: StatementCache,
+    instrumentation: Instrumentation | None,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    # the decoder needs the column types of the query, so it must be a Select
+    decoder = BinaryCopyDecoder.for_query(query)
+    start = perf_counter()
+    sql, *args = compile(query, bind_params, cache)
+    compiled = perf_counter()
+    # COPY writes to a callback; the queue hands the rows to the consumer, and
+    # blocks the COPY when the consumer falls behind
+    queue: asyncio.Queue[list[dict[str, Any]] | None] = asyncio.Queue(
+        COPY_OUT_QUEUE_SIZE
     )
-    # add params in positional order
-    return (str(compiled),) + tuple(params[k] for k in compiled.positiontup)
+    count = 0
+
+    async def output(data: bytes) -> None:
+        nonlocal count
+        rows = decoder.feed(data)
+        if rows:
+            count += len(rows)
+            await queue.put(rows)
+
+    async def copy() -> None:
+        try:
+            await connection.copy_from_query(sql, *args, output=output, format="binary")
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    task = asyncio.create_task(copy())
+    try:
+        while (rows := await queue.get()) is not None:
+            yield rows
+        await task  # raises the error of the COPY, if any
+    finally:
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        if instrumentation is not None:
+            instrumentation.record(
+                f"COPY ({sql}) TO STDOUT",
+                compile_time=compiled - start,
+                execute_time=perf_counter() - compiled,
+                rows=count,
+            )
 
 
 async def init_db_types(conn: Connection):
@@ -65,12 +184,20 @@ async def init_db_types(conn: Connection):
 
 class AsyncpgSQLDatabase(SQLDatabase):
     def __init__(
-        self, url: str, *, isolation_level: str = "repeatable_read", pool_size: int = 1
+        self,
+        url: str,
+        *,
+        isolation_level: str = "repeatable_read",
+        pool_size: int = 1,
+        statement_cache_size: int = DEFAULT_MAXSIZE,
+        instrumentation: Instrumentation | None = None,
     ):
         assert asyncpg is not None
         self.url = url
         self.pool_size = pool_size
         self.isolation_level = isolation_level
+        self.statement_cache = StatementCache(DIALECT, maxsize=statement_cache_size)
+        self.instrumentation = instrumentation
 
     @alru_cache
     async def get_pool(self):
@@ -82,6 +209,8 @@ class AsyncpgSQLDatabase(SQLDatabase):
             min_size=1,
             max_size=self.pool_size,
             init=init_db_types,
+            # prepared statements are cached per connection, keyed on SQL text
+            statement_cache_size=self.statement_cache.maxsize,
         )
 
     async def dispose(self) -> None:
@@ -91,24 +220,85 @@ class AsyncpgSQLDatabase(SQLDatabase):
     async def execute(
         self, query: Executable, bind_params: dict[str, Any] | None = None
     ) -> list[dict[str, Any]]:
+        return list(map(dict, await self.fetch(query, bind_params)))
+
+    async def fetch(
+        self, query: Executable, bind_params: dict[str, Any] | None = None
+    ) -> Sequence[Mapping[str, Any]]:
         # compile before acquiring the connection
-        args = compile(query, bind_params)
+        start = perf_counter()
+        args = compile(query, bind_params, self.statement_cache)
+        compiled = perf_counter()
         pool = await self.get_pool()
-        try:
-            result = await pool.fetch(*args)
-        except UniqueViolationError as e:
-            raise convert_unique_violation_error(e)
-        except SerializationError:
-            raise Conflict("could not execute query due to concurrent update")
-        return list(map(dict, result))
+        connection: Connection
+        async with pool.acquire() as connection:
+            return await fetch_instrumented(
+                connection,
+                args,
+                self.instrumentation,
+                compile_time=compiled - start,
+                acquire_time=perf_counter() - compiled,
+            )
+
+    async def stream(
+        self,
+        query: Executable,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        bind_params: dict[str, Any] | None = None,
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        # server-side cursors only exist within a transaction
+        async with self.transaction(readonly=True) as transaction:
+            async for rows in transaction.stream(query, chunk_size, bind_params):
+                yield rows
+
+    async def copy_in(self, table: Table, records: Sequence[Mapping[str, Any]]) -> int:
+        """Binary COPY of rows (with the same keys) into `table`"""
+        start = perf_counter()
+        pool = await self.get_pool()
+        connection: Connection
+        async with pool.acquire() as connection:
+            return await copy_in_instrumented(
+                connection,
+                table,
+                records,
+                self.instrumentation,
+                acquire_time=perf_counter() - start,
+            )
+
+    async def copy_out(
+        self, query: Select, bind_params: dict[str, Any] | None = None
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        """The rows of `query` through a binary COPY, as they arrive"""
+        pool = await self.get_pool()
+        connection: Connection
+        async with pool.acquire() as connection:
+            async for rows in copy_out_instrumented(
+                connection,
+                query,
+                bind_params,
+                self.statement_cache,
+                self.instrumentation,
+            ):
+                yield rows
 
     @asynccontextmanager
-    async def transaction(self) -> AsyncIterator[SQLProvider]:  # type: ignore
+    async def transaction(  # type: ignore
+        self, readonly: bool = False
+    ) -> AsyncIterator[SQLProvider]:
+        start = perf_counter()
         pool = await self.get_pool()
         connection: Connection
         async with pool.acquire() as connection:
-            async with connection.transaction(isolation=self.isolation_level):
-                yield AsyncpgSQLTransaction(connection)
+            acquire_time = perf_counter() - start
+            async with connection.transaction(
+                isolation=self.isolation_level, readonly=readonly
+            ):
+                yield AsyncpgSQLTransaction(
+                    connection,
+                    self.statement_cache,
+                    self.instrumentation,
+                    acquire_time=acquire_time,
+                )
 
     @asynccontextmanager
     async def testing_transaction(self) -> AsyncIterator[SQLProvider]:  # type: ignore
@@ -118,7 +308,9 @@ class AsyncpgSQLDatabase(SQLDatabase):
             transaction = connection.transaction()
             await transaction.start()
             try:
-                yield AsyncpgSQLTransaction(connection)
+                yield AsyncpgSQLTransaction(
+                    connection, self.statement_cache, self.instrumentation
+                )
             finally:
                 await transaction.rollback()
 
@@ -126,25 +318,104 @@ class AsyncpgSQLDatabase(SQLDatabase):
         pool = await self.get_pool()
         connection: Connection
         async with pool.acquire() as connection:
-            await connection.execute(*compile(query))
+            await connection.execute(*compile(query, cache=self.statement_cache))
 
 
 class AsyncpgSQLTransaction(SQLProvider):
-    def __init__(self, connection: Connection):
+    def __init__(
+        self,
+        connection: Connection,
+        statement_cache: StatementCache = STATEMENT_CACHE,
+        instrumentation: Instrumentation | None = None,
+        acquire_time: float = 0.0,
+    ):
         self.connection = connection
+        self.statement_cache = statement_cache
+        self.instrumentation = instrumentation
+        # waiting for the connection is attributed to the first statement
+        self.acquire_time = acquire_time
 
     async def execute(
         self, query: Executable, bind_params: dict[str, Any] | None = None
     ) -> list[dict[str, Any]]:
-        try:
-            result = await self.connection.fetch(*compile(query, bind_params))
-        except UniqueViolationError as e:
-            raise convert_unique_violation_error(e)
-        except SerializationError:
-            raise Conflict("could not execute query due to concurrent update")
-        return list(map(dict, result))
+        return list(map(dict, await self.fetch(query, bind_params)))
+
+    async def fetch(
+        self, query: Executable, bind_params: dict[str, Any] | None = None
+    ) -> Sequence[Mapping[str, Any]]:
+        start = perf_counter()
+        args = compile(query, bind_params, self.statement_cache)
+        compile_time = perf_counter() - start
+        acquire_time, self.acquire_time = self.acquire_time, 0.0
+        return await fetch_instrumented(
+            self.connection,
+            args,
+            self.instrumentation,
+            compile_time=compile_time,
+            acquire_time=acquire_time,
+        )
+
+    async def stream(
+        self,
+        query: Executable,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        bind_params: dict[str, Any] | None = None,
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        start = perf_counter()
+        args = compile(query, bind_params, self.statement_cache)
+        compile_time = perf_counter() - start
+        acquire_time, self.acquire_time = self.acquire_time, 0.0
+        # every fetch is recorded, the first one includes opening the cursor
+        start = perf_counter()
+        cursor = None
+        while True:
+            count = None
+            try:
+                if cursor is None:
+                    cursor = await self.connection.cursor(*args)
+                rows = await cursor.fetch(chunk_size)
+                count = len(rows)
+            finally:
+                if self.instrumentation is not None:
+                    self.instrumentation.record(
+                        args[0],
+                        compile_time=compile_time,
+                        acquire_time=acquire_time,
+                        execute_time=perf_counter() - start,
+                        rows=count,
+                    )
+            if not rows:
+                break
+            yield rows
+            compile_time = acquire_time = 0.0
+            start = perf_counter()
+
+    async def copy_in(self, table: Table, records: Sequence[Mapping[str, Any]]) -> int:
+        acquire_time, self.acquire_time = self.acquire_time, 0.0
+        return await copy_in_instrumented(
+            self.connection,
+            table,
+            records,
+            self.instrumentation,
+            acquire_time=acquire_time,
+        )
+
+    async def copy_out(
+        self, query: Select, bind_params: dict[str, Any] | None = None
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        async for rows in copy_out_instrumented(
+            self.connection,
+            query,
+            bind_params,
+            self.statement_cache,
+            self.instrumentation,
+        ):
+            yield rows
 
     @asynccontextmanager
-    async def transaction(self) -> AsyncIterator[SQLProvider]:  # type: ignore
+    async def transaction(  # type: ignore
+        self, readonly: bool = False
+    ) -> AsyncIterator[SQLProvider]:
+        # a savepoint inherits the access mode of the enclosing transaction
         async with self.connection.transaction():
             yield self
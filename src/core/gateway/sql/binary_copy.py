@@ -0,0 +1,159 @@
+import json
+import struct
+from collections.abc import Callable
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    Integer,
+    String,
+    Uuid,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import Select
+from sqlalchemy.types import TypeEngine
+
+# See https://www.postgresql.org/docs/current/sql-copy.html (Binary Format)
+SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+# the signature, the flags and the length of the header extension
+HEADER_SIZE = len(SIGNATURE) + 8
+TRAILER = -1
+NULL = -1
+
+# PostgreSQL's epoch for timestamps and dates
+EPOCH = datetime(2000, 1, 1)
+EPOCH_TZ = EPOCH.replace(tzinfo=timezone.utc)
+EPOCH_DATE = date(2000, 1, 1)
+
+Decoder = Callable[[bytes], Any]
+
+_int16 = struct.Struct(">h")
+_int32 = struct.Struct(">i")
+
+
+def _int(value: bytes) -> int:
+    return int.from_bytes(value, "big", signed=True)
+
+
+def _float(value: bytes) -> float:
+    return struct.unpack(">d" if len(value) == 8 else ">f", value)[0]
+
+
+def decoder(type_: TypeEngine) -> Decoder:
+    """Decodes the binary representation of a value of a column type"""
+    # Enum before String, of which it is a subclass; SQLAlchemy stores the names
+    if isinstance(type_, (Enum, String)):
+        return bytes.decode
+    if isinstance(type_, Uuid):
+        if type_.as_uuid:
+            return lambda x: UUID(bytes=x)
+        return lambda x: str(UUID(bytes=x))
+    if isinstance(type_, DateTime):
+        epoch = EPOCH_TZ if type_.timezone else EPOCH
+        return lambda x: epoch + timedelta(
+            microseconds=int.from_bytes(x, "big", signed=True)
+        )
+    if isinstance(type_, Date):
+        return lambda x: EPOCH_DATE + timedelta(days=_int(x))
+    if isinstance(type_, Boolean):
+        return lambda x: x != b"\x00"
+    if isinstance(type_, Integer):
+        return _int
+    if isinstance(type_, Float):
+        return _float
+    # JSONB is prefixed with a version number
+    if isinstance(type_, JSONB):
+        return lambda x: json.loads(x[1:])
+    if isinstance(type_, JSON):
+        return json.loads
+    raise NotImplementedError(f"Can't decode {type_!r} from a binary COPY")
+
+
+class _Incomplete(Exception):
+    pass
+
+
+class BinaryCopyDecoder:
+    """Decodes the rows of a COPY ... TO STDOUT (FORMAT binary) as it arrives.
+
+    The output of COPY carries no column names or types; they are taken from the
+    (SQLAlchemy) query.
+
+    Example:
+        >>> decoder = BinaryCopyDecoder.for_query(select(table))
+        >>> rows = decoder.feed(data)  # the complete rows in the data so far
+    """
+
+    def __init__(self, columns: list[tuple[str, Decoder]]):
+        self.names = [name for name, _ in columns]
+        self.decoders = [decode for _, decode in columns]
+        self.buffer = bytearray()
+        self.started = False
+        self.finished = False
+
+    @classmethod
+    def for_query(cls, query: Select) -> "BinaryCopyDecoder":
+        return cls([(x.name, decoder(x.type)) for x in query.selected_columns])
+
+    def _read_header(self) -> int:
+        """The size of the header, or 0 if it is incomplete"""
+        if len(self.buffer) < HEADER_SIZE:
+            return 0
+        if self.buffer[: len(SIGNATURE)] != SIGNATURE:
+            raise ValueError("Not a binary COPY")
+        (extension,) = _int32.unpack_from(self.buffer, HEADER_SIZE - 4)
+        if len(self.buffer) < HEADER_SIZE + extension:
+            return 0
+        self.started = True
+        return HEADER_SIZE + extension
+
+    def feed(self, data: bytes) -> list[dict[str, Any]]:
+        """The rows that are complete after adding `data`"""
+        self.buffer += data
+        pos = 0 if self.started else self._read_header()
+        if not self.started or self.finished:
+            return []
+        # slices of bytes are bytes, which is what the decoders take
+        buffer = bytes(self.buffer)
+        end = len(buffer)
+        names = self.names
+        decoders = self.decoders
+        unpack_int16 = _int16.unpack_from
+        unpack_int32 = _int32.unpack_from
+        rows = []
+        # an incomplete row raises, that happens (at most) once per call
+        try:
+            while True:
+                (count,) = unpack_int16(buffer, pos)
+                if count == TRAILER:
+                    self.finished = True
+                    pos += 2
+                    break
+                if count != len(decoders):
+                    raise ValueError(f"Expected {len(decoders)} fields, got {count}")
+                p = pos + 2
+                values: list[Any] = []
+                for decode in decoders:
+                    (length,) = unpack_int32(buffer, p)
+                    p += 4
+                    if length == NULL:
+                        values.append(None)
+                        continue
+                    stop = p + length
+                    if stop > end:
+                        raise _Incomplete()
+                    values.append(decode(buffer[p:stop]))
+                    p = stop
+                rows.append(dict(zip(names, values)))
+                pos = p
+        except (struct.error, _Incomplete):
+            pass
+        del self.buffer[:pos]
+        return rows
@@ -0,0 +1,140 @@
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Executable, String, Table, bindparam
+
+from src.core.gateway.sql.sql_builder import SQLBuilder
+from src.core.repository.base.filter import (
+    ComparisonFilter,
+    ComparisonOperator,
+    Filter,
+    TextSearchFilter,
+)
+from src.core.repository.base.pagination import PageOptions
+
+# With sequential scans disabled the planner still picks one if (and only if) no
+# index can be used, which makes the result independent of the table size
+DISABLE_SEQSCAN = "SET enable_seqscan = off"
+
+
+def _operator(filter: Filter) -> str:
+    if isinstance(filter, ComparisonFilter):
+        return filter.operator.value
+    if isinstance(filter, TextSearchFilter):
+        return "search"
+    return "eq" if len(filter.values) == 1 else "in"
+
+
+@dataclass(frozen=True)
+class FilterShape:
+    """The structure of a filtered select, leaving out the values.
+
+    Attributes:
+        table: The table name.
+        filters: (field, operator) per filter, where the operator is "eq" or "in"
+            for a plain Filter, "search" for a TextSearchFilter and the
+            ComparisonOperator otherwise.
+        order_by: The field to order by, if paginated.
+    """
+
+    table: str
+    filters: tuple[tuple[str, str], ...]
+    order_by: str | None = None
+
+    @classmethod
+    def of(
+        cls, table: str, filters: list[Filter], params: PageOptions | None = None
+    ) -> "FilterShape":
+        return cls(
+            table=table,
+            filters=tuple((x.field, _operator(x)) for x in filters),
+            order_by=None if params is None else params.order_by,
+        )
+
+    @classmethod
+    def from_dict(cls, value: dict[str, Any]) -> "FilterShape":
+        return cls(
+            table=value["table"],
+            filters=tuple((field, op) for field, op in value["filters"]),
+            order_by=value.get("order_by"),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "table": self.table,
+            "filters": [list(x) for x in self.filters],
+            "order_by": self.order_by,
+        }
+
+    def to_filters(self, table: Table) -> list[Filter]:
+        """Filters of this shape with (typed) bind parameters as values"""
+        result: list[Filter] = []
+        for field, operator in self.filters:
+            # a text search has a query (text), whatever the column type
+            type_ = String() if operator == "search" else table.c[field].type
+            values = [
+                bindparam(None, type_=type_)
+                for _ in range(2 if operator == "in" else 1)
+            ]
+            if operator in ("eq", "in"):
+                result.append(Filter(field=field, values=values))
+            elif operator == "search":
+                result.append(TextSearchFilter(field=field, values=values))
+            else:
+                result.append(
+                    ComparisonFilter(
+                        field=field,
+                        operator=ComparisonOperator(operator),
+                        values=values,
+                    )
+                )
+        return result
+
+    def query(self, table: Table) -> Executable:
+        """A statement to EXPLAIN (GENERIC_PLAN), it has no values"""
+        params = None if self.order_by is None else PageOptions(order_by=self.order_by)
+        return SQLBuilder(table).select(self.to_filters(table), params)
+
+
+def read_shapes(path: str | Path, limit: int | None = None) -> list[FilterShape]:
+    """The distinct shapes in a trace file (see Tracer.export), most recent first"""
+    shapes: dict[FilterShape, None] = {}
+    with open(path) as fp:
+        lines = fp.readlines()
+    for line in reversed(lines):
+        shape = json.loads(line).get("attributes", {}).get("filter_shape")
+        if shape is None:
+            continue
+        shapes.setdefault(FilterShape.from_dict(shape))
+        if limit is not None and len(shapes) >= limit:
+            break
+    return list(shapes)
+
+
+def explain(sql: str) -> str:
+    """EXPLAIN a statement with ($n) placeholders, without values"""
+    return f"EXPLAIN (GENERIC_PLAN, FORMAT JSON) {sql}"
+
+
+def full_scans(plan: Any) -> list[str]:
+    """The relations that are read entirely in an EXPLAIN (FORMAT JSON).
+
+    That is a sequential scan, or an index scan without an index condition (which
+    the planner falls back to when sequential scans are disabled).
+    """
+
+    def walk(node: dict[str, Any]) -> Iterator[str]:
+        node_type = node.get("Node Type")
+        if node_type == "Seq Scan" or (
+            node_type in ("Index Scan", "Index Only Scan") and "Index Cond" not in node
+        ):
+            yield node["Relation Name"]
+        for child in node.get("Plans", ()):
+            yield from walk(child)
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return [name for entry in plan for name in walk(entry["Plan"])]
@@ -0,0 +1,233 @@
+import hashlib
+import logging
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from uuid import UUID
+
+from src.core.domain.context import ctx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_THRESHOLD = 0.5  # seconds
+# upper bounds (in seconds) of the histogram buckets, the last bucket is unbounded
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DEFAULT_MAX_CORRELATION_IDS = 1000
+
+# a placeholder ($1, $1::INTEGER) or a list of them, as rendered for IN (...)
+PLACEHOLDER = r"\$\d+(?:::[\w\[\]]+)?"
+PLACEHOLDERS_REGEX = re.compile(rf"{PLACEHOLDER}(?:\s*,\s*{PLACEHOLDER})*")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """Identify the statement regardless of its parameters.
+
+    The SQL text is already stable per statement shape (see StatementCache), apart
+    from the number of placeholders in an IN list; those are collapsed.
+    """
+    normalized = PLACEHOLDERS_REGEX.sub("?", sql)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class QueryEvent:
+    """Timings (in seconds) of one executed statement.
+
+    Attributes:
+        sql: The rendered SQL.
+        fingerprint: Identifies the statement regardless of its parameters.
+        compile_time: Rendering the statement to SQL.
+        acquire_time: Waiting for a connection from the pool. Within a transaction
+            this is attributed to its first statement.
+        execute_time: Round trip to the database, including fetching the rows.
+        rows: The number of rows returned, or None if the statement failed.
+        correlation_id: ctx.correlation_id at the time of the statement.
+    """
+
+    sql: str
+    fingerprint: str
+    compile_time: float
+    acquire_time: float
+    execute_time: float
+    rows: int | None
+    correlation_id: UUID | None
+
+    @property
+    def duration(self) -> float:
+        return self.compile_time + self.acquire_time + self.execute_time
+
+    @property
+    def failed(self) -> bool:
+        return self.rows is None
+
+
+class QuerySink(ABC):
+    """Receives a QueryEvent for every statement executed by a SQLProvider"""
+
+    @abstractmethod
+    def record(self, event: QueryEvent) -> None:
+        pass
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket that holds the q-quantile"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and seen > 0:
+                return bound
+        return self.max
+
+
+@dataclass
+class StatementStats:
+    sql: str
+    duration: Histogram = field(default_factory=Histogram)
+    compile_time: float = 0.0
+    acquire_time: float = 0.0
+    execute_time: float = 0.0
+    rows: int = 0
+    errors: int = 0
+
+
+class QueryStats(QuerySink):
+    """Keeps in-process statistics.
+
+    Per statement fingerprint a histogram of the durations plus totals of the
+    individual timings, and per correlation id the number of statements (so the
+    number of queries of a use case can be checked). Only the most recent
+    `max_correlation_ids` correlation ids are kept.
+    """
+
+    def __init__(
+        self,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        max_correlation_ids: int = DEFAULT_MAX_CORRELATION_IDS,
+    ):
+        self.buckets = buckets
+        self.max_correlation_ids = max_correlation_ids
+        self.statements: dict[str, StatementStats] = {}
+        self.query_counts: OrderedDict[UUID | None, int] = OrderedDict()
+
+    def record(self, event: QueryEvent) -> None:
+        stats = self.statements.get(event.fingerprint)
+        if stats is None:
+            stats = self.statements[event.fingerprint] = StatementStats(
+                sql=event.sql, duration=Histogram(self.buckets)
+            )
+        stats.duration.observe(event.duration)
+        stats.compile_time += event.compile_time
+        stats.acquire_time += event.acquire_time
+        stats.execute_time += event.execute_time
+        if event.failed:
+            stats.errors += 1
+        else:
+            stats.rows += event.rows  # type: ignore
+
+        key = event.correlation_id
+        self.query_counts[key] = self.query_counts.pop(key, 0) + 1
+        if len(self.query_counts) > self.max_correlation_ids:
+            self.query_counts.popitem(last=False)
+
+    def query_count(self, correlation_id: UUID | None) -> int:
+        return self.query_counts.get(correlation_id, 0)
+
+    def slowest(self, n: int = 10) -> list[StatementStats]:
+        """The statements that took the most time in total"""
+        return sorted(
+            self.statements.values(), key=lambda x: x.duration.total, reverse=True
+        )[:n]
+
+    def clear(self) -> None:
+        self.statements.clear()
+        self.query_counts.clear()
+
+
+class SlowQueryLog(QuerySink):
+    """Logs a warning for every statement that takes longer than `threshold`"""
+
+    def __init__(self, threshold: float = DEFAULT_SLOW_QUERY_THRESHOLD):
+        self.threshold = threshold
+
+    def record(self, event: QueryEvent) -> None:
+        if event.duration < self.threshold:
+            return
+        logger.warning(
+            "slow query %s: %.1f ms (compile %.1f ms, acquire %.1f ms, "
+            "execute %.1f ms), rows=%s, correlation_id=%s\n%s",
+            event.fingerprint,
+            event.duration * 1000,
+            event.compile_time * 1000,
+            event.acquire_time * 1000,
+            event.execute_time * 1000,
+            event.rows,
+            event.correlation_id,
+            event.sql,
+        )
+
+
+class Instrumentation:
+    """Passes the timings of every statement to the sinks.
+
+    Example:
+        >>> stats = QueryStats()
+        >>> db = AsyncpgSQLDatabase(url, instrumentation=Instrumentation(
+        ...     [stats, SlowQueryLog(threshold=0.2)]
+        ... ))
+    """
+
+    def __init__(self, sinks: Iterable[QuerySink] = ()):
+        self.sinks = list(sinks)
+
+    def record(
+        self,
+        sql: str,
+        *,
+        compile_time: float = 0.0,
+        acquire_time: float = 0.0,
+        execute_time: float = 0.0,
+        rows: int | None = None,
+    ) -> None:
+        event = QueryEvent(
+            sql=sql,
+            fingerprint=fingerprint(sql),
+            compile_time=compile_time,
+            acquire_time=acquire_time,
+            execute_time=execute_time,
+            rows=rows,
+            correlation_id=ctx.correlation_id,
+        )
+        for sink in self.sinks:
+            try:
+                sink.record(event)
+            except Exception:
+                # instrumentation must never break a query
+                logger.exception("query sink %r failed", sink)
@@ -0,0 +1,75 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any
+from uuid import UUID
+
+from sqlalchemy import Column, Table
+
+if TYPE_CHECKING:
+    from src.core.gateway.sql.sql_gateway import SQLGateway
+
+
+def _json_decoder(column: Column) -> Callable[[Any], Any] | None:
+    """Converts a JSON value back to what the driver returns for `column`"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if issubclass(python_type, datetime):
+        return datetime.fromisoformat
+    if issubclass(python_type, date):
+        return date.fromisoformat
+    if issubclass(python_type, time):
+        return time.fromisoformat
+    if issubclass(python_type, UUID):
+        return UUID
+    if issubclass(python_type, Decimal):
+        return lambda x: Decimal(str(x))
+    return None
+
+
+@dataclass(frozen=True)
+class OneToMany:
+    """A one-to-many relation that is loaded together with the parent rows.
+
+    SQLBuilder.select aggregates the related rows into a JSON array column
+    (json_agg), so no second query is needed to fetch them.
+
+    Attributes:
+        field_name: The key in a parent record holding the list of related records.
+        gateway: The SQLGateway of the related records.
+        fk_name: The column of the related table that refers to the parent's id.
+        order_by: The column to order the related records by.
+
+    Example:
+        >>> class AuthorSQLGateway(
+        ...     SQLGateway,
+        ...     table=author,
+        ...     relations=[OneToMany("books", BookSQLGateway, "author_id")],
+        ... ):
+        ...     pass
+    """
+
+    field_name: str
+    gateway: type["SQLGateway"]
+    fk_name: str
+    order_by: str = "id"
+
+    @property
+    def table(self) -> Table:
+        return self.gateway.table
+
+    def decode(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Restore the column types that got lost in the JSON aggregate"""
+        decoders = [
+            (column.key, decoder)
+            for column in self.table.c
+            if (decoder := _json_decoder(column)) is not None
+        ]
+        for row in rows:
+            for key, decoder in decoders:
+                if row.get(key) is not None:
+                    row[key] = decoder(row[key])
+        return rows
@@ -1,25 +1,56 @@
+from collections.abc import Collection, Sequence
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 from uuid import UUID
 
 from sqlalchemy import (
     Executable,
+    Index,
     Table,
+    UniqueConstraint,
     and_,
+    any_,
     asc,
+    cast,
+    column,
     delete,
     desc,
     func,
+    literal,
+    literal_column,
+    or_,
     select,
     true,
+    tuple_,
     update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import (
+    ARRAY,
+    JSON,
+    REGCONFIG,
+    TSVECTOR,
+    aggregate_order_by,
+    insert,
 )
-from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql.expression import ColumnElement, ColumnOperators, false
 
 from src.core.domain.context import ctx
-from src.core.repository.base.filter import ComparisonFilter, ComparisonOperator, Filter
-from src.core.repository.base.pagination import PageOptions
+from src.core.gateway.sql.relation import OneToMany
+from src.core.repository.base.filter import (
+    ComparisonFilter,
+    ComparisonOperator,
+    Filter,
+    TextSearchFilter,
+)
+from src.core.repository.base.pagination import PageOptions, decode_cursor
+
+# Label of the window count column added by SQLBuilder.select(with_total=True)
+TOTAL_COLUMN = "_total"
+# Labels of the count and of the grouping set bitmask in SQLBuilder.facets
+FACET_COUNT_COLUMN = "_count"
+GROUPING_COLUMN = "_grouping"
 
 
 def _regular_filter_to_sql(column: ColumnElement, filter: Filter) -> ColumnElement:
@@ -42,18 +73,103 @@ comparitor_map = {
 }
 
 
+def _tsquery(filter: TextSearchFilter) -> ColumnElement:
+    return func.websearch_to_tsquery(
+        cast(literal(filter.language), REGCONFIG), filter.values[0]
+    )
+
+
+def _tsvector(column: ColumnElement, filter: TextSearchFilter) -> ColumnElement:
+    if isinstance(column.type, TSVECTOR):
+        return column
+    return func.to_tsvector(cast(literal(filter.language), REGCONFIG), column)
+
+
+def _text_search_filter_to_sql(
+    column: ColumnElement, filter: TextSearchFilter
+) -> ColumnElement:
+    if len(filter.values) != 1:
+        return false()
+    return _tsvector(column, filter).op("@@")(_tsquery(filter))
+
+
+# Escapes % and _ in prefixes and substrings
+LIKE_ESCAPE = "/"
+
+
+def _escape_like(value: str) -> str:
+    for char in (LIKE_ESCAPE, "%", "_"):
+        value = value.replace(char, LIKE_ESCAPE + char)
+    return value
+
+
+def _pattern_filter_to_sql(
+    column: ColumnElement, filter: ComparisonFilter
+) -> ColumnElement:
+    value = filter.values[0]
+    if filter.operator == ComparisonOperator.ILIKE or not isinstance(value, str):
+        # a pattern as is, or a bind parameter for it (see index_advisor)
+        return column.ilike(value)
+    # one bind parameter holding the whole pattern, so a pg_trgm index can use it
+    pattern = _escape_like(value) + "%"
+    if filter.operator == ComparisonOperator.CONTAINS:
+        pattern = "%" + pattern
+    return column.ilike(pattern, escape=LIKE_ESCAPE)
+
+
 def _comparison_filter_to_sql(
     column: ColumnElement, filter: ComparisonFilter
 ) -> ColumnElement:
+    if filter.operator not in comparitor_map:
+        return _pattern_filter_to_sql(column, filter)
     return column.operate(comparitor_map[filter.operator], filter.values[0])
 
 
+@dataclass(frozen=True)
+class UniqueKey:
+    """The columns of a unique index or constraint, other than the primary key.
+
+    Attributes:
+        name: The name of the index or constraint.
+        columns: The column names.
+        where: The predicate of a partial unique index.
+    """
+
+    name: str
+    columns: tuple[str, ...]
+    where: ColumnElement | None = None
+
+
+def unique_keys(table: Table) -> list[UniqueKey]:
+    """The unique keys of a table, in order of their names"""
+    result = []
+    for x in [*table.indexes, *table.constraints]:
+        if isinstance(x, Index) and x.unique:
+            where = x.dialect_options["postgresql"]["where"]
+        elif isinstance(x, UniqueConstraint):
+            where = None
+        else:
+            continue
+        result.append(UniqueKey(str(x.name), tuple(c.name for c in x.columns), where))
+    return sorted(result, key=lambda x: x.name)
+
+
 class SQLBuilder:
-    def __init__(self, table: Table, multitenant: bool = False):
+    def __init__(
+        self,
+        table: Table,
+        multitenant: bool = False,
+        relations: Sequence[OneToMany] = (),
+    ):
         if multitenant and not hasattr(table.c, "tenant"):
             raise ValueError("Can't use a multitenant SQLBuilder without tenant column")
         self.table = table
+        # columns that only exist to filter on (e.g. a generated tsvector) are not
+        # returned
+        self.columns = [x for x in table.c if not x.info.get("filter_only")]
         self.multitenant = multitenant
+        self.relations = {x.field_name: x for x in relations}
+        self.unique_keys = unique_keys(table)
 
     @property
     def current_tenant(self) -> UUID | None:
@@ -70,6 +186,8 @@ class SQLBuilder:
             return false()
         if isinstance(filter, ComparisonFilter):
             return _comparison_filter_to_sql(column, filter)
+        elif isinstance(filter, TextSearchFilter):
+            return _text_search_filter_to_sql(column, filter)
         else:
             return _regular_filter_to_sql(column, filter)
 
@@ -83,7 +201,7 @@ class SQLBuilder:
         return self._filters_to_sql([Filter(field="id", values=[id])])
 
     def _santize_item(self, item: dict[str, Any]) -> dict[str, Any]:
-        known = {c.key for c in self.table.c}
+        known = {c.key for c in self.columns}
         result = {k: item[k] for k in item.keys() if k in known}
         if "id" in result and result["id"] is None:
             del result["id"]
@@ -91,37 +209,247 @@ class SQLBuilder:
             result["tenant"] = self.current_tenant
         return result
 
+    def _seek_to_sql(self, params: PageOptions) -> ColumnElement:
+        """Keyset predicate selecting the rows after the cursor position.
+
+        Rows are ordered by (order_by, id); NULLs sort last when ascending and
+        first when descending, like PostgreSQL does.
+        """
+        assert params.cursor is not None
+        cursor = decode_cursor(params.cursor, params.order_by)
+        id_column = self.table.c.id
+        if params.order_by == "id":
+            return id_column > cursor.id if params.ascending else id_column < cursor.id
+        column = getattr(self.table.c, params.order_by)
+        if cursor.value is None:
+            after = id_column > cursor.id if params.ascending else id_column < cursor.id
+            q = and_(column.is_(None), after)
+            return q if params.ascending else or_(q, column.is_not(None))
+        if params.ascending:
+            q = tuple_(column, id_column) > tuple_(cursor.value, cursor.id)
+            return or_(q, column.is_(None)) if column.nullable else q
+        return tuple_(column, id_column) < tuple_(cursor.value, cursor.id)
+
+    def _rank_to_sql(self, filters: list[Filter]) -> ColumnElement:
+        for filter in filters:
+            if isinstance(filter, TextSearchFilter) and filter.field in self.table.c:
+                column = _tsvector(self.table.c[filter.field], filter)
+                return func.ts_rank(column, _tsquery(filter))
+        raise ValueError("Ordering by rank requires a TextSearchFilter")
+
+    def _relation_to_sql(self, relation: OneToMany) -> ColumnElement:
+        # the alias allows relations of a table to itself
+        related = relation.table.alias(relation.field_name)
+        rows = func.json_agg(
+            aggregate_order_by(related.table_valued(), related.c[relation.order_by]),
+            type_=JSON,
+        )
+        return (
+            select(func.coalesce(rows, literal_column("'[]'"), type_=JSON))
+            .where(related.c[relation.fk_name] == self.table.c.id)
+            .scalar_subquery()
+            .label(relation.field_name)
+        )
+
+    def _column(self, name: str) -> Any:
+        if name in self.relations:
+            return self._relation_to_sql(self.relations[name])
+        try:
+            return self.table.c[name]
+        except KeyError:
+            raise ValueError(f"Unknown field: {name}")
+
+    def _columns(self, params: PageOptions | None) -> list[Any]:
+        projection = params.projection() if params is not None else None
+        if projection is None:
+            return [*self.columns, *map(self._relation_to_sql, self.relations.values())]
+        return [self._column(x) for x in projection]
+
+    def _ids_to_sql(self, ids: list[Any]) -> ColumnElement:
+        # a single array parameter (= ANY), whatever the number of ids
+        q = self.table.c.id == any_(literal(ids, ARRAY(self.table.c.id.type)))
+        if self.multitenant:
+            q &= self.table.c.tenant == self.current_tenant
+        return q
+
     def select(
         self,
         filters: list[Filter],
         params: PageOptions | None = None,
         for_update: bool = False,
+        with_total: bool = False,
     ) -> Executable:
-        query = select(self.table)
+        """SELECT the rows matching `filters`.
+
+        Only the columns in `params.projection()` are selected, if given. With
+        `with_total`, every row gets a `TOTAL_COLUMN` with the number of
+        rows matching the WHERE clause (before LIMIT/OFFSET), so that a page and
+        its total need a single round trip. Relations are selected as a JSON
+        array of related rows per row.
+        """
+        columns = self._columns(params)
+        if with_total:
+            columns.append(func.count().over().label(TOTAL_COLUMN))
+        query = select(*columns)
         if for_update:
             query = query.with_for_update()
         query = query.where(self._filters_to_sql(filters))
         if params is not None:
-            sort = asc(params.order_by) if params.ascending else desc(params.order_by)
-            query = query.order_by(sort).limit(params.limit).offset(params.offset)
+            direction = asc if params.ascending else desc
+            sort: list[Any] = [direction(params.order_by)]
+            if params.order_by != "id":
+                sort.append(direction("id"))  # tie-breaker for a stable order
+            if params.rank:
+                sort.insert(0, desc(self._rank_to_sql(filters)))
+            query = query.order_by(*sort).limit(params.limit)
+            if params.cursor is not None:
+                if params.rank:
+                    raise ValueError("Can't use a cursor when ordering by rank")
+                query = query.where(self._seek_to_sql(params))
+            else:
+                query = query.offset(params.offset)
         return query
 
+    def distinct(
+        self, field: str, filters: list[Filter], limit: int | None = None
+    ) -> Executable:
+        """SELECT the distinct, non-null values of a column in alphabetical order"""
+        if field not in {c.key for c in self.columns}:
+            raise ValueError(f"Unknown field: {field}")
+        column = self.table.c[field]
+        query = (
+            select(column)
+            .distinct()
+            .where(self._filters_to_sql(filters), column.is_not(None))
+            .order_by(column)
+        )
+        return query if limit is None else query.limit(limit)
+
+    def facets(self, filters: list[Filter], fields: list[str]) -> Executable:
+        """Counts per value of each field, in a single GROUPING SETS aggregate.
+
+        A row has the count (`FACET_COUNT_COLUMN`) of a value of one of the
+        fields, most frequent first. In `GROUPING_COLUMN` the bit of that field
+        is 0 and the others are 1, where the first field is the most significant
+        bit.
+        """
+        known = {c.key for c in self.columns}
+        for field in fields:
+            if field not in known:
+                raise ValueError(f"Unknown field: {field}")
+        columns = [self.table.c[x] for x in fields]
+        return (
+            select(
+                *columns,
+                func.count().label(FACET_COUNT_COLUMN),
+                func.grouping(*columns).label(GROUPING_COLUMN),
+            )
+            .where(self._filters_to_sql(filters))
+            .group_by(func.grouping_sets(*[tuple_(x) for x in columns]))
+            .order_by(desc(FACET_COUNT_COLUMN))
+        )
+
+    def select_many(self, ids: list[Any]) -> Executable:
+        """SELECT the rows with these ids"""
+        return select(*self._columns(None)).where(self._ids_to_sql(ids))
+
     def insert(self, item: dict[str, Any]) -> Executable:
         return (
-            insert(self.table).values(**self._santize_item(item)).returning(self.table)
+            insert(self.table)
+            .values(**self._santize_item(item))
+            .returning(*self.columns)
         )
 
-    def upsert(self, item: dict[str, Any]) -> Executable:
-        item = self._santize_item(item)
+    def insert_many(self, items: list[dict[str, Any]]) -> Executable:
+        """Multi-row INSERT; all items must have the same keys"""
         return (
             insert(self.table)
-            .values(**item)
-            .on_conflict_do_update(
+            .values([self._santize_item(x) for x in items])
+            .returning(*self.columns)
+        )
+
+    def copy_rows(self, items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """The rows for a COPY of `items`, all with the same columns.
+
+        A COPY does not apply the (Python) column defaults like an INSERT does, so
+        they are filled in here.
+        """
+        items = [self._santize_item(x) for x in items]
+        keys = {k for x in items for k in x}
+        defaults: dict[str, Any] = {
+            x.key: x.default
+            for x in self.columns
+            if x.default is not None and (x.default.is_callable or x.default.is_scalar)
+        }
+        columns = [
+            x.key
+            for x in self.columns
+            if x.computed is None and (x.key in keys or x.key in defaults)
+        ]
+        result = []
+        for item in items:
+            row = {}
+            for key in columns:
+                if key in item:
+                    row[key] = item[key]
+                elif key in defaults:
+                    default = defaults[key]
+                    # callables are wrapped to take the execution context
+                    row[key] = default.arg(None) if default.is_callable else default.arg
+                else:
+                    row[key] = None
+            result.append(row)
+        return result
+
+    def _on_key_conflict(
+        self, query: Any, keys: list[str], key: UniqueKey, keep: Collection[str]
+    ) -> Executable:
+        kept = {"id", "created_at", *key.columns, *keep}
+        # DO NOTHING would not return the existing row
+        columns = [k for k in keys if k not in kept] or key.columns[:1]
+        return query.on_conflict_do_update(
+            index_elements=list(key.columns),
+            index_where=key.where,
+            set_={k: query.excluded[k] for k in columns},
+        ).returning(*self.columns)
+
+    def upsert(
+        self,
+        item: dict[str, Any],
+        key: UniqueKey | None = None,
+        keep: Collection[str] = (),
+    ) -> Executable:
+        """INSERT ... ON CONFLICT DO UPDATE on the id, or on a unique `key`.
+
+        On a conflict on `key` the existing record keeps its id, created_at and the
+        columns in `keep`; the other columns in `item` are updated.
+        """
+        item = self._santize_item(item)
+        query = insert(self.table).values(**item)
+        if key is None:
+            return query.on_conflict_do_update(
                 index_elements=["id", "tenant"] if self.multitenant else ["id"],
                 set_=item,
-            )
-            .returning(self.table)
-        )
+            ).returning(*self.columns)
+        return self._on_key_conflict(query, list(item), key, keep)
+
+    def upsert_many(
+        self,
+        items: list[dict[str, Any]],
+        key: UniqueKey | None = None,
+        keep: Collection[str] = (),
+    ) -> Executable:
+        """Multi-row INSERT ... ON CONFLICT DO UPDATE (see upsert); all items must
+        have the same keys and every id (or value of `key`) may occur only once.
+        """
+        rows = [self._santize_item(x) for x in items]
+        query = insert(self.table).values(rows)
+        if key is None:
+            return query.on_conflict_do_update(
+                index_elements=["id", "tenant"] if self.multitenant else ["id"],
+                set_={k: query.excluded[k] for k in rows[0]},
+            ).returning(*self.columns)
+        return self._on_key_conflict(query, list(rows[0]), key, keep)
 
     def update(
         self, id: UUID, item: dict[str, Any], if_unmodified_since: datetime | None
@@ -133,7 +461,48 @@ class SQLBuilder:
             update(self.table)
             .where(q)
             .values(**self._santize_item(item))
-            .returning(self.table)
+            .returning(*self.columns)
+        )
+
+    def update_many(self, items: list[dict[str, Any]]) -> Executable:
+        """UPDATE ... FROM (VALUES ...) by id; all items must have the same keys"""
+        rows = [self._santize_item(x) for x in items]
+        keys = list(rows[0])
+        data = values(
+            *(column(k, self.table.c[k].type) for k in keys), name="data"
+        ).data([tuple(x[k] for k in keys) for x in rows])
+        q = self.table.c.id == data.c.id
+        if self.multitenant:
+            q &= self.table.c.tenant == self.current_tenant
+        # a column with only NULLs in VALUES would be typed as text
+        set_ = {k: cast(data.c[k], self.table.c[k].type) for k in keys if k != "tenant"}
+        return update(self.table).where(q).values(set_).returning(*self.columns)
+
+    def patch(
+        self, id: UUID, values: dict[str, Any], if_unmodified_since: datetime | None
+    ) -> Executable:
+        """UPDATE only the columns in `values`, and set updated_at to now()"""
+        q = self._id_filter_to_sql(id)
+        if if_unmodified_since is not None:
+            q &= self.table.c.updated_at == if_unmodified_since
+        values = self._santize_item(values)
+        values.pop("id", None)
+        if "updated_at" in self.table.c and "updated_at" not in values:
+            values["updated_at"] = func.now()
+        return update(self.table).where(q).values(**values).returning(*self.columns)
+
+    def update_where(self, filters: list[Filter], values: dict[str, Any]) -> Executable:
+        """UPDATE the columns in `values` of the rows matching `filters`, like patch"""
+        values = self._santize_item(values)
+        values.pop("id", None)
+        values.pop("tenant", None)
+        if "updated_at" in self.table.c and "updated_at" not in values:
+            values["updated_at"] = func.now()
+        return (
+            update(self.table)
+            .where(self._filters_to_sql(filters))
+            .values(**values)
+            .returning(self.table.c.id)
         )
 
     def delete(self, id: UUID) -> Executable:
@@ -143,6 +512,20 @@ class SQLBuilder:
             .returning(self.table.c.id)
         )
 
+    def delete_many(self, ids: list[Any]) -> Executable:
+        """DELETE the rows with these ids"""
+        return (
+            delete(self.table).where(self._ids_to_sql(ids)).returning(self.table.c.id)
+        )
+
+    def delete_where(self, filters: list[Filter]) -> Executable:
+        """DELETE all rows matching `filters`"""
+        return (
+            delete(self.table)
+            .where(self._filters_to_sql(filters))
+            .returning(self.table.c.id)
+        )
+
     def count(self, filters: list[Filter]) -> Executable:
         return (
             select(func.count().label("count"))
@@ -1,4 +1,4 @@
-from collections.abc import AsyncIterator, Callable
+from collections.abc import AsyncIterator, Callable, Collection, Mapping, Sequence
 from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Any, TypeVar
@@ -9,20 +9,37 @@ from sqlalchemy import Table
 from sqlalchemy.sql import Executable
 
 from src.core.domain.exceptions import Conflict, DoesNotExist
-from src.core.gateway.sql.sql_builder import SQLBuilder
+from src.core.gateway.sql.index_advisor import FilterShape
+from src.core.gateway.sql.relation import OneToMany
+from src.core.gateway.sql.sql_builder import (
+    FACET_COUNT_COLUMN,
+    GROUPING_COLUMN,
+    TOTAL_COLUMN,
+    SQLBuilder,
+    UniqueKey,
+)
 from src.core.gateway.sql.sql_provider import SQLDatabase, SQLProvider
 from src.core.repository.base.filter import Filter
-from src.core.repository.base.gateway import Gateway
+from src.core.repository.base.gateway import DEFAULT_CHUNK_SIZE, Gateway
 from src.core.repository.base.mapper import Mapper
 from src.core.repository.base.pagination import PageOptions
+from src.core.tracing import tracer
 
 T = TypeVar("T", bound="SQLGateway")
+R = TypeVar("R")
+
+# PostgreSQL accepts at most this many bind parameters in one statement
+MAX_BIND_PARAMS = 32767
+DEFAULT_BATCH_SIZE = 1000
 
 
 class SQLGateway(Gateway):
     table: Table
     multitenant: bool
     has_related: bool
+    # whether get_related must run (in a transaction) after reading records
+    reads_related: bool
+    relations: tuple[OneToMany, ...]
     mapper: Mapper = Mapper()
 
     def __init__(
@@ -32,40 +49,71 @@ class SQLGateway(Gateway):
     ):
         self.provider_override = provider_override
         self.nested = nested
-        self.builder = SQLBuilder(self.table, self.multitenant)
+        self.builder = SQLBuilder(self.table, self.multitenant, self.relations)
 
     @property
     def provider(self):
         return self.provider_override or inject.instance(SQLDatabase)
 
     def __init_subclass__(
-        cls, table: Table, multitenant: bool = False, has_related: bool = False
+        cls,
+        table: Table,
+        multitenant: bool = False,
+        has_related: bool = False,
+        relations: Sequence[OneToMany] = (),
     ) -> None:
         cls.table = table
         if multitenant and not hasattr(table.c, "tenant"):
             raise ValueError("Can't use a multitenant SQLGateway without tenant column")
+        if any(x.gateway.multitenant for x in relations):
+            raise ValueError("Can't use relations to a multitenant SQLGateway")
         cls.multitenant = multitenant
-        cls.has_related = has_related
+        cls.relations = tuple(relations)
+        # relations are read by the SELECT itself and written by set_related
+        cls.reads_related = has_related
+        cls.has_related = has_related or bool(relations)
         super().__init_subclass__()
 
     @asynccontextmanager
-    async def transaction(self: T) -> AsyncIterator[T]:
+    async def transaction(self: T, readonly: bool = False) -> AsyncIterator[T]:
         if self.nested:
             yield self
         else:
-            async with self.provider.transaction() as provider:
+            async with self.provider.transaction(readonly=readonly) as provider:
                 yield self.__class__(provider, nested=True)
 
     async def get_related(self, items: list[dict[str, Any]]) -> None:
         """Implement this to use transactions for consistently getting nested records"""
 
     async def set_related(self, item: dict[str, Any], result: dict[str, Any]) -> None:
-        """Implement this to use transactions for consistently setting nested records"""
+        """Implement this to use transactions for consistently setting nested records
 
+        By default this sets the `relations` that are present in `item`.
+        """
+        for relation in self.relations:
+            if relation.field_name in item:
+                related = relation.gateway(self.provider, nested=True)
+                await related._set_related_one_to_many(
+                    item, result, relation.field_name, relation.fk_name
+                )
+
+    async def _map(self, rows: Sequence[Mapping[str, Any]]) -> list[dict[str, Any]]:
+        result = await self.mapper.map_internal(rows)
+        if not rows:
+            return result
+        keys = rows[0].keys()
+        for relation in self.relations:
+            if relation.field_name not in keys:  # e.g. not in a projection
+                continue
+            mapper = relation.gateway.mapper
+            for row, record in zip(rows, result):
+                related = relation.decode(list(row[relation.field_name]))
+                record[relation.field_name] = await mapper.map_internal(related)
+        return result
+
+    @tracer.traced("db")
     async def execute(self, query: Executable) -> list[dict[str, Any]]:
-        return [
-            await self.mapper.to_internal(x) for x in await self.provider.execute(query)
-        ]
+        return await self._map(await self.provider.fetch(query))
 
     async def add(self, item: dict[str, Any]) -> dict[str, Any]:
         query = self.builder.insert(await self.mapper.to_external(item))
@@ -77,6 +125,58 @@ class SQLGateway(Gateway):
             (result,) = await self.execute(query)
         return result
 
+    def _batches(self, items: list[R], batch_size: int | None) -> list[list[R]]:
+        size = min(
+            batch_size or DEFAULT_BATCH_SIZE,
+            MAX_BIND_PARAMS // len(self.table.c),
+        )
+        return [items[i : i + size] for i in range(0, len(items), size)]
+
+    async def _execute_many(
+        self,
+        items: list[dict[str, Any]],
+        build: Callable[[list[dict[str, Any]]], Executable],
+        batch_size: int | None,
+    ) -> list[dict[str, Any]]:
+        """Execute multi-row statements in batches, in a single transaction.
+
+        Items with different keys go in different statements.
+        """
+        if not items:
+            return []
+        external = await self.mapper.map_external(items)
+        groups: dict[frozenset[str], list[int]] = {}
+        for i, x in enumerate(external):
+            keys = frozenset(k for k, v in x.items() if k != "id" or v is not None)
+            groups.setdefault(keys, []).append(i)
+        with_ids = all(x.get("id") is not None for x in items)
+        result: list[dict[str, Any]] = [{}] * len(items)
+        async with self.transaction() as transaction:
+            for indices in groups.values():
+                for batch in self._batches(indices, batch_size):
+                    rows = await transaction.execute(
+                        build([external[i] for i in batch])
+                    )
+                    if with_ids:
+                        # RETURNING does not guarantee the order of the VALUES list
+                        result_lut = {x["id"]: x for x in rows}
+                        for i in batch:
+                            # e.g. an UPDATE of a record that was deleted
+                            if items[i]["id"] not in result_lut:
+                                raise DoesNotExist("record", items[i]["id"])
+                        rows = [result_lut[items[i]["id"]] for i in batch]
+                    for i, row in zip(batch, rows):
+                        result[i] = row
+            if self.has_related:
+                for item, row in zip(items, result):
+                    await transaction.set_related(item, row)
+        return result
+
+    async def add_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        return await self._execute_many(items, self.builder.insert_many, batch_size)
+
     async def update(
         self, item: dict[str, Any], if_unmodified_since: datetime | None = None
     ) -> dict[str, Any]:
@@ -94,10 +194,33 @@ class SQLGateway(Gateway):
         else:
             result = await self.execute(query)
         if not result:
-            if if_unmodified_since is not None:
-                if await self.exists([Filter.for_id(id_)]):
-                    raise Conflict()
-            raise DoesNotExist("record", id_)
+            await self._raise_not_updated(id_, if_unmodified_since)
+        return result[0]
+
+    async def _raise_not_updated(
+        self, id: Any, if_unmodified_since: datetime | None
+    ) -> None:
+        # an UPDATE matched no row: tell a missing record from a modified one
+        if if_unmodified_since is not None:
+            if await self.exists([Filter.for_id(id)]):
+                raise Conflict()
+        raise DoesNotExist("record", id)
+
+    async def patch(
+        self,
+        id: Any,
+        values: dict[str, Any],
+        if_unmodified_since: datetime | None = None,
+    ) -> dict[str, Any]:
+        if self.has_related:
+            # related records are set by update()
+            return await super().patch(id, values, if_unmodified_since)
+        external = (await self.mapper.map_external([values]))[0]
+        result = await self.execute(
+            self.builder.patch(id, external, if_unmodified_since)
+        )
+        if not result:
+            await self._raise_not_updated(id, if_unmodified_since)
         return result[0]
 
     async def _select_for_update(self, id: UUID) -> dict[str, Any]:
@@ -129,27 +252,257 @@ class SQLGateway(Gateway):
             result = await self.execute(query)
         return result[0]
 
+    def _natural_key(self, external: dict[str, Any]) -> UniqueKey | None:
+        present = {k for k, v in external.items() if v is not None}
+        if self.multitenant:
+            present.add("tenant")
+        return next(
+            (x for x in self.builder.unique_keys if present.issuperset(x.columns)),
+            None,
+        )
+
+    async def ingest(
+        self, item: dict[str, Any], keep: Collection[str] = ()
+    ) -> dict[str, Any]:
+        """In a single statement, so concurrent ingests of a record can't conflict.
+
+        The natural key is the first unique key (see SQLBuilder.unique_keys) with a
+        value for all its columns in the item; without one the item is added.
+        """
+        external = await self.mapper.to_external(item)
+        key = self._natural_key(external)
+        if key is None:
+            return await self.add(item)
+        query = self.builder.upsert(external, key=key, keep=keep)
+        if self.has_related:
+            async with self.transaction() as transaction:
+                result = await transaction.execute(query)
+                await transaction.set_related(item, result[0])
+        else:
+            result = await self.execute(query)
+        return result[0]
+
+    async def ingest_many(
+        self,
+        items: list[dict[str, Any]],
+        keep: Collection[str] = (),
+        batch_size: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Like ingest, with multi-row statements in batches, in a single transaction.
+
+        A statement can't update a row twice, so of the items with the same natural
+        key only the last one is ingested. The result is not in the order of
+        `items`.
+        """
+        if self.has_related or not items:
+            return await super().ingest_many(items, keep=keep, batch_size=batch_size)
+        external = await self.mapper.map_external(items)
+        new = []
+        # (natural key, item keys) -> natural key values -> item
+        groups: dict[tuple[UniqueKey, frozenset[str]], dict[Any, dict[str, Any]]] = {}
+        for item, x in zip(items, external):
+            key = self._natural_key(x)
+            if key is None:
+                new.append(item)
+            else:
+                values = tuple(x.get(c) for c in key.columns)
+                groups.setdefault((key, frozenset(x)), {})[values] = x
+        result = []
+        async with self.transaction() as transaction:
+            if new:
+                result.extend(await transaction.add_many(new, batch_size=batch_size))
+            for (key, _), rows in groups.items():
+                for batch in self._batches(list(rows.values()), batch_size):
+                    query = self.builder.upsert_many(batch, key=key, keep=keep)
+                    result.extend(await transaction.execute(query))
+        return result
+
+    async def copy_in(self, items: list[dict[str, Any]]) -> int:
+        """Insert records with a binary COPY, which is faster than add_many.
+
+        Nothing is returned and related records are not set (for that this falls
+        back to add_many).
+        """
+        if self.has_related or not items:
+            return await super().copy_in(items)
+        external = await self.mapper.map_external(items)
+        return await self.provider.copy_in(self.table, self.builder.copy_rows(external))
+
+    async def upsert_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        if any(x.get("id") is None for x in items):
+            return await super().upsert_many(items, batch_size)
+        # ON CONFLICT can't update a row twice in a statement: of the items with
+        # the same id the last one wins (like ingest_many does per natural key)
+        unique = list({x["id"]: x for x in items}.values())
+        result = await self._execute_many(unique, self.builder.upsert_many, batch_size)
+        if len(unique) == len(items):
+            return result
+        result_lut = {x["id"]: x for x in result}
+        return [result_lut[x["id"]] for x in items]
+
     async def remove(self, id: UUID) -> bool:
         return bool(await self.execute(self.builder.delete(id)))
 
+    async def update_where(
+        self, filters: list[Filter], values: dict[str, Any]
+    ) -> list[Any]:
+        if self.has_related:
+            # related records are set by update()
+            return await super().update_where(filters, values)
+        external = (await self.mapper.map_external([values]))[0]
+        result = await self.execute(self.builder.update_where(filters, external))
+        return [x["id"] for x in result]
+
+    async def remove_where(self, filters: list[Filter]) -> list[Any]:
+        result = await self.execute(self.builder.delete_where(filters))
+        return [x["id"] for x in result]
+
+    def _project(
+        self, records: list[dict[str, Any]], params: PageOptions | None
+    ) -> list[dict[str, Any]]:
+        # mappers may fill in the fields that were not selected
+        projection = params.projection() if params is not None else None
+        if projection is None:
+            return records
+        return [{k: x[k] for k in projection if k in x} for x in records]
+
+    def _trace_shape(self, filters: list[Filter], params: PageOptions | None) -> None:
+        # recorded for the index advisor (see manage.py index-advisor)
+        if tracer.enabled:
+            shape = FilterShape.of(self.table.name, filters, params)
+            tracer.annotate(filter_shape=shape.to_dict())
+
     async def filter(
         self, filters: list[Filter], params: PageOptions | None = None
     ) -> list[dict[str, Any]]:
+        self._trace_shape(filters, params)
         query = self.builder.select(filters, params)
-        if self.has_related:
+        if self.reads_related:
             async with self.transaction() as transaction:
-                result = await transaction.execute(query)
+                result = self._project(await transaction.execute(query), params)
                 await transaction.get_related(result)
         else:
-            result = await self.execute(query)
+            result = self._project(await self.execute(query), params)
         return result
 
+    async def get_many(
+        self, ids: list[Any], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> list[dict[str, Any] | None]:
+        unique = list(dict.fromkeys(ids))
+        queries = [
+            self.builder.select_many(unique[i : i + chunk_size])
+            for i in range(0, len(unique), chunk_size)
+        ]
+        records = []
+        if self.reads_related:
+            async with self.transaction() as transaction:
+                for query in queries:
+                    records.extend(await transaction.execute(query))
+                await transaction.get_related(records)
+        else:
+            for query in queries:
+                records.extend(await self.execute(query))
+        record_lut = {x["id"]: x for x in records}
+        return [record_lut.get(x) for x in ids]
+
+    async def stream(
+        self, filters: list[Filter], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Records matching `filters` through a server-side cursor, in chunks.
+
+        Runs in a read-only transaction, which is kept open while iterating.
+        """
+        self._trace_shape(filters, None)
+        query = self.builder.select(filters)
+        async with self.transaction(readonly=True) as transaction:
+            async for rows in transaction.provider.stream(query, chunk_size):
+                result = await self._map(rows)
+                await transaction.get_related(result)
+                yield result
+
+    async def copy_out(
+        self, filters: list[Filter]
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Records matching `filters` through a binary COPY, as they arrive.
+
+        Related records are not decoded from a COPY; for that this streams.
+        """
+        if self.has_related:
+            async for records in super().copy_out(filters):
+                yield records
+            return
+        self._trace_shape(filters, None)
+        async for rows in self.provider.copy_out(self.builder.select(filters)):
+            yield await self._map(rows)
+
+    @tracer.traced("db")
+    async def _execute_with_total(
+        self, query: Executable
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        rows = await self.provider.fetch(query)
+        total = rows[0][TOTAL_COLUMN] if rows else None
+        result = await self._map(rows)
+        for x in result:
+            x.pop(TOTAL_COLUMN, None)
+        return result, total
+
+    async def filter_with_total(
+        self, filters: list[Filter], params: PageOptions
+    ) -> tuple[list[dict[str, Any]], int]:
+        if params.cursor is not None:
+            # the window would only count the rows after the cursor
+            return await super().filter_with_total(filters, params)
+        self._trace_shape(filters, params)
+        query = self.builder.select(filters, params, with_total=True)
+        if self.reads_related:
+            async with self.transaction() as transaction:
+                result, total = await transaction._execute_with_total(query)
+                result = self._project(result, params)
+                await transaction.get_related(result)
+        else:
+            result, total = await self._execute_with_total(query)
+            result = self._project(result, params)
+        if total is None:
+            # no rows: either there are none or the offset is past the end
+            total = 0 if params.offset == 0 else await self.count(filters)
+        return result, total
+
+    @tracer.traced("db")
     async def count(self, filters: list[Filter]) -> int:
+        self._trace_shape(filters, None)
         return (await self.provider.execute(self.builder.count(filters)))[0]["count"]
 
     async def exists(self, filters: list[Filter]) -> bool:
         return len(await self.execute(self.builder.exists(filters))) > 0
 
+    async def distinct(
+        self, field: str, filters: list[Filter], limit: int | None = None
+    ) -> list[Any]:
+        self._trace_shape(filters, None)
+        query = self.builder.distinct(field, filters, limit)
+        return [x[field] for x in await self.execute(query)]
+
+    @tracer.traced("db")
+    async def facets(
+        self, filters: list[Filter], fields: list[str]
+    ) -> dict[str, dict[Any, int]]:
+        result: dict[str, dict[Any, int]] = {x: {} for x in fields}
+        if not fields:
+            return result
+        self._trace_shape(filters, None)
+        rows = await self.provider.fetch(self.builder.facets(filters, fields))
+        # the mapper converts the values (e.g. to enums); it gets partial rows, with
+        # None for the fields outside of the grouping set
+        records = await self.mapper.map_internal(rows)
+        last = len(fields) - 1
+        for row, record in zip(rows, records):
+            for i, field in enumerate(fields):
+                if not row[GROUPING_COLUMN] >> (last - i) & 1:
+                    result[field][record.get(field)] = row[FACET_COUNT_COLUMN]
+        return result
+
     async def _get_related_one_to_many(
         self,
         items: list[dict[str, Any]],
@@ -209,7 +562,8 @@ class SQLGateway(Gateway):
         """Set related objects for `item`
 
         This method first fetches the current situation and
-            then adds / updates / removes where appropriate.
+            then adds / updates / removes where appropriate, using one
+            multi-row statement for each.
 
         Args:
             item: The item for which to set related objects.
@@ -251,20 +605,30 @@ class SQLGateway(Gateway):
             for x in await self.filter([Filter(field=fk_name, values=[result["id"]])])
         }
 
-        # add / update them where necessary
-        returned = []
+        # diff them with the new ones
+        returned: list[dict[str, Any]] = []
+        to_add: list[int] = []
+        to_update: list[int] = []
         for new_value in item.get(field_name, []):
             new_value = {fk_name: result["id"], **new_value}
             existing = existing_lut.pop(new_value.get("id"), None)
             if existing is None:
-                returned.append(await self.add(new_value))
-            elif new_value == existing:
-                returned.append(existing)
-            else:
-                returned.append(await self.update(new_value))
+                to_add.append(len(returned))
+            elif new_value != existing:
+                to_update.append(len(returned))
+            returned.append(new_value)
+
+        # add / update / remove with (at most) one statement each
+        for indices, build in (
+            (to_add, self.builder.insert_many),
+            (to_update, self.builder.update_many),
+        ):
+            rows = await self._execute_many([returned[i] for i in indices], build, None)
+            for i, row in zip(indices, rows):
+                returned[i] = row
 
         result[field_name] = returned
 
-        # remove remaining
-        for to_remove in existing_lut:
-            assert await self.remove(to_remove)
+        if existing_lut:
+            removed = await self.execute(self.builder.delete_many(list(existing_lut)))
+            assert len(removed) == len(existing_lut)
@@ -1,15 +1,25 @@
 from contextlib import asynccontextmanager
-from typing import Any, AsyncIterator, Dict, Sequence
+from typing import Any, AsyncIterator, Dict, Mapping, Sequence
 
+from sqlalchemy import Table, insert
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
-from sqlalchemy.sql import Executable, text
+from sqlalchemy.sql import Executable, Select, text
+
+from src.core.repository.base.gateway import DEFAULT_CHUNK_SIZE
+
+from .instrumentation import Instrumentation
 
 
 class SQLProvider:
     """
     Base class for SQL database operations.
+
+    Implementations report the timings of every statement to `instrumentation`,
+    if set.
     """
 
+    instrumentation: Instrumentation | None = None
+
     def __init__(self, connection: AsyncConnection):
         self.connection = connection
 
@@ -21,8 +31,54 @@ class SQLProvider:
             rows = await result.fetchall()  # type: ignore
             return [dict(row) for row in rows]
 
+    async def fetch(
+        self, query: Executable, bind_params: Dict[str, Any] | None = None
+    ) -> Sequence[Mapping[str, Any]]:
+        """Like execute, but rows may be any (read-only) mapping"""
+        return await self.execute(query, bind_params)
+
+    async def stream(
+        self,
+        query: Executable,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        bind_params: Dict[str, Any] | None = None,
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        """Fetch rows in chunks using a server-side cursor.
+
+        Must be used within a transaction.
+        """
+        result = await self.connection.stream(query, bind_params or {})
+        async for rows in result.mappings().partitions(chunk_size):
+            yield [dict(row) for row in rows]
+
+    async def copy_in(self, table: Table, records: Sequence[Dict[str, Any]]) -> int:
+        """Insert rows (with the same keys) in bulk; returns the number of rows.
+
+        Implementations use COPY; unlike an INSERT it does not apply the column
+        defaults of the table, nor return anything. This default executes an INSERT
+        for many parameter sets.
+        """
+        if not records:
+            return 0
+        async with self.connection.begin():
+            await self.connection.execute(insert(table), list(records))
+        return len(records)
+
+    async def copy_out(
+        self, query: Select, bind_params: Dict[str, Any] | None = None
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        """All rows of `query` in bulk, in chunks of any size.
+
+        Implementations use COPY; this default streams the rows.
+        """
+        async with self.transaction(readonly=True) as transaction:
+            async for rows in transaction.stream(
+                query, DEFAULT_CHUNK_SIZE, bind_params
+            ):
+                yield rows
+
     @asynccontextmanager
-    async def transaction(self) -> AsyncIterator["SQLProvider"]:
+    async def transaction(self, readonly: bool = False) -> AsyncIterator["SQLProvider"]:
         async with self.connection.begin():
             yield self
 
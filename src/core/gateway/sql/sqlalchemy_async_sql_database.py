@@ -1,14 +1,18 @@
 import re
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Mapping, Sequence
 from contextlib import asynccontextmanager
+from time import perf_counter
 from typing import Any
 
+from sqlalchemy import Table, insert
 from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
-from sqlalchemy.sql import Executable
+from sqlalchemy.sql import Executable, Select, text
 
 from src.core.domain.exceptions import AlreadyExists, Conflict
+from src.core.repository.base.gateway import DEFAULT_CHUNK_SIZE
 
+from .instrumentation import Instrumentation
 from .sql_provider import SQLDatabase, SQLProvider
 
 __all__ = ["SQLAlchemyAsyncSQLDatabase"]
@@ -38,12 +42,21 @@ def maybe_raise_already_exists(e: DBAPIError) -> None:
             raise AlreadyExists()
 
 
+def executed_sql(query: Executable, result: Any) -> str:
+    # the rendered SQL is only available once the statement has been executed
+    statement = getattr(getattr(result, "context", None), "statement", None)
+    return statement if isinstance(statement, str) else str(query)
+
+
 class SQLAlchemyAsyncSQLDatabase(SQLDatabase):
     engine: AsyncEngine
 
-    def __init__(self, url: str, **kwargs):
+    def __init__(
+        self, url: str, *, instrumentation: Instrumentation | None = None, **kwargs
+    ):
         kwargs.setdefault("isolation_level", "REPEATABLE READ")
         self.engine = create_async_engine(f"postgresql+asyncpg://{url}", **kwargs)
+        self.instrumentation = instrumentation
 
     async def dispose(self) -> None:
         await self.engine.dispose()
@@ -57,18 +70,50 @@ class SQLAlchemyAsyncSQLDatabase(SQLDatabase):
         async with self.transaction() as transaction:
             return await transaction.execute(query, bind_params)
 
+    async def stream(
+        self,
+        query: Executable,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        bind_params: dict[str, Any] | None = None,
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        # server-side cursors only exist within a transaction
+        async with self.transaction(readonly=True) as transaction:
+            async for rows in transaction.stream(query, chunk_size, bind_params):
+                yield rows
+
+    async def copy_in(self, table: Table, records: Sequence[dict[str, Any]]) -> int:
+        async with self.transaction() as transaction:
+            return await transaction.copy_in(table, records)
+
+    async def copy_out(
+        self, query: Select, bind_params: dict[str, Any] | None = None
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        async with self.transaction(readonly=True) as transaction:
+            async for rows in transaction.copy_out(query, bind_params):
+                yield rows
+
     @asynccontextmanager
-    async def transaction(self) -> AsyncIterator[SQLProvider]:  # type: ignore
+    async def transaction(  # type: ignore
+        self, readonly: bool = False
+    ) -> AsyncIterator[SQLProvider]:
+        start = perf_counter()
         async with self.engine.connect() as connection:
+            acquire_time = perf_counter() - start
             async with connection.begin():
-                yield SQLAlchemyAsyncSQLTransaction(connection)
+                if readonly:
+                    await connection.execute(text("SET TRANSACTION READ ONLY"))
+                yield SQLAlchemyAsyncSQLTransaction(
+                    connection, self.instrumentation, acquire_time=acquire_time
+                )
 
     @asynccontextmanager
     async def testing_transaction(self) -> AsyncIterator[SQLProvider]:  # type: ignore
         async with self.engine.connect() as connection:
             async with connection.begin() as transaction:
                 try:
-                    yield SQLAlchemyAsyncSQLTransaction(connection)
+                    yield SQLAlchemyAsyncSQLTransaction(
+                        connection, self.instrumentation
+                    )
                 finally:
                     await transaction.rollback()
 
@@ -79,23 +124,107 @@ class SQLAlchemyAsyncSQLDatabase(SQLDatabase):
 
 
 class SQLAlchemyAsyncSQLTransaction(SQLProvider):
-    def __init__(self, connection: AsyncConnection):
+    def __init__(
+        self,
+        connection: AsyncConnection,
+        instrumentation: Instrumentation | None = None,
+        acquire_time: float = 0.0,
+    ):
         self.connection = connection
+        self.instrumentation = instrumentation
+        # waiting for the connection is attributed to the first statement
+        self.acquire_time = acquire_time
 
     async def execute(
         self, query: Executable, bind_params: dict[str, Any] | None = None
     ) -> list[dict[str, Any]]:
+        start = perf_counter()
+        result = None
+        count = None
         try:
             result = await self.connection.execute(query, bind_params)
+            # _asdict() is a documented method of a NamedTuple
+            # https://docs.python.org/3/library/collections.html#collections.somenamedtuple._asdict
+            rows = [x._asdict() for x in result.fetchall()]
+            count = len(rows)
         except DBAPIError as e:
             maybe_raise_conflict(e)
             maybe_raise_already_exists(e)
             raise e
-        # _asdict() is a documented method of a NamedTuple
-        # https://docs.python.org/3/library/collections.html#collections.somenamedtuple._asdict
-        return [x._asdict() for x in result.fetchall()]
+        finally:
+            self._record(query, result, start, count)
+        return rows
+
+    def _record(
+        self, query: Executable, result: Any, start: float, rows: int | None
+    ) -> None:
+        if self.instrumentation is not None:
+            # SQLAlchemy compiles (and caches) the statement as part of execute
+            acquire_time, self.acquire_time = self.acquire_time, 0.0
+            self.instrumentation.record(
+                executed_sql(query, result),
+                acquire_time=acquire_time,
+                execute_time=perf_counter() - start,
+                rows=rows,
+            )
+
+    async def stream(
+        self,
+        query: Executable,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        bind_params: dict[str, Any] | None = None,
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        # every fetch is recorded, the first one includes opening the cursor
+        start = perf_counter()
+        result = None
+        partitions = None
+        while True:
+            count = None
+            try:
+                if partitions is None:
+                    result = await self.connection.stream(query, bind_params or {})
+                    partitions = result.mappings().partitions(chunk_size)
+                rows = [dict(x) for x in await anext(partitions, [])]
+                count = len(rows)
+            except DBAPIError as e:
+                maybe_raise_conflict(e)
+                raise e
+            finally:
+                self._record(query, result, start, count)
+            if not rows:
+                break
+            yield rows
+            start = perf_counter()
+
+    async def copy_in(self, table: Table, records: Sequence[dict[str, Any]]) -> int:
+        # an INSERT for many parameter sets, in the transaction that has begun
+        if not records:
+            return 0
+        query = insert(table)
+        start = perf_counter()
+        result = None
+        count = None
+        try:
+            result = await self.connection.execute(query, list(records))
+            count = len(records)
+        except DBAPIError as e:
+            maybe_raise_already_exists(e)
+            raise e
+        finally:
+            self._record(query, result, start, count)
+        return count
+
+    async def copy_out(
+        self, query: Select, bind_params: dict[str, Any] | None = None
+    ) -> AsyncIterator[Sequence[Mapping[str, Any]]]:
+        # the server-side cursor lives in the transaction that has begun
+        async for rows in self.stream(query, DEFAULT_CHUNK_SIZE, bind_params):
+            yield rows
 
     @asynccontextmanager
-    async def transaction(self) -> AsyncIterator[SQLProvider]:  # type: ignore
+    async def transaction(  # type: ignore
+        self, readonly: bool = False
+    ) -> AsyncIterator[SQLProvider]:
+        # a savepoint inherits the access mode of the enclosing transaction
         async with self.connection.begin_nested():
             yield self
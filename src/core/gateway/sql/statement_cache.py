@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+from sqlalchemy.engine import Dialect
+from sqlalchemy.sql import Executable
+
+DEFAULT_MAXSIZE = 500
+
+
+@dataclass(frozen=True)
+class CompiledStatement:
+    """The rendered SQL of one statement shape.
+
+    Attributes:
+        sql: SQL text with positional ($n) placeholders.
+        names: Compiled bind name of every extracted bind parameter, in the order
+            of the statement's cache key.
+        positions: For every positional placeholder the bind name and, for
+            expanding (IN) parameters, the index into the list of values.
+    """
+
+    sql: str
+    names: tuple[str, ...]
+    positions: tuple[tuple[str, int | None], ...]
+
+    def args(
+        self, extracted: list[Any], bind_params: dict[str, Any] | None = None
+    ) -> tuple[Any, ...]:
+        values = {name: bp.effective_value for name, bp in zip(self.names, extracted)}
+        if bind_params:
+            values.update(bind_params)
+        return (self.sql,) + tuple(
+            values.get(name) if index is None else values[name][index]
+            for name, index in self.positions
+        )
+
+
+@dataclass
+class StatementCacheInfo:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _compile_uncached(
+    query: Executable, dialect: Dialect, bind_params: dict[str, Any] | None
+) -> tuple[Any, ...]:
+    compiled = query.compile(
+        dialect=dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = (
+        compiled.params if bind_params is None else {**compiled.params, **bind_params}
+    )
+    # add params in positional order
+    return (str(compiled),) + tuple(params[k] for k in compiled.positiontup)
+
+
+class StatementCache:
+    """LRU cache of rendered SQL keyed by statement shape.
+
+    SQLAlchemy's cache key captures the structure of a statement while leaving the
+    literal values out (they are 'extracted' bind parameters). Two statements with
+    the same key therefore render to the same SQL text, except for expanding (IN)
+    parameters whose number of placeholders depends on the number of values. The
+    shape is the cache key plus the lengths of those lists.
+
+    Because the rendered SQL text is stable per shape, asyncpg's per-connection
+    prepared statement cache (which is keyed on SQL text) is reused as well.
+    """
+
+    def __init__(self, dialect: Dialect, maxsize: int = DEFAULT_MAXSIZE):
+        self.dialect = dialect
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, CompiledStatement | None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def info(self) -> StatementCacheInfo:
+        return StatementCacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self._entries),
+            maxsize=self.maxsize,
+        )
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def compile(
+        self, query: Executable, bind_params: dict[str, Any] | None = None
+    ) -> tuple[Any, ...]:
+        """Render `query` to (sql, *positional_args)"""
+        if self.maxsize <= 0:
+            return _compile_uncached(query, self.dialect, bind_params)
+        cache_key = query._generate_cache_key()  # type: ignore
+        if cache_key is None:  # some constructs can't be cached
+            return _compile_uncached(query, self.dialect, bind_params)
+        extracted = cache_key.bindparams
+        shape = (
+            cache_key.key,
+            tuple(len(bp.effective_value) for bp in extracted if bp.expanding),
+        )
+        try:
+            entry = self._entries[shape]
+        except KeyError:
+            self.misses += 1
+            entry = self._build(query, extracted)
+            self._entries[shape] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(shape)
+        if entry is None:
+            return _compile_uncached(query, self.dialect, bind_params)
+        return entry.args(extracted, bind_params)
+
+    def _build(
+        self, query: Executable, extracted: list[Any]
+    ) -> CompiledStatement | None:
+        compiled = query.compile(dialect=self.dialect)
+        if compiled.literal_execute_params:
+            # values are rendered inline, so the SQL differs per set of values
+            return None
+        name_by_key = {bp.key: name for bp, name in compiled.bind_names.items()}
+        try:
+            names = tuple(name_by_key[bp.key] for bp in extracted)
+        except KeyError:  # bind parameter was replaced during compilation
+            return None
+        params = {**compiled.params}
+        params.update((name, bp.effective_value) for name, bp in zip(names, extracted))
+        expanded = compiled.construct_expanded_state(params)
+        expanded_lut = {
+            expanded_name: (name, index)
+            for name, expanded_names in expanded.parameter_expansion.items()
+            for index, expanded_name in enumerate(expanded_names)
+        }
+        positions = tuple(
+            expanded_lut.get(name, (name, None)) for name in expanded.positiontup or ()
+        )
+        return CompiledStatement(expanded.statement, names, positions)
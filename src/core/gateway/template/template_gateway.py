@@ -1,5 +1,7 @@
 from typing import Any, Dict
 
+from src.core.tracing import tracer
+
 
 class TemplateGateway:
     def __init__(
@@ -8,5 +10,6 @@ class TemplateGateway:
     ):
         self.provider = provider
 
+    @tracer.traced("rendering")
     def render(self, template: str, context: Dict[str, Any]) -> str:
         return self.provider.render(template, context)
@@ -1,20 +1,31 @@
-from typing import Any, Generic, List, TypeVar
+from datetime import datetime
+from typing import Any, AsyncIterator, Generic, List, TypeVar
 from uuid import UUID
 
 import backoff
 
 from src.core.domain.exceptions import Conflict
 from src.core.domain.root_entity import RootEntity
-from src.core.repository.base.filter import Filter
+from src.core.repository.base.filter import ComparisonFilter, ComparisonOperator, Filter
+from src.core.repository.base.gateway import DEFAULT_CHUNK_SIZE
 from src.core.repository.base.pagination import Page, PageOptions
 from src.core.repository.base.repository import Repository
+from src.core.tracing import tracer
 
 T = TypeVar("T", bound=RootEntity)
 
 
+def _check_filters(filters: List[Filter], all: bool) -> None:
+    # an empty list of filters (e.g. built by accident) would match everything
+    if not filters and not all:
+        raise ValueError("No filters given; set all=True to match all entities")
+
+
 class Manage(Generic[T]):
     repo: Repository[T]
     entity: type[T]
+    # fields that ingest leaves as they are on an existing record
+    ingest_keep: tuple[str, ...] = ()
 
     def __init__(self, repo: Repository[T] | None = None):
         assert repo is not None
@@ -27,13 +38,70 @@ class Manage(Generic[T]):
         super().__init_subclass__()
         cls.entity = entity
 
+    @tracer.traced("manage")
     async def retrieve(self, id: UUID) -> T:
         return await self.repo.get(id)
 
+    @tracer.traced("manage")
+    async def retrieve_many(
+        self, ids: List[UUID], skip_missing: bool = False
+    ) -> List[T]:
+        """In the order of `ids`; raises DoesNotExist for missing ones"""
+        return await self.repo.get_many(ids, skip_missing=skip_missing)
+
+    @tracer.traced("manage")
     async def create(self, values: dict[str, Any]) -> T:
         """Accepts values that should match entity attribute types"""
         return await self.repo.add(values)
 
+    @tracer.traced("manage")
+    async def create_many(
+        self, values: List[dict[str, Any]], batch_size: int | None = None
+    ) -> List[T]:
+        """Creates all or nothing; raises AlreadyExists on the first duplicate"""
+        return await self.repo.add_many(list(values), batch_size=batch_size)
+
+    @tracer.traced("manage")
+    async def copy_in(self, values: List[T | dict[str, Any]]) -> int:
+        """Creates all or nothing, in bulk (e.g. with COPY); returns the number
+        of entities but not the entities themselves"""
+        return await self.repo.copy_in(list(values))
+
+    @tracer.traced("manage")
+    async def upsert_many(
+        self, items: List[T | dict[str, Any]], batch_size: int | None = None
+    ) -> List[T]:
+        """Accepts entities or values (which should include the id)"""
+        entities = [
+            self.entity.create(**x) if isinstance(x, dict) else x for x in items
+        ]
+        return await self.repo.upsert_many(entities, batch_size=batch_size)
+
+    @tracer.traced("manage")
+    async def ingest(self, values: dict[str, Any]) -> T:
+        """Create, or update the entity with the same natural key (e.g. the url of
+        a job posting), so that capturing the same thing twice is harmless.
+
+        This is a single statement (with SQLGateway), safe to retry and to run
+        concurrently. An existing entity keeps its id, created_at and the fields in
+        `ingest_keep`.
+        """
+        return await self.repo.ingest(values, keep=self.ingest_keep)
+
+    @tracer.traced("manage")
+    async def ingest_many(
+        self, items: List[T | dict[str, Any]], batch_size: int | None = None
+    ) -> List[T]:
+        """Ingest entities or values in batches, in a single transaction.
+
+        Of the items with the same natural key only the last one is ingested, and
+        the result is not in the order of `items`.
+        """
+        return await self.repo.ingest_many(
+            list(items), keep=self.ingest_keep, batch_size=batch_size
+        )
+
+    @tracer.traced("manage")
     async def update(
         self, id: UUID, values: dict[str, Any], retry_on_conflict: bool = True
     ) -> T:
@@ -56,24 +124,131 @@ class Manage(Generic[T]):
     async def _update_with_retries(self, id: UUID, values: dict[str, Any]) -> T:
         return await self.repo.update(id, values)
 
+    @tracer.traced("manage")
+    async def patch(
+        self,
+        id: UUID,
+        values: dict[str, Any],
+        if_unmodified_since: datetime | None = None,
+    ) -> T:
+        """Update only the given values, without reading the entity first.
+
+        There is nothing to retry: this raises Conflict only if
+        `if_unmodified_since` is given and no longer matches.
+        """
+        return await self.repo.patch(id, values, if_unmodified_since)
+
+    @tracer.traced("manage")
     async def destroy(self, id: UUID) -> bool:
         return await self.repo.remove(id)
 
-    async def list(self, params: PageOptions | None = None) -> Page[T]:
-        return await self.repo.all(params)
+    @tracer.traced("manage")
+    async def update_where(
+        self, filters: List[Filter], values: dict[str, Any], all: bool = False
+    ) -> List[UUID]:
+        """Update only the given values of all entities matching `filters` at once
+        (e.g. archive old ones), without reading them; returns their ids.
+
+        Without filters this raises ValueError, unless `all` is set to update all
+        entities.
+        """
+        _check_filters(filters, all)
+        return await self.repo.update_where(filters, values)
+
+    @tracer.traced("manage")
+    async def destroy_where(
+        self, filters: List[Filter], all: bool = False
+    ) -> List[UUID]:
+        """Delete all entities matching `filters` at once; returns their ids.
+
+        Without filters this raises ValueError, unless `all` is set to delete all
+        entities.
+        """
+        _check_filters(filters, all)
+        return await self.repo.remove_where(filters)
 
+    @tracer.traced("manage")
+    async def list(
+        self, params: PageOptions | None = None, total: bool = True
+    ) -> Page[T]:
+        return await self.repo.all(params, total=total)
+
+    @tracer.traced("manage")
     async def by(
-        self, key: str, value: Any, params: PageOptions | None = None
+        self,
+        key: str,
+        value: Any,
+        params: PageOptions | None = None,
+        total: bool = True,
     ) -> Page[T]:
-        return await self.repo.by(key, value, params=params)
+        return await self.repo.by(key, value, params=params, total=total)
 
+    @tracer.traced("manage")
     async def filter(
-        self, filters: List[Filter], params: PageOptions | None = None
+        self,
+        filters: List[Filter],
+        params: PageOptions | None = None,
+        total: bool = True,
     ) -> Page[T]:
-        return await self.repo.filter(filters, params=params)
-
+        return await self.repo.filter(filters, params=params, total=total)
+
+    @tracer.traced("manage")
+    async def values(
+        self,
+        filters: List[Filter],
+        fields: List[str],
+        params: PageOptions,
+        total: bool = True,
+    ) -> Page[dict[str, Any]]:
+        """Partial records with only `fields` (and 'id'), e.g. for list views"""
+        return await self.repo.values(filters, fields, params, total=total)
+
+    async def iterate(
+        self, filters: List[Filter] | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[T]:
+        """Iterate over all matching entities; memory use is bound by chunk_size"""
+        async for chunk in self.repo.stream(filters or [], chunk_size=chunk_size):
+            for item in chunk:
+                yield item
+
+    async def copy_out(
+        self, filters: List[Filter] | None = None
+    ) -> AsyncIterator[List[T]]:
+        """All matching entities in bulk (e.g. with COPY), in chunks of any size"""
+        async for chunk in self.repo.copy_out(filters or []):
+            yield chunk
+
+    @tracer.traced("manage")
     async def count(self, filters: List[Filter]) -> int:
         return await self.repo.count(filters)
 
+    @tracer.traced("manage")
     async def exists(self, filters: List[Filter]) -> bool:
         return await self.repo.exists(filters)
+
+    @tracer.traced("manage")
+    async def facets(
+        self, filters: List[Filter], fields: List[str]
+    ) -> dict[str, dict[Any, int]]:
+        """Counts per value of each field for the records matching `filters`"""
+        return await self.repo.facets(filters, fields)
+
+    @tracer.traced("manage")
+    async def suggest(
+        self,
+        field: str,
+        prefix: str,
+        limit: int = 10,
+        filters: List[Filter] | None = None,
+    ) -> List[Any]:
+        """Distinct values of `field` starting with `prefix` (case-insensitive),
+        e.g. for autocomplete. `filters` narrow down the records, e.g. to a user.
+        """
+        filters = list(filters or [])
+        if prefix:
+            filters.append(
+                ComparisonFilter(
+                    field=field, operator=ComparisonOperator.STARTSWITH, values=[prefix]
+                )
+            )
+        return await self.repo.distinct(field, filters, limit=limit)
@@ -21,6 +21,11 @@ class ComparisonOperator(str, Enum):
     GT = "gt"
     EQ = "eq"
     NE = "ne"
+    # case-insensitive text matching: a LIKE pattern (with % and _), a prefix and
+    # a substring; in SQL these can use a pg_trgm index
+    ILIKE = "ilike"
+    STARTSWITH = "startswith"
+    CONTAINS = "contains"
 
 
 class ComparisonFilter(Filter):
@@ -30,3 +35,14 @@ class ComparisonFilter(Filter):
         if len(self.values) != 1:
             raise ValueError("ComparisonFilter needs to have exactly one value")
         return self
+
+
+class TextSearchFilter(Filter):
+    """Full-text search for the query in `values[0]`.
+
+    The query has web search syntax: words, "quoted phrases", `or` and `-word`
+    to exclude. In SQL `field` is a tsvector column (or a text column, which is
+    converted on the fly and can't use an index).
+    """
+
+    language: str = "english"
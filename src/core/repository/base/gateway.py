@@ -1,11 +1,30 @@
 from abc import ABC, abstractmethod
-from datetime import datetime
-from typing import Any, Callable
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Collection, Iterable
 from uuid import UUID
 
 from src.core.domain.exceptions import DoesNotExist
 from src.core.repository.base.filter import Filter
-from src.core.repository.base.pagination import PageOptions
+from src.core.repository.base.pagination import Cursor, PageOptions, encode_cursor
+
+# Number of records per chunk when streaming
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def facet_counts(
+    records: Iterable[dict[str, Any]], fields: list[str]
+) -> dict[str, dict[Any, int]]:
+    """Counts per value of each field in one pass, most frequent first"""
+    result: dict[str, dict[Any, int]] = {x: {} for x in fields}
+    for record in records:
+        for field in fields:
+            counts = result[field]
+            value = record.get(field)
+            counts[value] = counts.get(value, 0) + 1
+    return {
+        field: dict(sorted(counts.items(), key=lambda x: x[1], reverse=True))
+        for field, counts in result.items()
+    }
 
 
 class Gateway(ABC):
@@ -29,22 +48,164 @@ class Gateway(ABC):
     ) -> list[dict[str, Any]]:
         pass
 
+    async def stream(
+        self, filters: list[Filter], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Records matching `filters` in chunks of at most `chunk_size`.
+
+        This default loads all records first; override it to stream them.
+        """
+        records = await self.filter(filters, params=None)
+        for i in range(0, len(records), chunk_size):
+            yield records[i : i + chunk_size]
+
+    async def copy_out(
+        self, filters: list[Filter]
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """All records matching `filters` in bulk, in chunks of any size.
+
+        This default streams them; override it to use a faster path (e.g. COPY).
+        """
+        async for records in self.stream(filters):
+            yield records
+
+    async def filter_with_total(
+        self, filters: list[Filter], params: PageOptions
+    ) -> tuple[list[dict[str, Any]], int]:
+        """A page of records and the total number of records matching `filters`"""
+        records = await self.filter(filters, params=params)
+        total = len(records)
+        # only a short first page tells the total without counting
+        if params.cursor is not None or params.offset != 0 or total >= params.limit:
+            total = await self.count(filters)
+        return records, total
+
     async def get(self, id: Any) -> dict[str, Any] | None:
         result = await self.filter([Filter(field="id", values=[id])], params=None)
         return result[0] if result else None
 
+    async def patch(
+        self,
+        id: Any,
+        values: dict[str, Any],
+        if_unmodified_since: datetime | None = None,
+    ) -> dict[str, Any]:
+        """Update only `values` of a record, and its updated_at (if it has one).
+
+        This default reads the record first; override it to do it in one go.
+        """
+        existing = await self.get(id)
+        if existing is None:
+            raise DoesNotExist("record", id)
+        item = {**existing, **values, "id": id}
+        if "updated_at" in existing and "updated_at" not in values:
+            item["updated_at"] = datetime.now(timezone.utc)
+        return await self.update(item, if_unmodified_since=if_unmodified_since)
+
+    async def update_where(
+        self, filters: list[Filter], values: dict[str, Any]
+    ) -> list[Any]:
+        """Update only `values` of all records matching `filters` (see patch);
+        returns their ids.
+
+        This default patches them one by one; override it to do it in one go.
+        """
+        records = await self.filter(filters, params=None)
+        return [(await self.patch(x["id"], values))["id"] for x in records]
+
+    async def remove_where(self, filters: list[Filter]) -> list[Any]:
+        """Remove all records matching `filters`; returns their ids.
+
+        This default removes them one by one; override it to do it in one go.
+        """
+        records = await self.filter(filters, params=None)
+        return [x["id"] for x in records if await self.remove(x["id"])]
+
+    async def get_many(
+        self, ids: list[Any], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> list[dict[str, Any] | None]:
+        """The records with these ids in the same order; None for missing ones"""
+        unique = list(dict.fromkeys(ids))
+        record_lut = {}
+        for i in range(0, len(unique), chunk_size):
+            chunk = unique[i : i + chunk_size]
+            for record in await self.filter([Filter(field="id", values=chunk)]):
+                record_lut[record["id"]] = record
+        return [record_lut.get(x) for x in ids]
+
     async def upsert(self, item: dict[str, Any]) -> dict[str, Any]:
         try:
             return await self.update(item)
         except DoesNotExist:
             return await self.add(item)
 
+    async def ingest(
+        self, item: dict[str, Any], keep: Collection[str] = ()
+    ) -> dict[str, Any]:
+        """Add the item, or update the record with the same natural key (e.g. the
+        url of a job posting), leaving its id, created_at and `keep` as they are.
+        """
+        raise NotImplementedError(f"{self.__class__} does not implement ingest")
+
+    async def ingest_many(
+        self,
+        items: list[dict[str, Any]],
+        keep: Collection[str] = (),
+        batch_size: int | None = None,
+    ) -> list[dict[str, Any]]:
+        return [await self.ingest(x, keep=keep) for x in items]
+
+    async def add_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        return [await self.add(x) for x in items]
+
+    async def upsert_many(
+        self, items: list[dict[str, Any]], batch_size: int | None = None
+    ) -> list[dict[str, Any]]:
+        return [await self.upsert(x) for x in items]
+
+    async def copy_in(self, items: list[dict[str, Any]]) -> int:
+        """Insert records in bulk, all or nothing; returns the number of records.
+
+        This default uses add_many; override it to use a faster path (e.g. COPY).
+        """
+        return len(await self.add_many(items))
+
     async def count(self, filters: list[Filter]) -> int:
         return len(await self.filter(filters, params=None))
 
     async def exists(self, filters: list[Filter]) -> bool:
         return len(await self.filter(filters, params=PageOptions(limit=1))) > 0
 
+    async def facets(
+        self, filters: list[Filter], fields: list[str]
+    ) -> dict[str, dict[Any, int]]:
+        """For each of `fields` the number of records matching `filters` per value
+        (including None), most frequent first.
+
+        This default loads all matching records; override it to do it in one go.
+        """
+        return facet_counts(await self.filter(filters, params=None), fields)
+
+    async def distinct(
+        self, field: str, filters: list[Filter], limit: int | None = None
+    ) -> list[Any]:
+        """The distinct (non-null) values of `field` in records matching `filters`,
+        in ascending order.
+
+        This default loads all matching records; override it to do it in one go.
+        """
+        records = await self.filter(filters, params=None)
+        values = sorted({x[field] for x in records if x.get(field) is not None})
+        return values if limit is None else values[:limit]
+
+    def cursor_for(self, item: dict[str, Any], params: PageOptions) -> str:
+        """The cursor to fetch the page following `item` (for keyset pagination)"""
+        return encode_cursor(
+            Cursor(params.order_by, item.get(params.order_by), item["id"])
+        )
+
     async def update_transactional(
         self, id: UUID, func: Callable[[dict[str, Any]], dict[str, Any]]
     ) -> dict[str, Any]:
@@ -1,5 +1,8 @@
+from collections.abc import Iterable, Mapping
 from typing import Any
 
+from src.core.tracing import tracer
+
 
 class Mapper:
     async def to_internal(self, external: Any) -> dict[str, Any]:
@@ -7,3 +10,43 @@ class Mapper:
 
     async def to_external(self, internal: dict[str, Any]) -> dict[str, Any]:
         return internal
+
+    def to_internal_many(
+        self, externals: Iterable[Mapping[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Synchronous, batched version of to_internal.
+
+        Rows may be any mapping (e.g. asyncpg Records). Mappers that override
+        to_internal should override this as well; see map_internal.
+        """
+        return [dict(x) for x in externals]
+
+    def to_external_many(
+        self, internals: Iterable[Mapping[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Synchronous, batched version of to_external.
+
+        Items may be partial (see Gateway.patch): only map the fields present.
+        """
+        return [dict(x) for x in internals]
+
+    def _overrides(self, name: str) -> bool:
+        return getattr(type(self), name) is not getattr(Mapper, name)
+
+    @tracer.traced("mapping")
+    async def map_internal(
+        self, externals: Iterable[Mapping[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Map many rows, using to_internal_many unless only to_internal is custom"""
+        if self._overrides("to_internal") and not self._overrides("to_internal_many"):
+            return [await self.to_internal(x) for x in externals]
+        return self.to_internal_many(externals)
+
+    @tracer.traced("mapping")
+    async def map_external(
+        self, internals: Iterable[Mapping[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Map many items, using to_external_many unless only to_external is custom"""
+        if self._overrides("to_external") and not self._overrides("to_external_many"):
+            return [await self.to_external(dict(x)) for x in internals]
+        return self.to_external_many(internals)
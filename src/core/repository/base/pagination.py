@@ -1,6 +1,12 @@
-from collections.abc import Sequence
+import base64
+import binascii
+import json
+from collections.abc import Callable, Sequence
 from dataclasses import dataclass
-from typing import Generic, TypeVar
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Generic, TypeVar
+from uuid import UUID
 
 T = TypeVar("T")
 
@@ -12,11 +18,90 @@ class PageOptions:
     order_by: str = "id"
     ascending: bool = True
     cursor: str | None = None
+    # Only fetch these fields (a projection); see Repository.values
+    fields: Sequence[str] | None = None
+    # Best matches of a TextSearchFilter first, then by order_by. Pages can't
+    # have a cursor then.
+    rank: bool = False
+
+    def projection(self) -> list[str] | None:
+        """The fields to fetch: `fields` plus the ones pagination needs"""
+        if self.fields is None:
+            return None
+        return list(dict.fromkeys(["id", *self.fields, self.order_by]))
 
 
 @dataclass
 class Page(Generic[T]):
-    total: int
+    total: int | None  # None when the total was not requested
     items: Sequence[T]
     limit: int | None = None
     offset: int | None = None
+    next_cursor: str | None = None
+    has_more: bool | None = None
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Position after the last item of a page in keyset pagination.
+
+    Attributes:
+        order_by: The field the page was ordered by.
+        value: Value of `order_by` in the last item.
+        id: Id of the last item, used as a tie-breaker.
+    """
+
+    order_by: str
+    value: Any
+    id: Any
+
+
+def _encode_value(value: Any) -> Any:
+    # JSON has no datetime/uuid types, so these are tagged to survive a round-trip
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"uuid": str(value)}
+    return value
+
+
+_DECODERS: dict[str, Callable[[str], Any]] = {
+    "dt": datetime.fromisoformat,
+    "d": date.fromisoformat,
+    "uuid": UUID,
+}
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        ((tag, raw),) = value.items()
+        return _DECODERS[tag](raw)
+    return value
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    payload = [cursor.order_by, _encode_value(cursor.value), _encode_value(cursor.id)]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str | None = None) -> Cursor:
+    """Decode an opaque cursor, optionally checking it matches `order_by`
+
+    Raises ValueError for malformed cursors.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        field, value, id = json.loads(raw)
+        result = Cursor(field, _decode_value(value), _decode_value(id))
+    except (binascii.Error, TypeError, ValueError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if order_by is not None and result.order_by != order_by:
+        raise ValueError(
+            f"Cursor is ordered by '{result.order_by}', not by '{order_by}'"
+        )
+    return result
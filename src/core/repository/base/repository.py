@@ -1,19 +1,27 @@
+from collections.abc import Callable, Collection, Sequence
+from dataclasses import replace
 from datetime import datetime
-from typing import Any, Generic, TypeVar
+from typing import Any, AsyncIterator, Generic, TypeVar
 from uuid import UUID
 
 from src.core.domain.exceptions import DoesNotExist
 from src.core.domain.value_object import ValueObject
 from src.core.repository.base.filter import Filter
-from src.core.repository.base.gateway import Gateway
+from src.core.repository.base.gateway import DEFAULT_CHUNK_SIZE, Gateway
 from src.core.repository.base.pagination import Page, PageOptions
+from src.core.tracing import tracer
 
 # Type variable to represent the entity type (bound to ValueObject)
 T = TypeVar("T", bound=ValueObject)
+R = TypeVar("R")
 
 
 class Repository(Generic[T]):
     entity: type[T]  # The entity type this repository manages
+    # Set when the gateway returns records whose values already have the
+    # entity's field types (e.g. a mapper converts enums). Such records are
+    # then turned into entities without validation, which is much faster.
+    trusted: bool = False
 
     def __init__(self, gateway: Gateway):
         self.gateway = gateway
@@ -25,47 +33,181 @@ class Repository(Generic[T]):
         super().__init_subclass__()
         cls.entity = entity
 
-    async def all(self, params: PageOptions | None = None) -> Page[T]:
+    def _construct(self, record: dict[str, Any]) -> T:
+        # Entity from a record loaded by the gateway (not from user input)
+        if self.trusted:
+            return self.entity.from_trusted(record)
+        return self.entity(**record)
+
+    @tracer.traced("validation")
+    def _build(self, record: dict[str, Any]) -> T:
+        return self._construct(record)
+
+    @tracer.traced("validation")
+    def _build_all(self, records: list[dict[str, Any]]) -> list[T]:
+        return [self._construct(x) for x in records]
+
+    @tracer.traced("repository")
+    async def all(
+        self, params: PageOptions | None = None, total: bool = True
+    ) -> Page[T]:
         # Fetch all records with optional pagination
-        return await self.filter([], params=params)
+        return await self.filter([], params=params, total=total)
 
+    @tracer.traced("repository")
     async def by(
-        self, key: str, value: Any, params: PageOptions | None = None
+        self,
+        key: str,
+        value: Any,
+        params: PageOptions | None = None,
+        total: bool = True,
     ) -> Page[T]:
         # Fetch records by a specific field and value
-        return await self.filter([Filter(field=key, values=[value])], params=params)
+        return await self.filter(
+            [Filter(field=key, values=[value])], params=params, total=total
+        )
 
+    @tracer.traced("repository")
     async def filter(
-        self, filters: list[Filter], params: PageOptions | None = None
+        self,
+        filters: list[Filter],
+        params: PageOptions | None = None,
+        total: bool = True,
     ) -> Page[T]:
-        # Apply filters and fetch paginated records
-        records = await self.gateway.filter(filters, params=params)
-        total = len(records)
+        """Apply filters and fetch paginated records.
 
-        # Adjust total count for pagination if necessary
-        if params is not None and not (params.offset == 0 and total < params.limit):
-            total = await self.count(filters)
+        With `total=False` the total isn't counted; instead one extra record is
+        fetched to tell whether there is a next page (`Page.has_more`).
+        """
+        if params is None:
+            records = await self.gateway.filter(filters)
+            return Page(total=len(records), items=self._build_all(records))
+        return await self._page(filters, params, total, self._build_all)
+
+    @tracer.traced("repository")
+    async def values(
+        self,
+        filters: list[Filter],
+        fields: Sequence[str],
+        params: PageOptions,
+        total: bool = True,
+    ) -> Page[dict[str, Any]]:
+        """Like filter, but only fetch `fields` (and 'id').
+
+        Items are partial records (dicts) instead of entities, which is much
+        cheaper for list views that skip large columns.
+        """
+        return await self._page(
+            filters,
+            replace(params, fields=fields),
+            total,
+            lambda records: [dict(x) for x in records],
+        )
+
+    async def _page(
+        self,
+        filters: list[Filter],
+        params: PageOptions,
+        total: bool,
+        build: Callable[[list[dict[str, Any]]], list[R]],
+    ) -> Page[R]:
+        count: int | None = None
+        if total:
+            records, count = await self.gateway.filter_with_total(filters, params)
+            has_more = None
+            # A full page may be followed by another one (keyset pagination)
+            full = len(records) >= params.limit
+        else:
+            records = await self.gateway.filter(
+                filters, params=replace(params, limit=params.limit + 1)
+            )
+            has_more = full = len(records) > params.limit
+            records = records[: params.limit]
+
+        next_cursor = None
+        if records and full and not params.rank:  # rank has no keyset
+            next_cursor = self.gateway.cursor_for(records[-1], params)
 
         return Page(
-            total=total,
-            limit=params.limit if params else None,
-            offset=params.offset if params else None,
-            items=[self.entity(**x) for x in records],
+            total=count,
+            limit=params.limit,
+            offset=params.offset,
+            items=build(records),
+            next_cursor=next_cursor,
+            has_more=has_more,
         )
 
+    async def stream(
+        self, filters: list[Filter], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[list[T]]:
+        # Fetch matching records in chunks, without loading all of them
+        async for records in self.gateway.stream(filters, chunk_size=chunk_size):
+            yield self._build_all(records)
+
+    async def copy_out(self, filters: list[Filter]) -> AsyncIterator[list[T]]:
+        # Fetch matching records in bulk (see Gateway.copy_out)
+        async for records in self.gateway.copy_out(filters):
+            yield self._build_all(records)
+
+    @tracer.traced("repository")
     async def get(self, id: UUID) -> T:
         # Fetch a single record by ID
         res = await self.gateway.get(id)
         if res is None:
             raise DoesNotExist("object", id)
-        return self.entity(**res)
+        return self._build(res)
+
+    @tracer.traced("repository")
+    async def get_many(
+        self,
+        ids: list[UUID],
+        skip_missing: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> list[T]:
+        """Fetch records by ID in the given order, querying in chunks.
 
+        Raises DoesNotExist with all missing ids, unless `skip_missing`.
+        """
+        records = await self.gateway.get_many(ids, chunk_size=chunk_size)
+        missing = [id for id, x in zip(ids, records) if x is None]
+        if missing and not skip_missing:
+            raise DoesNotExist("objects", ids=missing)
+        found: dict[UUID, dict[str, Any]] = {}
+        for id, record in zip(ids, records):
+            if record is not None and id not in found:
+                found[id] = record
+        entities = dict(zip(found, self._build_all(list(found.values()))))
+        return [entities[x] for x in ids if x in entities]
+
+    @tracer.traced("repository")
     async def add(self, item: T | dict[str, Any]) -> T:
         if isinstance(item, dict):
             item = self.entity.create(**item)
         created = await self.gateway.add(dict(vars(item)))  # Explicitly cast to dict
-        return self.entity(**created)
+        return self._build(created)
+
+    @tracer.traced("repository")
+    async def add_many(
+        self, items: list[T | dict[str, Any]], batch_size: int | None = None
+    ) -> list[T]:
+        # Insert many records in batches; all-or-nothing
+        entities = [
+            self.entity.create(**x) if isinstance(x, dict) else x for x in items
+        ]
+        created = await self.gateway.add_many(
+            [dict(vars(x)) for x in entities], batch_size=batch_size
+        )
+        return self._build_all(created)
+
+    @tracer.traced("repository")
+    async def copy_in(self, items: list[T | dict[str, Any]]) -> int:
+        # Insert many records in bulk, without reading them back; all-or-nothing
+        entities = [
+            self.entity.create(**x) if isinstance(x, dict) else x for x in items
+        ]
+        return await self.gateway.copy_in([dict(vars(x)) for x in entities])
 
+    @tracer.traced("repository")
     async def update(
         self, id: UUID, values: dict[str, Any], optimistic: bool = True
     ) -> T:
@@ -84,24 +226,142 @@ class Repository(Generic[T]):
             )
         else:
             updated = await self.gateway.update_transactional(
-                id, lambda x: dict(vars(self.entity(**x).update(**values)))
+                id, lambda x: dict(vars(self._build(x).update(**values)))
             )
-        return self.entity(**updated)
+        return self._build(updated)
 
+    @tracer.traced("repository")
+    async def patch(
+        self,
+        id: UUID,
+        values: dict[str, Any],
+        if_unmodified_since: datetime | None = None,
+    ) -> T:
+        """Update only `values`, in one statement where the gateway supports it.
+
+        Unlike `update`, the record is not read first: `values` are validated
+        field by field. Raises DoesNotExist, or Conflict if `if_unmodified_since`
+        is given and the record was updated after it.
+        """
+        values = dict(values)
+        if values.pop("id", id) != id:
+            raise ValueError("Cannot change the id of an entity")
+        if "created_at" in values:
+            raise ValueError("Cannot change the created_at timestamp")
+        patched = await self.gateway.patch(
+            id, self.entity.validate_fields(**values), if_unmodified_since
+        )
+        return self._build(patched)
+
+    @tracer.traced("repository")
+    async def update_where(
+        self, filters: list[Filter], values: dict[str, Any]
+    ) -> list[UUID]:
+        """Update only `values` of all records matching `filters`, in one statement
+        where the gateway supports it; returns their ids.
+
+        Like `patch`, `values` are validated field by field.
+        """
+        if "id" in values:
+            raise ValueError("Cannot change the id of an entity")
+        if "created_at" in values:
+            raise ValueError("Cannot change the created_at timestamp")
+        return await self.gateway.update_where(
+            filters, self.entity.validate_fields(**values)
+        )
+
+    @tracer.traced("repository")
     async def upsert(self, item: T) -> T:
         # Insert or update a record
         values = dict(vars(item))
         upserted = await self.gateway.upsert(values)
-        return self.entity(**upserted)
+        return self._build(upserted)
+
+    @tracer.traced("repository")
+    async def ingest(self, item: T | dict[str, Any], keep: Collection[str] = ()) -> T:
+        # Add a record, or update the one with the same natural key
+        if isinstance(item, dict):
+            item = self.entity.create(**item)
+        ingested = await self.gateway.ingest(dict(vars(item)), keep=keep)
+        return self._build(ingested)
+
+    @tracer.traced("repository")
+    async def ingest_many(
+        self,
+        items: list[T | dict[str, Any]],
+        keep: Collection[str] = (),
+        batch_size: int | None = None,
+    ) -> list[T]:
+        # Ingest many records in batches (see Gateway.ingest_many)
+        entities = [
+            self.entity.create(**x) if isinstance(x, dict) else x for x in items
+        ]
+        ingested = await self.gateway.ingest_many(
+            [dict(vars(x)) for x in entities], keep=keep, batch_size=batch_size
+        )
+        return self._build_all(ingested)
+
+    @tracer.traced("repository")
+    async def upsert_many(
+        self, items: list[T], batch_size: int | None = None
+    ) -> list[T]:
+        # Insert or update many records in batches
+        upserted = await self.gateway.upsert_many(
+            [dict(vars(x)) for x in items], batch_size=batch_size
+        )
+        return self._build_all(upserted)
 
+    @tracer.traced("repository")
     async def remove(self, id: UUID) -> bool:
         # Remove a record by ID
         return await self.gateway.remove(id)
 
+    @tracer.traced("repository")
+    async def remove_where(self, filters: list[Filter]) -> list[UUID]:
+        # Remove all records matching the filters; returns their ids
+        return await self.gateway.remove_where(filters)
+
+    @tracer.traced("repository")
     async def count(self, filters: list[Filter]) -> int:
         # Count records matching the given filters
         return await self.gateway.count(filters)
 
+    @tracer.traced("repository")
     async def exists(self, filters: list[Filter]) -> bool:
         # Check if any records match the given filters
         return await self.gateway.exists(filters)
+
+    @tracer.traced("repository")
+    async def facets(
+        self, filters: list[Filter], fields: list[str]
+    ) -> dict[str, dict[Any, int]]:
+        """For each of `fields` the number of records matching `filters` per value,
+        most frequent first (e.g. for the counts next to the filters of a list).
+
+        The values have the entity's field types, e.g. enums; None counts the
+        records without a value.
+        """
+        unknown = set(fields) - self.entity.model_fields.keys()
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        result = await self.gateway.facets(filters, fields)
+        if self.trusted:
+            return result
+        return {
+            field: {
+                (
+                    None
+                    if value is None
+                    else self.entity.validate_fields(**{field: value})[field]
+                ): count
+                for value, count in counts.items()
+            }
+            for field, counts in result.items()
+        }
+
+    @tracer.traced("repository")
+    async def distinct(
+        self, field: str, filters: list[Filter], limit: int | None = None
+    ) -> list[Any]:
+        # Distinct values of a field in the records matching the filters
+        return await self.gateway.distinct(field, filters, limit=limit)
@@ -6,6 +6,7 @@ from sqlalchemy import (
     Column,
     DateTime,
     Float,
+    Index,
     Integer,
     MetaData,
     Table,
@@ -24,6 +25,8 @@ test_model = Table(
     Column("updated_at", DateTime(timezone=True), nullable=False),
     Column("n", Float, nullable=True),
     Column("json", postgresql.JSONB(astext_type=Text()), nullable=True),
+    # a natural key, for ingest
+    Index("uq_test_model_n", "n", unique=True, postgresql_where=text("n IS NOT NULL")),
 )
 
 # For SQLProvider integration tests
@@ -1,13 +1,17 @@
 import asyncio
+from datetime import datetime, timezone
 
 import pytest
-from sqlalchemy.sql import text
+from sqlalchemy.sql import select, text
 
 from src.core.domain.exceptions import AlreadyExists, Conflict
 from src.core.gateway.sql.asyncpg_sql_database import AsyncpgSQLDatabase
 from src.core.gateway.sql.sql_gateway import SQLDatabase
+from src.core.gateway.sql.sqlalchemy_async_sql_database import (
+    SQLAlchemyAsyncSQLDatabase,
+)
 
-from .conftest import count_query, insert_query, update_query
+from .conftest import count_query, insert_query, test_model, update_query
 
 
 @pytest.fixture(params=[AsyncpgSQLDatabase])
@@ -87,6 +91,25 @@ async def test_nested_transaction_err(transaction_with_cleanup):
     assert await db.execute(count_query) == [{"count": 1}]
 
 
+async def test_stream(database_with_cleanup):
+    db = database_with_cleanup
+    for _ in range(5):
+        await db.execute(insert_query)
+
+    chunks = [
+        rows
+        async for rows in db.stream(text("SELECT id FROM test_model"), chunk_size=2)
+    ]
+
+    assert [len(x) for x in chunks] == [2, 2, 1]
+
+
+async def test_stream_is_read_only(database_with_cleanup):
+    with pytest.raises(Exception):
+        async for _ in database_with_cleanup.stream(insert_query):
+            pass
+
+
 async def test_testing_transaction_rollback(database_with_cleanup):
     async with database_with_cleanup.testing_transaction() as trans:
         await trans.execute(insert_query)
@@ -138,3 +161,40 @@ async def test_handle_integrity_error(
         await database_with_cleanup.execute(
             insert_query_with_id, bind_params={"id": record_id}
         )
+
+
+@pytest.fixture
+async def sqlalchemy_database(postgres_db_url):
+    db = SQLAlchemyAsyncSQLDatabase(postgres_db_url)
+    await db.truncate_tables(["test_model"])
+    yield db
+    await db.truncate_tables(["test_model"])
+    await db.dispose()
+
+
+@pytest.fixture
+def record():
+    return {
+        "t": "foo",
+        "f": 1.23,
+        "b": True,
+        "updated_at": datetime(2016, 6, 23, tzinfo=timezone.utc),
+    }
+
+
+async def test_sqlalchemy_copy_in_and_out(sqlalchemy_database, record):
+    db = sqlalchemy_database
+
+    assert await db.copy_in(test_model, [record, {**record, "t": "bar"}]) == 2
+
+    chunks = [x async for x in db.copy_out(select(test_model.c.t))]
+    assert sorted(x["t"] for chunk in chunks for x in chunk) == ["bar", "foo"]
+
+
+async def test_sqlalchemy_transaction_copy_in_and_out(sqlalchemy_database, record):
+    async with sqlalchemy_database.transaction() as trans:
+        assert await trans.copy_in(test_model, [record]) == 1
+        chunks = [x async for x in trans.copy_out(select(test_model.c.t))]
+
+    assert chunks == [[{"t": "foo"}]]
+    assert await sqlalchemy_database.execute(count_query) == [{"count": 1}]
@@ -162,6 +162,23 @@ async def test_upsert_does_update(sql_gateway, test_transaction, obj_in_db):
     assert res[0]["t"] == "bar"
 
 
+async def test_ingest(sql_gateway, test_transaction, obj):
+    added = await sql_gateway.ingest({**obj, "n": 1.0})
+    updated = await sql_gateway.ingest({**obj, "n": 1.0, "t": "bar", "b": False}, ["b"])
+
+    assert updated["id"] == added["id"]
+    assert updated["t"] == "bar"
+    assert updated["b"] is True
+    assert await sql_gateway.count([]) == 1
+
+
+async def test_ingest_without_natural_key(sql_gateway, test_transaction, obj):
+    await sql_gateway.ingest(obj)
+    await sql_gateway.ingest(obj)
+
+    assert await sql_gateway.count([]) == 2
+
+
 async def test_remove(sql_gateway, test_transaction, obj_in_db):
     assert await sql_gateway.remove(obj_in_db["id"])
 
@@ -197,6 +214,50 @@ async def test_update_if_unmodified_since_not_ok(
         await sql_gateway.update(obj_in_db, if_unmodified_since=if_unmodified_since)
 
 
+async def test_get_many(sql_gateway, obj_in_db):
+    actual = await sql_gateway.get_many([42, obj_in_db["id"]])
+
+    assert actual == [None, obj_in_db]
+
+
+async def test_patch(sql_gateway, test_transaction, obj_in_db):
+    patched = await sql_gateway.patch(
+        obj_in_db["id"], {"t": "bar"}, if_unmodified_since=obj_in_db["updated_at"]
+    )
+
+    assert patched == {**obj_in_db, "t": "bar", "updated_at": patched["updated_at"]}
+    assert patched["updated_at"] > obj_in_db["updated_at"]
+
+
+async def test_patch_not_found(sql_gateway):
+    with pytest.raises(DoesNotExist):
+        await sql_gateway.patch(42, {"t": "bar"})
+
+
+async def test_patch_if_unmodified_since_not_ok(sql_gateway, obj_in_db):
+    with pytest.raises(Conflict):
+        await sql_gateway.patch(
+            obj_in_db["id"], {"t": "bar"}, if_unmodified_since=datetime(2010, 1, 1)
+        )
+
+
+async def test_update_where(sql_gateway, obj_in_db):
+    ids = await sql_gateway.update_where(
+        [Filter(field="t", values=["foo"])], {"t": "bar"}
+    )
+
+    assert ids == [obj_in_db["id"]]
+    updated = await sql_gateway.get(obj_in_db["id"])
+    assert updated["t"] == "bar"
+    assert updated["updated_at"] > obj_in_db["updated_at"]
+
+
+async def test_remove_where(sql_gateway, obj_in_db):
+    assert await sql_gateway.remove_where([Filter(field="t", values=["bar"])]) == []
+    assert await sql_gateway.remove_where([]) == [obj_in_db["id"]]
+    assert await sql_gateway.count([]) == 0
+
+
 @pytest.mark.parametrize(
     "filters,match",
     [
@@ -262,3 +323,34 @@ async def test_truncate(database: SQLDatabase, obj):
     assert await gateway.exists([])
     await database.truncate_tables(["test_model"])
     assert not await gateway.exists([])
+
+
+async def test_copy_in(sql_gateway, test_transaction, obj):
+    del obj["json"]  # json(b) has a text codec, which a binary COPY can't use
+
+    assert await sql_gateway.copy_in([obj, {**obj, "t": "bar", "n": 2.0}]) == 2
+
+    assert await sql_gateway.count([Filter(field="t", values=["bar"])]) == 1
+
+
+async def test_copy_in_unique_violation(sql_gateway, test_transaction, obj):
+    del obj["json"]
+
+    with pytest.raises(AlreadyExists):
+        await sql_gateway.copy_in([{**obj, "n": 1.0}, {**obj, "n": 1.0}])
+
+
+async def test_copy_out(sql_gateway, obj_in_db, obj2_in_db):
+    chunks = [x async for x in sql_gateway.copy_out([])]
+
+    actual = {x["id"]: x for chunk in chunks for x in chunk}
+    assert actual[obj_in_db["id"]] == obj_in_db
+    assert len(actual) == 2
+
+
+async def test_copy_out_filtered(sql_gateway, obj_in_db, obj2_in_db):
+    chunks = [
+        x async for x in sql_gateway.copy_out([Filter(field="t", values=["bar"])])
+    ]
+
+    assert [x["id"] for chunk in chunks for x in chunk] == [obj2_in_db["id"]]
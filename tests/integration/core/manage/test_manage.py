@@ -4,6 +4,8 @@ from uuid import UUID
 import pytest
 
 from src.application.domain.enums.country import Country
+from src.core.domain.exceptions import AlreadyExists
+from src.core.repository.base.filter import Filter
 
 pytestmark = pytest.mark.integration
 
@@ -53,3 +55,78 @@ async def test_manage_update(manage_job, data):
 
     assert updated.c != created.c
     assert isinstance(updated.c, Country)
+
+
+async def test_manage_create_many(manage_job, data):
+    created = await manage_job.create_many([data, {**data, "t": "bar"}], batch_size=1)
+
+    assert [x.t for x in created] == ["foo", "bar"]
+    assert await manage_job.count([]) == 2
+
+
+async def test_manage_create_many_already_exists(manage_job, data):
+    existing = await manage_job.create(data)
+
+    with pytest.raises(AlreadyExists):
+        await manage_job.create_many([{**data, "t": "bar"}, existing.to_dict()])
+    assert await manage_job.count([]) == 1
+
+
+async def test_manage_upsert_many(manage_job, data):
+    existing = await manage_job.create(data)
+    upserted = await manage_job.upsert_many(
+        [existing.update(t="bar"), {**data, "t": "baz"}]
+    )
+
+    assert [x.t for x in upserted] == ["bar", "baz"]
+    assert (await manage_job.retrieve(existing.id)).t == "bar"
+    assert await manage_job.count([]) == 2
+
+
+async def test_manage_iterate(manage_job, data):
+    await manage_job.create_many([{**data, "t": str(i)} for i in range(5)])
+
+    actual = [x.t async for x in manage_job.iterate(chunk_size=2)]
+
+    assert sorted(actual) == ["0", "1", "2", "3", "4"]
+
+
+async def test_manage_suggest(manage_job, data):
+    texts = ["Foo", "foobar", "food", "foo", "bar", "50%_off", "50 percent"]
+    await manage_job.create_many([{**data, "t": x} for x in texts])
+
+    assert await manage_job.suggest("t", "fOo", limit=3) == ["Foo", "foo", "foobar"]
+    assert await manage_job.suggest("t", "50%_") == ["50%_off"]
+
+
+async def test_manage_facets(manage_job, data):
+    countries = [Country.UnitedArabEmirates, Country.Germany, Country.Germany]
+    await manage_job.create_many([{**data, "c": x} for x in countries])
+
+    actual = await manage_job.facets([Filter(field="t", values=["foo"])], ["c"])
+
+    assert actual == {"c": {Country.Germany: 2, Country.UnitedArabEmirates: 1}}
+
+
+async def test_manage_update_where(manage_job, data):
+    countries = [Country.UnitedArabEmirates, Country.Germany, Country.Germany]
+    created = await manage_job.create_many([{**data, "c": x} for x in countries])
+
+    ids = await manage_job.update_where(
+        [Filter(field="c", values=[Country.Germany])], {"c": Country.Oman}
+    )
+
+    assert sorted(ids) == sorted(x.id for x in created[1:])
+    updated = await manage_job.retrieve(ids[0])
+    assert updated.c == Country.Oman
+    assert updated.updated_at > data["updated_at"]
+
+
+async def test_manage_destroy_where(manage_job, data):
+    countries = [Country.UnitedArabEmirates, Country.Germany]
+    created = await manage_job.create_many([{**data, "c": x} for x in countries])
+
+    ids = await manage_job.destroy_where([Filter(field="c", values=[Country.Germany])])
+
+    assert ids == [created[1].id]
+    assert await manage_job.count([]) == 1
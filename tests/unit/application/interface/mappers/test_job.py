@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from types import MappingProxyType
 from uuid import UUID
 
 import pytest
@@ -142,3 +143,42 @@ async def test_to_internal(job_mapper, external_job, expected_internal):
 async def test_to_external(job_mapper, internal_job, expected_external):
     result = await job_mapper.to_external(internal_job)
     assert result == expected_external
+
+
+@pytest.mark.asyncio
+async def test_to_internal_partial(job_mapper):
+    result = await job_mapper.to_internal(
+        {"id": UUID("40f478ce-1128-4eaa-b9c3-0f0d5e0bb789"), "status": "APPLIED"}
+    )
+    assert result["status"] == JobStatus.APPLIED
+    assert result["description"] is None
+
+
+@pytest.mark.asyncio
+async def test_to_external_partial(job_mapper):
+    result = await job_mapper.to_external(
+        {"title": "Data Engineer", "status": JobStatus.APPLIED, "other": 1}
+    )
+    assert result == {"title": "Data Engineer", "status": "APPLIED"}
+
+
+@pytest.mark.asyncio
+async def test_to_internal_many(job_mapper):
+    rows = [
+        MappingProxyType({"id": 1, "country": "Oman", "status": "APPLIED"}),
+        MappingProxyType({"id": 2, "country": None, "work_setting_type": "HYBRID"}),
+    ]
+    result = job_mapper.to_internal_many(rows)
+    assert result == [await job_mapper.to_internal(dict(x)) for x in rows]
+    assert result[0]["country"] is Country.Oman
+    assert result[0]["status"] is JobStatus.APPLIED
+    assert result[1]["work_setting_type"] is WorkSettingType.HYBRID
+
+
+@pytest.mark.asyncio
+async def test_to_external_many(job_mapper):
+    internals = [{"id": 1, "country": Country.Oman}, {"id": 2, "status": None}]
+    assert job_mapper.to_external_many(internals) == [
+        {"id": 1, "country": "Oman"},
+        {"id": 2, "status": None},
+    ]
@@ -1,7 +1,12 @@
 from datetime import datetime
 
 from src.application.requests.job.list_jobs import build_job_list_request
-from src.core.repository.base.filter import ComparisonFilter, ComparisonOperator, Filter
+from src.core.repository.base.filter import (
+    ComparisonFilter,
+    ComparisonOperator,
+    Filter,
+    TextSearchFilter,
+)
 
 
 def test_build_job_list_request_no_filters():
@@ -73,3 +78,63 @@ def test_build_job_list_request_valid_filters():
 
     assert request.filters == expected
     assert bool(request) is True
+
+
+def test_build_job_list_request_invalid_cursor():
+    request = build_job_list_request(params={"limit": 2, "cursor": "garbage"})
+
+    assert request.has_errors()
+    assert request.errors[0]["parameter"] == "params"
+    assert bool(request) is False
+
+
+def test_build_job_list_request_search():
+    request = build_job_list_request(
+        filters={"q": "python -django"}, params={"rank": True}
+    )
+
+    assert request.filters == [
+        TextSearchFilter(field="search_vector", values=["python -django"])
+    ]
+    assert request.params.rank is True
+    assert bool(request) is True
+
+
+def test_build_job_list_request_empty_search():
+    request = build_job_list_request(filters={"q": " "})
+
+    assert request.has_errors()
+    assert request.errors[0]["parameter"] == "q"
+    assert bool(request) is False
+
+
+def test_build_job_list_request_rank_without_search():
+    request = build_job_list_request(params={"rank": True})
+
+    assert request.has_errors()
+    assert request.errors[0]["parameter"] == "params"
+    assert bool(request) is False
+
+
+def test_build_job_list_request_pattern_filters():
+    request = build_job_list_request(
+        filters={"company__startswith": "Ac", "title__contains": "python"}
+    )
+
+    assert request.filters == [
+        ComparisonFilter(
+            field="company", values=["Ac"], operator=ComparisonOperator.STARTSWITH
+        ),
+        ComparisonFilter(
+            field="title", values=["python"], operator=ComparisonOperator.CONTAINS
+        ),
+    ]
+    assert bool(request) is True
+
+
+def test_build_job_list_request_empty_pattern():
+    request = build_job_list_request(filters={"company__startswith": ""})
+
+    assert request.has_errors()
+    assert request.errors[0]["parameter"] == "company__startswith"
+    assert bool(request) is False
@@ -1,9 +1,15 @@
 import json
+from unittest import mock
 
 import pytest
 from hypothesis import given
 
-from src.application.serializers.job import JobJsonEncoder
+from src.application.serializers import job as serializers
+from src.application.serializers.job import (
+    JOB_FIELDS,
+    JobJsonEncoder,
+    encode_jobs_ndjson,
+)
 from tests.unit.application.domain.test_job import job_strategy
 
 
@@ -39,3 +45,23 @@ def test_job_json_encoder_fallback():
         str(exc_info.value)
         == "Object of type UnserializableObject is not JSON serializable"
     )
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+@given(job=job_strategy())
+def test_encode_jobs_ndjson(use_orjson, job):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    orjson = serializers.orjson if use_orjson else None
+    with mock.patch.object(serializers, "orjson", orjson):
+        line, end = encode_jobs_ndjson([job]).split(b"\n")
+    job_dict = json.loads(line)
+
+    assert end == b""
+    assert list(job_dict) == list(JOB_FIELDS)
+    assert job_dict["id"] == str(job.id)
+    assert job_dict["user_id"] == str(job.user_id)
+    assert job_dict["status"] == job.status.value
+    assert job_dict["country"] == job.country.value
+    assert job_dict["created_at"] == job.created_at.isoformat()
+    assert job_dict["title"] == job.title
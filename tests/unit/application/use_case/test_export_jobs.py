@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+import pytest
+
+from src.application.domain.entity.job import Job, JobStatus, WorkSettingType
+from src.application.domain.enums.country import Country
+from src.application.infrastructure.repository.job import JobRepository
+from src.application.manage.job import ManageJob
+from src.application.serializers.job import JOB_FIELDS
+from src.application.use_case.job.export_jobs import ExportFormat, export_jobs
+from src.application.use_case.job.import_jobs import import_jobs
+from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
+
+
+def make_job(**values):
+    data = {
+        "user_id": uuid4(),
+        "title": "Data Engineer",
+        "company": "Acme",
+        "description": "Build pipelines.",
+        "country": Country.Germany,
+        "city": "Berlin",
+        "work_setting_type": WorkSettingType.HYBRID,
+        "status": JobStatus.APPLIED,
+    }
+    return Job.create(**{**data, **values})
+
+
+async def test_export_jobs(job_manager):
+    jobs = [make_job(title=x) for x in "ab"]
+    await job_manager.create_many([dict(vars(x)) for x in jobs])
+    fp = io.BytesIO()
+
+    result = await export_jobs(job_manager, fp)
+
+    assert result.exported == 2
+    assert [json.loads(x)["title"] for x in fp.getvalue().splitlines()] == ["a", "b"]
+
+
+async def test_export_jobs_csv(job_manager):
+    job = make_job(notes=None)
+    await job_manager.create(dict(vars(job)))
+    fp = io.BytesIO()
+
+    await export_jobs(job_manager, fp, format=ExportFormat.CSV)
+
+    (row,) = csv.DictReader(io.StringIO(fp.getvalue().decode()))
+    assert list(row) == list(JOB_FIELDS)
+    assert row["id"] == str(job.id)
+    assert row["country"] == "DE"
+    assert row["notes"] == ""
+    assert not fp.closed
+
+
+async def test_export_jobs_parquet(job_manager):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    job = make_job()
+    await job_manager.create(dict(vars(job)))
+    fp = io.BytesIO()
+
+    await export_jobs(job_manager, fp, format=ExportFormat.PARQUET)
+
+    fp.seek(0)
+    (row,) = parquet.read_table(fp).to_pylist()
+    assert row["id"] == str(job.id)
+    assert row["status"] == "applied"
+    assert row["created_at"] == job.created_at
+
+
+async def test_export_and_import(job_manager, tmp_path):
+    jobs = [make_job(title=x) for x in "ab"]
+    await job_manager.create_many([dict(vars(x)) for x in jobs])
+    path = tmp_path / "jobs.ndjson"
+    with open(path, "wb") as fp:
+        await export_jobs(job_manager, fp)
+    other = ManageJob(JobRepository(InMemoryGateway([])))
+
+    with ThreadPoolExecutor(1) as executor:
+        result = await import_jobs([path], other, print, executor=executor, fast=True)
+
+    assert result.imported == 2
+    assert (await other.retrieve_many([x.id for x in jobs])) == jobs
@@ -0,0 +1,237 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+
+from src.application.domain.entity.job import Job, JobStatus, WorkSettingType
+from src.application.domain.enums.country import Country
+from src.application.infrastructure.repository.job import JobRepository
+from src.application.manage.job import ManageJob
+from src.application.use_case.job.import_jobs import (
+    Document,
+    ImportFailure,
+    import_jobs,
+    normalize,
+    parse_documents,
+    read_documents,
+)
+from src.core.domain.exceptions import AlreadyExists
+from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
+
+USER_ID = str(uuid4())
+WORKERS = 2
+
+# As written by the Chrome extension
+YAML_JOB = f"""\
+title: Data Engineer
+company: Acme
+user_id: {USER_ID}
+status: added
+country: DE
+city: Berlin
+work_setting_type: hybrid
+employment_type: fulltime
+platform: LinkedIn
+url: https://example.com/jobs/1
+notes: ""
+description: |
+  |
+  Build pipelines.
+  Maintain them.
+"""
+
+
+def ndjson_job(url, **values):
+    data = {
+        "title": "Backend Engineer",
+        "company": "Initech",
+        "user_id": USER_ID,
+        "status": "added",
+        "country": "N/A",
+        "city": "Remote",
+        "work_setting_type": "remote",
+        "url": url,
+        "description": "Write services.",
+    }
+    return json.dumps({**data, **values}) + "\n"
+
+
+@pytest.fixture
+def manager():
+    gateway = InMemoryGateway([], unique_keys=[("user_id", "url")])
+    return ManageJob(JobRepository(gateway))
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / "a.yaml").write_text(YAML_JOB)
+    (tmp_path / "b.ndjson").write_text(
+        ndjson_job("https://example.com/jobs/2")
+        + "\n"
+        + ndjson_job("https://example.com/jobs/3", title=None)
+    )
+    (tmp_path / "notes.txt").write_text("ignored")
+    return tmp_path
+
+
+def test_read_documents(files):
+    actual = list(read_documents([files]))
+
+    assert [x.source for x in actual] == [
+        str(files / "a.yaml"),
+        f"{files / 'b.ndjson'}:1",
+        f"{files / 'b.ndjson'}:3",
+    ]
+    assert [x.ndjson for x in actual] == [False, True, True]
+
+
+def test_normalize():
+    actual = normalize(
+        {
+            "country": "de",
+            "status": "APPLIED",
+            "work_setting_type": "remote",
+            "url": "N/A",
+            "notes": "",
+            "description": "|\n  a\n  b\n",
+        }
+    )
+
+    assert actual == {
+        "country": Country.Germany,
+        "status": JobStatus.APPLIED,
+        "work_setting_type": WorkSettingType.REMOTE,
+        "description": "a\nb",
+    }
+
+
+def test_normalize_country_name():
+    assert normalize({"country": "Germany"}) == {"country": Country.Germany}
+
+
+def test_parse_documents():
+    (job,) = parse_documents([Document("a.yaml", YAML_JOB)])
+
+    assert isinstance(job, Job)
+    assert job.country == Country.Germany
+    assert job.description == "Build pipelines.\nMaintain them."
+    assert job.notes is None
+
+
+def test_parse_documents_default_country():
+    document = Document("b.ndjson:1", ndjson_job("x"), ndjson=True)
+
+    (failure,) = parse_documents([document])
+    (job,) = parse_documents([document], default_country=Country.Germany)
+
+    assert failure == ImportFailure(
+        "b.ndjson:1", [{"parameter": "country", "message": "'country' is required."}]
+    )
+    assert job.country == Country.Germany
+
+
+@pytest.mark.parametrize(
+    "document,parameter",
+    [
+        (Document("a.ndjson:1", "{", ndjson=True), ""),
+        (Document("a.yaml", "- a list"), "data"),
+        (Document("a.yaml", YAML_JOB.replace("hybrid", "moon")), "work_setting_type"),
+    ],
+)
+def test_parse_documents_invalid(document, parameter):
+    (failure,) = parse_documents([document])
+
+    assert isinstance(failure, ImportFailure)
+    assert failure.source == document.source
+    assert failure.errors[0]["parameter"] == parameter
+
+
+async def test_import_jobs(files, manager):
+    failures = []
+
+    with ThreadPoolExecutor(WORKERS) as executor:
+        result = await import_jobs(
+            [files],
+            manager,
+            failures.append,
+            batch_size=1,
+            chunk_size=1,
+            executor=executor,
+            workers=WORKERS,
+            default_country=Country.Germany,
+        )
+
+    assert (result.imported, result.failed) == (2, 1)
+    assert [x.source for x in failures] == [f"{files / 'b.ndjson'}:3"]
+    assert {x.title for x in (await manager.list()).items} == {
+        "Data Engineer",
+        "Backend Engineer",
+    }
+
+
+async def test_import_jobs_again_updates(files, manager):
+    with ThreadPoolExecutor(WORKERS) as executor:
+        for _ in range(2):
+            await import_jobs(
+                [files / "a.yaml"], manager, print, executor=executor, workers=WORKERS
+            )
+
+    (job,) = (await manager.list()).items
+    assert job.title == "Data Engineer"
+
+
+async def test_import_jobs_counts_duplicates_once(tmp_path, manager):
+    job = ndjson_job("https://example.com/jobs/2")
+    (tmp_path / "a.ndjson").write_text(job + job)
+
+    with ThreadPoolExecutor(WORKERS) as executor:
+        result = await import_jobs(
+            [tmp_path],
+            manager,
+            print,
+            executor=executor,
+            workers=WORKERS,
+            default_country=Country.Germany,
+        )
+
+    assert (result.imported, result.failed) == (1, 0)
+    assert (await manager.list()).total == 1
+
+
+async def test_import_jobs_batch_fails(tmp_path, manager):
+    (tmp_path / "a.ndjson").write_text(
+        "".join(ndjson_job(f"https://example.com/jobs/{i}") for i in range(3))
+    )
+    failures = []
+    ingest_many = manager.ingest_many
+
+    async def fail_first(batch, **kwargs):
+        if "jobs/0" in batch[0].url:
+            raise AlreadyExists(key="url", value=batch[0].url)
+        return await ingest_many(batch, **kwargs)
+
+    with (
+        ThreadPoolExecutor(WORKERS) as executor,
+        mock.patch.object(manager, "ingest_many", fail_first),
+    ):
+        result = await import_jobs(
+            [tmp_path],
+            manager,
+            failures.append,
+            batch_size=2,
+            chunk_size=1,
+            executor=executor,
+            workers=WORKERS,
+            default_country=Country.Germany,
+        )
+
+    # the first batch fails, the import goes on
+    assert (result.imported, result.failed) == (1, 2)
+    assert [x.source for x in failures] == [
+        f"{tmp_path / 'a.ndjson'}:1",
+        f"{tmp_path / 'a.ndjson'}:2",
+    ]
+    assert "already exists" in failures[0].errors[0]["message"]
+    assert (await manager.list()).total == 1
@@ -47,6 +47,17 @@ async def test_update_job_success(job_manager_with_job, job_id):
     assert updated_job.company == "TechCorp"  # Unchanged field
 
 
+async def test_update_job_invalid_value(job_manager_with_job, job_id):
+    """Test updating a job with a value of the wrong type."""
+    response = await update_job(
+        {"id": job_id, "status": "UNKNOWN"}, job_manager_with_job
+    )
+    updated_job = await job_manager_with_job.retrieve(job_id)
+
+    assert response.type == ResponseTypes.PARAMETERS_ERROR
+    assert updated_job.status == JobStatus.APPLIED
+
+
 async def test_update_job_not_found(job_manager_with_job):
     """Test updating a non-existent job."""
     update_data = {
@@ -145,3 +145,42 @@ def test_neq(color):
         description="A primary color",
         hex_code="#00FF00",
     )
+
+
+def test_from_trusted(color):
+    actual = Color.from_trusted(color.to_dict())
+    assert actual == color
+    assert actual.model_fields_set == set(Color.model_fields)
+
+
+def test_from_trusted_does_not_validate():
+    actual = Color.from_trusted(
+        {
+            "name": 1,
+            "code": "x",
+            "is_primary": None,
+            "description": None,
+            "hex_code": None,
+        }
+    )
+    assert (actual.name, actual.code) == (1, "x")
+
+
+def test_from_trusted_partial():
+    actual = Color.from_trusted({"name": "green", "code": 42, "is_primary": True})
+    assert actual.description is None
+    assert actual.model_fields_set == {"name", "code", "is_primary"}
+
+
+def test_from_trusted_update_validates(color):
+    with pytest.raises(ValidationError):
+        Color.from_trusted(color.to_dict()).update(code="x")
+
+
+def test_validate_fields():
+    assert Color.validate_fields(code="42", unknown=1) == {"code": 42}
+
+
+def test_validate_fields_invalid():
+    with pytest.raises(ValidationError):
+        Color.validate_fields(code="x")
@@ -0,0 +1,101 @@
+import asyncio
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+
+from src.core.domain.context import Tenant, ctx
+from src.core.gateway.batching.batching_gateway import BatchingGateway
+from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
+from src.core.repository.base.filter import Filter
+
+ids = [uuid4() for i in range(5)]
+
+
+@pytest.fixture
+def in_memory_gateway():
+    return InMemoryGateway(data=[{"id": x, "name": str(i)} for i, x in enumerate(ids)])
+
+
+@pytest.fixture
+def filter_m(in_memory_gateway):
+    with mock.patch.object(
+        in_memory_gateway, "filter", wraps=in_memory_gateway.filter
+    ) as filter_m:
+        yield filter_m
+
+
+@pytest.fixture
+def batching_gateway(in_memory_gateway):
+    return BatchingGateway(in_memory_gateway, max_batch_size=3)
+
+
+async def test_get_coalesced(batching_gateway, filter_m):
+    missing = uuid4()
+    actual = await asyncio.gather(
+        batching_gateway.get(ids[0]),
+        batching_gateway.get(ids[1]),
+        batching_gateway.get(ids[0]),
+        batching_gateway.get(missing),
+    )
+    assert [x and x["name"] for x in actual] == ["0", "1", "0", None]
+    assert actual[0] is not actual[2]  # callers get their own record
+    filter_m.assert_awaited_once_with(
+        [Filter(field="id", values=[ids[0], ids[1], missing])], params=None
+    )
+    assert batching_gateway.batches == 1
+
+
+async def test_get_max_batch_size(batching_gateway, filter_m):
+    actual = await asyncio.gather(*(batching_gateway.get(x) for x in ids))
+    assert [x["id"] for x in actual] == ids
+    assert [len(x.args[0][0].values) for x in filter_m.await_args_list] == [3, 2]
+
+
+async def test_get_sequential(batching_gateway, filter_m):
+    assert (await batching_gateway.get(ids[0]))["name"] == "0"
+    assert (await batching_gateway.get(ids[1]))["name"] == "1"
+    assert filter_m.await_count == 2
+
+
+async def test_get_per_tenant(batching_gateway, filter_m):
+    tenants = [Tenant(id=uuid4(), name="a"), Tenant(id=uuid4(), name="b")]
+    seen = []
+
+    async def filter(filters, params=None):
+        seen.append(ctx.tenant)
+        return []
+
+    filter_m.side_effect = filter
+
+    async def get(tenant, id):
+        ctx.tenant = tenant
+        return await batching_gateway.get(id)
+
+    await asyncio.gather(*(get(tenants[i % 2], x) for i, x in enumerate(ids[:4])))
+    assert sorted(seen, key=lambda x: x.name) == tenants
+
+
+async def test_get_error(batching_gateway, filter_m):
+    filter_m.side_effect = RuntimeError("boom")
+    actual = await asyncio.gather(
+        batching_gateway.get(ids[0]),
+        batching_gateway.get(ids[1]),
+        return_exceptions=True,
+    )
+    assert all(isinstance(x, RuntimeError) for x in actual)
+    assert filter_m.await_count == 1
+
+
+async def test_get_cancelled_caller(batching_gateway, filter_m):
+    task = asyncio.ensure_future(batching_gateway.get(ids[0]))
+    other = asyncio.ensure_future(batching_gateway.get(ids[0]))
+    await asyncio.sleep(0)
+    task.cancel()
+    assert (await other)["name"] == "0"
+    assert filter_m.await_count == 1
+
+
+async def test_update_delegates(batching_gateway, in_memory_gateway):
+    await batching_gateway.update({"id": ids[0], "name": "x"})
+    assert in_memory_gateway.data[ids[0]]["name"] == "x"
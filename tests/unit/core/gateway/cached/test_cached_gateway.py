@@ -0,0 +1,177 @@
+from datetime import datetime, timezone
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+
+from src.core.domain.context import Tenant, ctx
+from src.core.domain.exceptions import Conflict
+from src.core.gateway.cached.cached_gateway import CachedGateway
+from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
+from src.core.repository.base.filter import Filter
+
+ids = [uuid4() for i in range(2)]
+ts = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def in_memory_gateway():
+    return InMemoryGateway(
+        data=[
+            {"id": ids[0], "name": "a", "updated_at": ts},
+            {"id": ids[1], "name": "b", "updated_at": ts},
+        ]
+    )
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cached_gateway(in_memory_gateway, clock):
+    return CachedGateway(in_memory_gateway, maxsize=2, ttl=10, clock=clock)
+
+
+@pytest.fixture
+def get_m(in_memory_gateway):
+    with mock.patch.object(
+        in_memory_gateway, "get", wraps=in_memory_gateway.get
+    ) as get_m:
+        yield get_m
+
+
+async def test_get_cached(cached_gateway, get_m):
+    first = await cached_gateway.get(ids[0])
+    first["name"] = "changed"  # callers get a copy
+    assert (await cached_gateway.get(ids[0]))["name"] == "a"
+    assert get_m.await_count == 1
+    assert cached_gateway.info().hit_ratio == 0.5
+
+
+async def test_get_expires(cached_gateway, get_m, clock):
+    await cached_gateway.get(ids[0])
+    clock.now = 11
+    await cached_gateway.get(ids[0])
+    assert get_m.await_count == 2
+
+
+async def test_get_negative(in_memory_gateway, get_m, clock):
+    cached_gateway = CachedGateway(
+        in_memory_gateway, ttl=10, negative_ttl=1, clock=clock
+    )
+    missing = uuid4()
+    assert await cached_gateway.get(missing) is None
+    assert await cached_gateway.get(missing) is None
+    assert get_m.await_count == 1
+    clock.now = 2
+    assert await cached_gateway.get(missing) is None
+    assert get_m.await_count == 2
+
+
+async def test_lru_eviction(cached_gateway, get_m):
+    await cached_gateway.get(ids[0])
+    await cached_gateway.get(ids[1])
+    await cached_gateway.get(ids[0])  # ids[1] is now least recently used
+    await cached_gateway.get(uuid4())
+    await cached_gateway.get(ids[0])
+    await cached_gateway.get(ids[1])
+    info = cached_gateway.info()
+    assert (info.hits, info.misses, info.size) == (2, 4, 2)
+
+
+async def test_tenant_aware(cached_gateway, get_m):
+    ctx.tenant = Tenant(id=uuid4(), name="a")
+    await cached_gateway.get(ids[0])
+    ctx.tenant = Tenant(id=uuid4(), name="b")
+    await cached_gateway.get(ids[0])
+    ctx.tenant = None
+    assert get_m.await_count == 2
+
+
+async def test_add_replaces_negative_entry(cached_gateway, get_m):
+    new_id = uuid4()
+    assert await cached_gateway.get(new_id) is None
+    await cached_gateway.add({"id": new_id, "name": "c", "updated_at": ts})
+    assert (await cached_gateway.get(new_id))["name"] == "c"
+    assert get_m.await_count == 1
+
+
+async def test_get_many(cached_gateway, in_memory_gateway, get_m):
+    missing = uuid4()
+    await cached_gateway.get(ids[0])
+    with mock.patch.object(
+        in_memory_gateway, "get_many", wraps=in_memory_gateway.get_many
+    ) as get_many_m:
+        actual = await cached_gateway.get_many([ids[1], ids[0], missing])
+        assert [x and x["name"] for x in actual] == ["b", "a", None]
+        get_many_m.assert_awaited_once_with([ids[1], missing], chunk_size=1000)
+        await cached_gateway.get_many([ids[1], missing])  # maxsize is 2
+        assert get_many_m.await_count == 1
+
+
+async def test_update_refreshes(cached_gateway, get_m):
+    await cached_gateway.get(ids[0])
+    await cached_gateway.update({"id": ids[0], "name": "x"})
+    assert (await cached_gateway.get(ids[0]))["name"] == "x"
+    assert get_m.await_count == 1
+
+
+async def test_update_conflict_invalidates(cached_gateway, in_memory_gateway, get_m):
+    await cached_gateway.get(ids[0])
+    in_memory_gateway.data[ids[0]]["updated_at"] = datetime.now(timezone.utc)
+    with pytest.raises(Conflict):
+        await cached_gateway.update({"id": ids[0]}, if_unmodified_since=ts)
+    await cached_gateway.get(ids[0])
+    assert get_m.await_count == 2
+
+
+async def test_patch_refreshes(cached_gateway, get_m):
+    await cached_gateway.get(ids[0])
+    await cached_gateway.patch(ids[0], {"name": "x"})
+    assert (await cached_gateway.get(ids[0]))["name"] == "x"
+    # the wrapped gateway reads the record to patch it
+    assert get_m.await_count == 2
+
+
+async def test_upsert_many_refreshes(cached_gateway, get_m):
+    await cached_gateway.get(ids[0])
+    await cached_gateway.upsert_many([{"id": ids[0], "name": "x"}])
+    assert (await cached_gateway.get(ids[0]))["name"] == "x"
+    assert get_m.await_count == 1
+
+
+async def test_remove_invalidates(cached_gateway, get_m):
+    await cached_gateway.get(ids[0])
+    assert await cached_gateway.remove(ids[0])
+    assert await cached_gateway.get(ids[0]) is None
+    assert get_m.await_count == 2
+
+
+async def test_update_where_invalidates(cached_gateway, get_m):
+    await cached_gateway.get(ids[0])
+    await cached_gateway.get(ids[1])
+    await cached_gateway.update_where([Filter(field="name", values=["a"])], {"x": 1})
+    assert (await cached_gateway.get(ids[0]))["x"] == 1
+    assert "x" not in await cached_gateway.get(ids[1])
+
+
+async def test_remove_where_invalidates(cached_gateway):
+    await cached_gateway.get(ids[0])
+    assert await cached_gateway.remove_where([]) == ids
+    assert await cached_gateway.get(ids[0]) is None
+
+
+async def test_filter_passes_through(cached_gateway):
+    actual = await cached_gateway.filter([Filter(field="name", values=["b"])])
+    assert [x["id"] for x in actual] == [ids[1]]
+    assert cached_gateway.info().size == 0
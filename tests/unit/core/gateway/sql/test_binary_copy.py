@@ -0,0 +1,131 @@
+import struct
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    select,
+)
+from sqlalchemy.dialects.postgresql import INTERVAL, JSONB, UUID
+
+from src.core.gateway.sql.binary_copy import (
+    EPOCH_DATE,
+    EPOCH_TZ,
+    SIGNATURE,
+    BinaryCopyDecoder,
+)
+
+table = Table(
+    "thing",
+    MetaData(),
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("name", String),
+    Column("kind", Enum("small", "large", name="kind")),
+    Column("count", Integer),
+    Column("price", Float),
+    Column("active", Boolean),
+    Column("created_at", DateTime(timezone=True)),
+    Column("day", Date),
+    Column("data", JSONB),
+)
+
+
+def field(value: bytes | None) -> bytes:
+    if value is None:
+        return struct.pack(">i", -1)
+    return struct.pack(">i", len(value)) + value
+
+
+def binary_copy(*rows: list[bytes | None]) -> bytes:
+    result = SIGNATURE + struct.pack(">ii", 0, 0)
+    for row in rows:
+        result += struct.pack(">h", len(row)) + b"".join(map(field, row))
+    return result + struct.pack(">h", -1)
+
+
+@pytest.fixture
+def record():
+    return {
+        "id": uuid4(),
+        "name": "Zoë",
+        "kind": "large",
+        "count": -3,
+        "price": 1.5,
+        "active": True,
+        "created_at": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+        "day": date(1999, 12, 31),
+        "data": {"a": [1]},
+    }
+
+
+def encode(record):
+    micros = (record["created_at"] - EPOCH_TZ) // timedelta(microseconds=1)
+    return [
+        record["id"].bytes,
+        record["name"].encode(),
+        record["kind"].encode(),
+        struct.pack(">i", record["count"]),
+        struct.pack(">d", record["price"]),
+        b"\x01",
+        struct.pack(">q", micros),
+        struct.pack(">i", (record["day"] - EPOCH_DATE).days),
+        b'\x01{"a": [1]}',
+    ]
+
+
+def test_decode(record):
+    decoder = BinaryCopyDecoder.for_query(select(table))
+
+    assert decoder.feed(binary_copy(encode(record))) == [record]
+    assert decoder.finished
+
+
+def test_decode_null(record):
+    decoder = BinaryCopyDecoder.for_query(select(table))
+
+    (actual,) = decoder.feed(binary_copy([record["id"].bytes] + [None] * 8))
+
+    assert actual == {"id": record["id"], **{k: None for k in list(record)[1:]}}
+
+
+def test_decode_in_pieces(record):
+    decoder = BinaryCopyDecoder.for_query(select(table))
+    data = binary_copy(encode(record), encode(record))
+
+    rows = [row for i in range(len(data)) for row in decoder.feed(data[i : i + 1])]
+
+    assert rows == [record, record]
+    assert decoder.finished
+    assert not decoder.buffer
+
+
+def test_decode_projection(record):
+    decoder = BinaryCopyDecoder.for_query(select(table.c.id, table.c.count))
+
+    id, _, _, count, *_ = encode(record)
+
+    assert decoder.feed(binary_copy([id, count])) == [{"id": record["id"], "count": -3}]
+
+
+def test_not_a_binary_copy():
+    decoder = BinaryCopyDecoder.for_query(select(table))
+
+    with pytest.raises(ValueError):
+        decoder.feed(b"id,name\n1,foo\n" * 2)
+
+
+def test_unsupported_type():
+    other = Table("other", MetaData(), Column("duration", INTERVAL))
+
+    with pytest.raises(NotImplementedError):
+        BinaryCopyDecoder.for_query(select(other))
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+
+from src.core.gateway.sql.asyncpg_sql_database import compile
+from src.core.gateway.sql.index_advisor import FilterShape, full_scans, read_shapes
+from src.core.repository.base.filter import ComparisonFilter, ComparisonOperator, Filter
+from src.core.repository.base.pagination import PageOptions
+
+writer = Table(
+    "writer",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+
+@pytest.fixture
+def shape():
+    return FilterShape(
+        "writer", (("name", "in"), ("created_at", "gt")), order_by="created_at"
+    )
+
+
+def test_shape_of():
+    filters = [
+        Filter(field="name", values=["a", "b"]),
+        ComparisonFilter(
+            field="created_at",
+            operator=ComparisonOperator.GT,
+            values=[datetime.now(timezone.utc)],
+        ),
+    ]
+
+    actual = FilterShape.of("writer", filters, PageOptions(order_by="created_at"))
+
+    assert actual.filters == (("name", "in"), ("created_at", "gt"))
+    assert actual.order_by == "created_at"
+
+
+def test_shape_round_trip(shape):
+    assert FilterShape.from_dict(json.loads(json.dumps(shape.to_dict()))) == shape
+
+
+def test_shape_query_has_typed_placeholders(shape):
+    sql, *args = compile(shape.query(writer))
+
+    assert "writer.name IN ($1::VARCHAR, $2::VARCHAR)" in sql
+    assert "writer.created_at > $3::TIMESTAMP WITH TIME ZONE" in sql
+    assert "ORDER BY writer.created_at ASC" in sql
+
+
+def test_search_shape_query():
+    shape = FilterShape("writer", (("name", "search"),))
+
+    sql, *args = compile(shape.query(writer))
+
+    assert "websearch_to_tsquery(CAST($2::VARCHAR AS REGCONFIG), $3::VARCHAR)" in sql
+
+
+def test_read_shapes(tmp_path, shape):
+    other = FilterShape("writer", (("id", "eq"),))
+    path = tmp_path / "trace.jsonl"
+    lines = [
+        {"name": "a", "attributes": {"filter_shape": shape.to_dict()}},
+        {"name": "b", "attributes": {}},
+        {"name": "c", "attributes": {"filter_shape": other.to_dict()}},
+        {"name": "d", "attributes": {"filter_shape": shape.to_dict()}},
+    ]
+    path.write_text("".join(json.dumps(x) + "\n" for x in lines))
+
+    assert read_shapes(path) == [shape, other]
+    assert read_shapes(path, limit=1) == [shape]
+
+
+def test_full_scans():
+    plan = [
+        {
+            "Plan": {
+                "Node Type": "Limit",
+                "Plans": [
+                    {"Node Type": "Seq Scan", "Relation Name": "jobs"},
+                    {
+                        "Node Type": "Index Scan",
+                        "Relation Name": "users",
+                        "Index Cond": "(id = $1)",
+                    },
+                    {"Node Type": "Index Scan", "Relation Name": "resume"},
+                ],
+            }
+        }
+    ]
+
+    assert full_scans(plan) == ["jobs", "resume"]
+    assert full_scans(json.dumps(plan)) == ["jobs", "resume"]
@@ -0,0 +1,353 @@
+import logging
+import struct
+import uuid
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, select
+
+from src.core.domain.context import ctx
+from src.core.domain.exceptions import AlreadyExists
+from src.core.gateway.sql.asyncpg_sql_database import (
+    AsyncpgSQLTransaction,
+    UniqueViolationError,
+)
+from src.core.gateway.sql.binary_copy import SIGNATURE
+from src.core.gateway.sql.instrumentation import (
+    Histogram,
+    Instrumentation,
+    QueryEvent,
+    QuerySink,
+    QueryStats,
+    SlowQueryLog,
+    fingerprint,
+)
+from src.core.gateway.sql.sqlalchemy_async_sql_database import (
+    SQLAlchemyAsyncSQLDatabase,
+    SQLAlchemyAsyncSQLTransaction,
+)
+
+writer = Table("writer", MetaData(), Column("id", Integer, primary_key=True))
+
+
+class ListSink(QuerySink):
+    def __init__(self):
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+
+def event(**kwargs):
+    defaults = dict(
+        sql="SELECT 1",
+        fingerprint=fingerprint("SELECT 1"),
+        compile_time=0.0,
+        acquire_time=0.0,
+        execute_time=0.01,
+        rows=1,
+        correlation_id=None,
+    )
+    return QueryEvent(**{**defaults, **kwargs})
+
+
+@pytest.fixture
+def sink():
+    return ListSink()
+
+
+@pytest.fixture
+def correlation_id():
+    value = uuid.uuid4()
+    ctx.correlation_id = value
+    yield value
+    ctx.correlation_id = None
+
+
+def test_fingerprint_ignores_number_of_placeholders():
+    assert fingerprint("SELECT * WHERE id IN ($1, $2, $3)") == fingerprint(
+        "SELECT * WHERE id IN ($1)"
+    )
+    assert fingerprint("SELECT * WHERE id = $1") != fingerprint(
+        "SELECT * WHERE name = $1"
+    )
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.count == 5
+    assert histogram.max == 5.0
+    assert histogram.mean == pytest.approx(1.121)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1.0) == 5.0
+
+
+def test_query_stats_per_fingerprint():
+    stats = QueryStats()
+    stats.record(event(sql="SELECT $1", fingerprint="a", rows=2))
+    stats.record(event(sql="SELECT $1", fingerprint="a", rows=3, compile_time=0.01))
+    stats.record(event(sql="DELETE", fingerprint="b", rows=None, execute_time=1.0))
+
+    assert stats.statements["a"].duration.count == 2
+    assert stats.statements["a"].rows == 5
+    assert stats.statements["a"].compile_time == 0.01
+    assert stats.statements["b"].errors == 1
+    assert [x.sql for x in stats.slowest(1)] == ["DELETE"]
+
+
+def test_query_stats_counts_per_correlation_id():
+    ids = [uuid.uuid4() for _ in range(3)]
+    stats = QueryStats(max_correlation_ids=2)
+    for correlation_id in (ids[0], ids[1], ids[0], ids[2]):
+        stats.record(event(correlation_id=correlation_id))
+
+    assert stats.query_count(ids[0]) == 2
+    assert stats.query_count(ids[1]) == 0  # least recently used, so dropped
+    assert stats.query_count(ids[2]) == 1
+
+
+def test_slow_query_log(caplog):
+    log = SlowQueryLog(threshold=0.1)
+    with caplog.at_level(logging.WARNING):
+        log.record(event(sql="SELECT fast", execute_time=0.05))
+        log.record(event(sql="SELECT slow", execute_time=0.2))
+
+    assert len(caplog.records) == 1
+    assert "SELECT slow" in caplog.records[0].getMessage()
+
+
+def test_instrumentation_tags_correlation_id(sink, correlation_id):
+    Instrumentation([sink]).record("SELECT $1", execute_time=0.01, rows=1)
+
+    (recorded,) = sink.events
+    assert recorded.correlation_id == correlation_id
+    assert recorded.fingerprint == fingerprint("SELECT $1")
+
+
+def test_instrumentation_survives_failing_sink(sink):
+    failing = mock.Mock(spec=QuerySink)
+    failing.record.side_effect = RuntimeError()
+
+    Instrumentation([failing, sink]).record("SELECT 1", rows=1)
+
+    assert len(sink.events) == 1
+
+
+async def test_asyncpg_transaction_records_query(sink):
+    connection = mock.AsyncMock()
+    connection.fetch.return_value = [{"id": 1}, {"id": 2}]
+    transaction = AsyncpgSQLTransaction(
+        connection, instrumentation=Instrumentation([sink]), acquire_time=0.5
+    )
+
+    await transaction.execute(select(writer).where(writer.c.id.in_([1, 2])))
+    await transaction.execute(select(writer).where(writer.c.id.in_([3])))
+
+    first, second = sink.events
+    assert first.rows == 2
+    assert first.acquire_time == 0.5
+    assert second.acquire_time == 0.0
+    assert first.compile_time > 0
+    assert first.fingerprint == second.fingerprint
+
+
+async def test_asyncpg_transaction_records_stream(sink):
+    cursor = mock.AsyncMock()
+    cursor.fetch.side_effect = [[{"id": 1}, {"id": 2}], [{"id": 3}], []]
+    connection = mock.AsyncMock()
+    connection.cursor.return_value = cursor
+    transaction = AsyncpgSQLTransaction(
+        connection, instrumentation=Instrumentation([sink]), acquire_time=0.5
+    )
+
+    chunks = [x async for x in transaction.stream(select(writer), chunk_size=2)]
+
+    assert chunks == [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    assert [x.rows for x in sink.events] == [2, 1, 0]
+    assert [x.acquire_time for x in sink.events] == [0.5, 0.0, 0.0]
+    assert sink.events[0].compile_time > 0
+    assert sink.events[0].sql.startswith("SELECT writer.id")
+
+
+async def test_sqlalchemy_transaction_records_stream(sink, sqlalchemy_transaction):
+    async def partitions(chunk_size):
+        yield [{"id": 1}, {"id": 2}]
+        yield [{"id": 3}]
+
+    result = mock.Mock()
+    result.mappings.return_value.partitions = partitions
+    sqlalchemy_transaction.connection.stream.return_value = result
+    sqlalchemy_transaction.acquire_time = 0.5
+
+    chunks = [
+        x async for x in sqlalchemy_transaction.stream(select(writer), chunk_size=2)
+    ]
+
+    assert chunks == [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    assert [x.rows for x in sink.events] == [2, 1, 0]
+    assert [x.acquire_time for x in sink.events] == [0.5, 0.0, 0.0]
+    assert sink.events[0].sql.startswith("SELECT writer.id")
+
+
+async def test_asyncpg_transaction_records_failed_query(sink):
+    connection = mock.AsyncMock()
+    connection.fetch.side_effect = UniqueViolationError("duplicate")
+    connection.fetch.side_effect.detail = "Key (id)=(1) already exists."
+    transaction = AsyncpgSQLTransaction(
+        connection, instrumentation=Instrumentation([sink])
+    )
+
+    with pytest.raises(AlreadyExists):
+        await transaction.execute(select(writer))
+
+    assert sink.events[0].failed
+
+
+async def test_sqlalchemy_transaction_records_query(sink):
+    connection = mock.AsyncMock()
+    result = connection.execute.return_value
+    result.fetchall = mock.Mock(return_value=[])
+    result.context.statement = "SELECT writer.id FROM writer"
+    transaction = SQLAlchemyAsyncSQLTransaction(
+        connection, instrumentation=Instrumentation([sink]), acquire_time=0.5
+    )
+
+    assert await transaction.execute(select(writer)) == []
+
+    (recorded,) = sink.events
+    assert recorded.sql == "SELECT writer.id FROM writer"
+    assert recorded.rows == 0
+    assert recorded.acquire_time == 0.5
+
+
+@pytest.fixture
+def sqlalchemy_transaction(sink):
+    connection = mock.AsyncMock()
+    return SQLAlchemyAsyncSQLTransaction(
+        connection, instrumentation=Instrumentation([sink])
+    )
+
+
+async def test_sqlalchemy_transaction_copy_in(sink, sqlalchemy_transaction):
+    records = [{"id": 1}, {"id": 2}]
+
+    assert await sqlalchemy_transaction.copy_in(writer, records) == 2
+    assert await sqlalchemy_transaction.copy_in(writer, []) == 0
+
+    # no (nested) transaction is begun, the statement runs in the current one
+    connection = sqlalchemy_transaction.connection
+    (call,) = connection.execute.await_args_list
+    assert str(call.args[0]) == "INSERT INTO writer (id) VALUES (:id)"
+    assert call.args[1] == records
+    connection.begin.assert_not_called()
+    assert sink.events[0].rows == 2
+
+
+async def test_sqlalchemy_transaction_copy_out(sqlalchemy_transaction):
+    async def partitions(chunk_size):
+        yield [{"id": 1}, {"id": 2}]
+
+    result = mock.Mock()
+    result.mappings.return_value.partitions = partitions
+    sqlalchemy_transaction.connection.stream.return_value = result
+
+    chunks = [x async for x in sqlalchemy_transaction.copy_out(select(writer))]
+
+    assert chunks == [[{"id": 1}, {"id": 2}]]
+    sqlalchemy_transaction.connection.begin_nested.assert_not_called()
+
+
+async def test_sqlalchemy_database_copy_uses_transaction(sqlalchemy_transaction):
+    db = SQLAlchemyAsyncSQLDatabase("user:password@localhost/db")
+    modes = []
+
+    @asynccontextmanager
+    async def transaction(readonly=False):
+        modes.append(readonly)
+        yield sqlalchemy_transaction
+
+    with (
+        mock.patch.object(db, "transaction", transaction),
+        mock.patch.object(sqlalchemy_transaction, "stream") as stream_m,
+    ):
+        stream_m.return_value.__aiter__.return_value = [[{"id": 1}]]
+        assert await db.copy_in(writer, [{"id": 1}]) == 1
+        assert [x async for x in db.copy_out(select(writer))] == [[{"id": 1}]]
+
+    assert modes == [False, True]
+    await db.dispose()
+
+
+def copy_of_ids(*ids):
+    # one field of 4 bytes per row
+    rows = b"".join(struct.pack(">hii", 1, 4, x) for x in ids)
+    return SIGNATURE + struct.pack(">ii", 0, 0) + rows + struct.pack(">h", -1)
+
+
+async def test_asyncpg_transaction_copy_out(sink):
+    data = copy_of_ids(1, 2, 3)
+
+    async def copy_from_query(sql, *args, output, format):
+        assert sql.startswith("SELECT writer.id")
+        assert args == (1,)
+        assert format == "binary"
+        for i in range(0, len(data), 7):
+            await output(data[i : i + 7])
+
+    connection = mock.AsyncMock()
+    connection.copy_from_query = copy_from_query
+    transaction = AsyncpgSQLTransaction(
+        connection, instrumentation=Instrumentation([sink])
+    )
+
+    chunks = [
+        x async for x in transaction.copy_out(select(writer).where(writer.c.id > 1))
+    ]
+
+    assert [x for chunk in chunks for x in chunk] == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert sink.events[0].rows == 3
+    assert sink.events[0].sql.startswith("COPY (SELECT")
+
+
+async def test_asyncpg_transaction_copy_out_error(sink):
+    async def copy_from_query(sql, *args, output, format):
+        await output(copy_of_ids(1)[:-2])
+        raise RuntimeError()
+
+    connection = mock.AsyncMock()
+    connection.copy_from_query = copy_from_query
+    transaction = AsyncpgSQLTransaction(connection)
+
+    with pytest.raises(RuntimeError):
+        async for _ in transaction.copy_out(select(writer)):
+            pass
+
+
+async def test_asyncpg_transaction_copy_in(sink):
+    connection = mock.AsyncMock()
+    connection.copy_records_to_table.return_value = "COPY 2"
+    transaction = AsyncpgSQLTransaction(
+        connection, instrumentation=Instrumentation([sink])
+    )
+
+    assert await transaction.copy_in(writer, [{"id": 1}, {"id": 2}]) == 2
+
+    connection.copy_records_to_table.assert_called_once_with(
+        "writer", records=[(1,), (2,)], columns=["id"], schema_name=None
+    )
+    assert sink.events[0].rows == 2
+
+
+async def test_asyncpg_transaction_copy_in_unique_violation():
+    connection = mock.AsyncMock()
+    connection.copy_records_to_table.side_effect = UniqueViolationError("duplicate")
+    connection.copy_records_to_table.side_effect.detail = "Key (id)=(1) already exists."
+    transaction = AsyncpgSQLTransaction(connection)
+
+    with pytest.raises(AlreadyExists):
+        await transaction.copy_in(writer, [{"id": 1}, {"id": 1}])
@@ -1,29 +1,45 @@
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from enum import Enum as PyEnum
-from typing import Any, AsyncIterator
+from typing import Any, AsyncIterator, Sequence
 from unittest import mock
+from uuid import uuid4
 
 import pytest
 from sqlalchemy import (
     Column,
+    Computed,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     MetaData,
     Table,
     Text,
+    UniqueConstraint,
+    Uuid,
+    text,
 )
 from sqlalchemy.dialects import postgresql
-from sqlalchemy.sql import Executable
+from sqlalchemy.sql import Executable, Select
 
+from src.core.domain.context import Tenant, ctx
 from src.core.domain.exceptions import Conflict, DoesNotExist
+from src.core.gateway.sql.relation import OneToMany
+from src.core.gateway.sql.sql_builder import SQLBuilder
 from src.core.gateway.sql.sql_gateway import SQLGateway
 from src.core.gateway.sql.sql_provider import SQLProvider
-from src.core.repository.base.filter import Filter
+from src.core.repository.base.filter import (
+    ComparisonFilter,
+    ComparisonOperator,
+    Filter,
+    TextSearchFilter,
+)
+from src.core.repository.base.gateway import Gateway
 from src.core.repository.base.mapper import Mapper
-from src.core.repository.base.pagination import PageOptions
+from src.core.repository.base.pagination import Cursor, PageOptions, encode_cursor
+from src.core.tracing import Tracer
 
 DIALECT = postgresql.dialect()
 
@@ -31,6 +47,7 @@ DIALECT = postgresql.dialect()
 class FakeSQLDatabase(SQLProvider):
     def __init__(self):
         self.queries: list[list[Executable]] = []
+        self.copied: list[tuple[str, list[dict[str, Any]]]] = []
         self.result = mock.Mock(return_value=[])
 
     async def execute(
@@ -39,8 +56,20 @@ class FakeSQLDatabase(SQLProvider):
         self.queries.append([query])
         return self.result()
 
+    async def copy_in(self, table: Table, records: Sequence[dict[str, Any]]) -> int:
+        self.copied.append((table.name, list(records)))
+        return len(records)
+
+    async def copy_out(
+        self, query: Select, _: dict[str, Any] | None = None
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        self.queries.append([query])
+        yield self.result()
+
     @asynccontextmanager
-    async def transaction(self) -> AsyncIterator["SQLProvider"]:  # type: ignore
+    async def transaction(  # type: ignore
+        self, readonly: bool = False
+    ) -> AsyncIterator["SQLProvider"]:
         x = FakeSQLTransaction(result=self.result)
         self.queries.append(x.queries)
         yield x
@@ -57,6 +86,14 @@ class FakeSQLTransaction(SQLProvider):
         self.queries.append(query)
         return self.result()
 
+    async def stream(
+        self, query: Executable, chunk_size: int, _: dict[str, Any] | None = None
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        self.queries.append(query)
+        rows = self.result()
+        for i in range(0, len(rows), chunk_size):
+            yield rows[i : i + chunk_size]
+
 
 def assert_query_equal(q: Executable, expected: str, literal_binds: bool = True):
     """There are two ways of 'binding' parameters (for testing!):
@@ -109,6 +146,41 @@ book = Table(
 )
 
 
+posting = Table(
+    "posting",
+    MetaData(),
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("source", Text),
+    Column("external_id", Text),
+    Column("url", Text),
+    Column("title", Text, nullable=False),
+    Column("status", Text, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    UniqueConstraint("source", "external_id", name="uq_posting_source_external_id"),
+    Index(
+        "uq_posting_url",
+        "url",
+        unique=True,
+        postgresql_where=text("url IS NOT NULL"),
+    ),
+    Index("ix_posting_title", "title"),
+)
+
+
+article = Table(
+    "article",
+    MetaData(),
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("body", Text, nullable=False),
+    Column(
+        "search_vector",
+        postgresql.TSVECTOR,
+        Computed("to_tsvector('english', body)", persisted=True),
+        info={"filter_only": True},
+    ),
+)
+
+
 class BookMapper(Mapper):
     async def to_external(self, internal):
         return {
@@ -131,6 +203,28 @@ class TstRelatedSQLGateway(SQLGateway, table=book):
     mapper = BookMapper()
 
 
+class TstArticleSQLGateway(SQLGateway, table=article):
+    pass
+
+
+class TstPostingSQLGateway(SQLGateway, table=posting):
+    pass
+
+
+class TstAuthorSQLGateway(
+    SQLGateway,
+    table=author,
+    relations=[OneToMany("books", TstRelatedSQLGateway, "author_id")],
+):
+    pass
+
+
+BOOKS_SUBQUERY = (
+    "(SELECT coalesce(json_agg(books ORDER BY books.id), '[]') AS coalesce_1 "
+    "FROM book AS books WHERE books.author_id = author.id) AS books"
+)
+
+
 @pytest.fixture
 def sql_gateway():
     return TstSQLGateway(FakeSQLDatabase())
@@ -141,6 +235,21 @@ def related_sql_gateway():
     return TstRelatedSQLGateway(FakeSQLDatabase())
 
 
+@pytest.fixture
+def author_sql_gateway():
+    return TstAuthorSQLGateway(FakeSQLDatabase())
+
+
+@pytest.fixture
+def posting_sql_gateway():
+    return TstPostingSQLGateway(FakeSQLDatabase())
+
+
+@pytest.fixture
+def article_sql_gateway():
+    return TstArticleSQLGateway(FakeSQLDatabase())
+
+
 @pytest.mark.parametrize(
     "filters,sql",
     [
@@ -211,6 +320,164 @@ async def test_filter_with_pagination_and_filter(sql_gateway):
     )
 
 
+@pytest.mark.parametrize(
+    "page_options,sql",
+    [
+        (
+            PageOptions(limit=5, cursor=encode_cursor(Cursor("id", 3, 3))),
+            " AND author.id > 3 ORDER BY author.id ASC LIMIT 5",
+        ),
+        (
+            PageOptions(
+                limit=5, ascending=False, cursor=encode_cursor(Cursor("id", 3, 3))
+            ),
+            " AND author.id < 3 ORDER BY author.id DESC LIMIT 5",
+        ),
+        (
+            PageOptions(
+                limit=5,
+                order_by="updated_at",
+                cursor=encode_cursor(
+                    Cursor("updated_at", datetime(2020, 1, 1, tzinfo=timezone.utc), 3)
+                ),
+            ),
+            (
+                " AND (author.updated_at, author.id) > ('2020-01-01 00:00:00+00:00', 3)"
+                " ORDER BY author.updated_at ASC, author.id ASC LIMIT 5"
+            ),
+        ),
+        (
+            PageOptions(
+                limit=5,
+                order_by="name",
+                ascending=False,
+                cursor=encode_cursor(Cursor("name", "foo", 3)),
+            ),
+            (
+                " AND (author.name, author.id) < ('foo', 3)"
+                " ORDER BY author.name DESC, author.id DESC LIMIT 5"
+            ),
+        ),
+    ],
+)
+async def test_filter_with_cursor(sql_gateway, page_options, sql):
+    await sql_gateway.filter([], params=page_options)
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        f"SELECT {ALL_FIELDS} FROM author WHERE true{sql}",
+    )
+
+
+async def test_filter_with_total(sql_gateway):
+    sql_gateway.provider.result.return_value = [
+        {"id": 2, "name": "foo", "_total": 7},
+        {"id": 3, "name": "bar", "_total": 7},
+    ]
+    actual = await sql_gateway.filter_with_total([], PageOptions(limit=2))
+    assert actual == ([{"id": 2, "name": "foo"}, {"id": 3, "name": "bar"}], 7)
+    assert len(sql_gateway.provider.queries) == 1
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        (
+            f"SELECT {ALL_FIELDS}, count(*) OVER () AS _total FROM author "
+            "WHERE true ORDER BY author.id ASC LIMIT 2 OFFSET 0"
+        ),
+    )
+
+
+@pytest.mark.parametrize("offset,total,queries", [(0, 0, 1), (10, 5, 2)])
+async def test_filter_with_total_empty(sql_gateway, offset, total, queries):
+    sql_gateway.provider.result.side_effect = [[], [{"count": 5}]]
+    actual = await sql_gateway.filter_with_total(
+        [], PageOptions(limit=2, offset=offset)
+    )
+    assert actual == ([], total)
+    assert len(sql_gateway.provider.queries) == queries
+
+
+async def test_filter_with_total_cursor(sql_gateway):
+    sql_gateway.provider.result.side_effect = [[{"id": 4}], [{"count": 5}]]
+    actual = await sql_gateway.filter_with_total(
+        [], PageOptions(limit=2, cursor=encode_cursor(Cursor("id", 3, 3)))
+    )
+    assert actual == ([{"id": 4}], 5)
+    # a plain page query and a separate count
+    assert len(sql_gateway.provider.queries) == 2
+
+
+@pytest.mark.parametrize(
+    "fields,columns",
+    [
+        (["name"], "author.id, author.name"),
+        (["name", "id"], "author.id, author.name"),
+        ([], "author.id"),
+    ],
+)
+async def test_filter_with_fields(sql_gateway, fields, columns):
+    sql_gateway.provider.result.return_value = [{"id": 2, "name": "foo"}]
+    actual = await sql_gateway.filter([], params=PageOptions(limit=5, fields=fields))
+    assert actual == [{"id": 2, "name": "foo"} if "name" in fields else {"id": 2}]
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        f"SELECT {columns} FROM author WHERE true "
+        "ORDER BY author.id ASC LIMIT 5 OFFSET 0",
+    )
+
+
+async def test_filter_with_fields_includes_order_by(sql_gateway):
+    await sql_gateway.filter_with_total(
+        [], PageOptions(limit=5, order_by="updated_at", fields=["name"])
+    )
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        "SELECT author.id, author.name, author.updated_at, "
+        "count(*) OVER () AS _total FROM author WHERE true "
+        "ORDER BY author.updated_at ASC, author.id ASC LIMIT 5 OFFSET 0",
+    )
+
+
+async def test_filter_with_unknown_field(sql_gateway):
+    with pytest.raises(ValueError):
+        await sql_gateway.filter([], params=PageOptions(fields=["nonexistent"]))
+
+
+@pytest.mark.parametrize(
+    "value,ascending,sql",
+    [
+        (
+            "one",
+            True,
+            "((book.book_type, book.id) > ('one', 3) OR book.book_type IS NULL)",
+        ),
+        (None, True, "book.book_type IS NULL AND book.id > 3"),
+        (
+            None,
+            False,
+            "(book.book_type IS NULL AND book.id < 3 OR book.book_type IS NOT NULL)",
+        ),
+    ],
+)
+async def test_filter_with_cursor_nullable(related_sql_gateway, value, ascending, sql):
+    cursor = encode_cursor(Cursor("book_type", value, 3))
+    await related_sql_gateway.filter(
+        [],
+        params=PageOptions(
+            limit=5, order_by="book_type", ascending=ascending, cursor=cursor
+        ),
+    )
+    direction = "ASC" if ascending else "DESC"
+    assert_query_equal(
+        related_sql_gateway.provider.queries[0][0],
+        f"SELECT {BOOK_FIELDS} FROM book WHERE true AND {sql} "
+        f"ORDER BY book.book_type {direction}, book.id {direction} LIMIT 5",
+    )
+
+
+async def test_filter_with_invalid_cursor(sql_gateway):
+    with pytest.raises(ValueError):
+        await sql_gateway.filter([], params=PageOptions(cursor="garbage"))
+
+
 @pytest.mark.parametrize(
     "filters,sql",
     [
@@ -346,6 +613,61 @@ async def test_update_if_unmodified_since_conflict(exists_m, sql_gateway):
     exists_m.assert_awaited_once_with([Filter(field="id", values=[2])])
 
 
+@pytest.mark.parametrize(
+    "if_unmodified_since,sql",
+    [
+        (None, "SET name='bar', updated_at=now() WHERE author.id = 2"),
+        (
+            datetime(2010, 1, 1, tzinfo=timezone.utc),
+            (
+                "SET name='bar', updated_at=now() WHERE author.id = 2 "
+                "AND author.updated_at = '2010-01-01 00:00:00+00:00'"
+            ),
+        ),
+    ],
+)
+async def test_patch(sql_gateway, if_unmodified_since, sql):
+    records = [{"id": 2, "name": "bar"}]
+    sql_gateway.provider.result.return_value = records
+    actual = await sql_gateway.patch(2, {"id": 2, "name": "bar"}, if_unmodified_since)
+    assert actual == records[0]
+    assert len(sql_gateway.provider.queries) == 1
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        f"UPDATE author {sql} RETURNING {ALL_FIELDS}",
+    )
+
+
+async def test_patch_updated_at(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"id": 2}]
+    await sql_gateway.patch(
+        2, {"updated_at": datetime(2010, 1, 1, tzinfo=timezone.utc)}
+    )
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        "UPDATE author SET updated_at='2010-01-01 00:00:00+00:00' "
+        f"WHERE author.id = 2 RETURNING {ALL_FIELDS}",
+    )
+
+
+async def test_patch_does_not_exist(sql_gateway):
+    sql_gateway.provider.result.return_value = []
+    with pytest.raises(DoesNotExist):
+        await sql_gateway.patch(2, {"name": "bar"})
+    assert len(sql_gateway.provider.queries) == 1
+
+
+@mock.patch.object(SQLGateway, "exists")
+async def test_patch_if_unmodified_since_conflict(exists_m, sql_gateway):
+    exists_m.return_value = True
+    sql_gateway.provider.result.return_value = []
+    with pytest.raises(Conflict):
+        await sql_gateway.patch(
+            2, {"name": "bar"}, datetime(2010, 1, 1, tzinfo=timezone.utc)
+        )
+    exists_m.assert_awaited_once_with([Filter(field="id", values=[2])])
+
+
 async def test_remove(sql_gateway):
     sql_gateway.provider.result.return_value = [{"id": 2}]
     assert (await sql_gateway.remove(2)) is True
@@ -366,6 +688,59 @@ async def test_remove_does_not_exist(sql_gateway):
     )
 
 
+async def test_update_where(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"id": 2}, {"id": 3}]
+    actual = await sql_gateway.update_where(
+        [Filter(field="name", values=["foo"])], {"id": 4, "name": "bar"}
+    )
+    assert actual == [2, 3]
+    assert len(sql_gateway.provider.queries) == 1
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        "UPDATE author SET name='bar', updated_at=now() "
+        "WHERE author.name = 'foo' RETURNING author.id",
+    )
+
+
+async def test_update_where_related(author_sql_gateway):
+    author_sql_gateway.provider.result.return_value = []
+    with mock.patch.object(Gateway, "update_where") as update_where_m:
+        await author_sql_gateway.update_where([], {"name": "bar"})
+    update_where_m.assert_awaited_once_with([], {"name": "bar"})
+
+
+async def test_remove_where(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"id": 2}]
+    assert await sql_gateway.remove_where([Filter(field="name", values=["foo"])]) == [2]
+    assert len(sql_gateway.provider.queries) == 1
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        "DELETE FROM author WHERE author.name = 'foo' RETURNING author.id",
+    )
+
+
+def test_update_where_multitenant():
+    tenant_author = Table(
+        "tenant_author",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("name", Text),
+        Column("tenant", Uuid),
+    )
+    ctx.tenant = Tenant(id=uuid4(), name="a")
+    try:
+        builder = SQLBuilder(tenant_author, multitenant=True)
+        update = str(builder.update_where([], {"name": "a", "tenant": uuid4()}))
+        delete = str(builder.delete_where([]))
+    finally:
+        ctx.tenant = None
+
+    # the tenant is kept, and only its rows are changed
+    assert "SET name=:name WHERE" in update
+    assert "tenant_author.tenant = :tenant_1" in update
+    assert "tenant_author.tenant = :tenant_1" in delete
+
+
 async def test_upsert(sql_gateway):
     record = {"id": 2, "name": "foo"}
     sql_gateway.provider.result.return_value = [record]
@@ -391,6 +766,142 @@ async def test_upsert_no_id(add_m, sql_gateway):
     assert len(sql_gateway.provider.queries) == 0
 
 
+async def test_add_many(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"id": 1}, {"id": 2}]
+    assert await sql_gateway.add_many([{"name": "foo"}, {"name": "bar"}]) == [
+        {"id": 1},
+        {"id": 2},
+    ]
+    # one transaction with a single multi-row INSERT
+    assert len(sql_gateway.provider.queries) == 1
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        f"INSERT INTO author (name) VALUES ('foo'), ('bar') RETURNING {ALL_FIELDS}",
+    )
+
+
+async def test_add_many_batches(sql_gateway):
+    sql_gateway.provider.result.side_effect = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    actual = await sql_gateway.add_many(
+        [{"name": "a"}, {"name": "b"}, {"name": "c"}], batch_size=2
+    )
+    assert actual == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert len(sql_gateway.provider.queries[0]) == 2
+
+
+async def test_add_many_empty(sql_gateway):
+    assert await sql_gateway.add_many([]) == []
+    assert len(sql_gateway.provider.queries) == 0
+
+
+async def test_add_many_preserves_order(sql_gateway):
+    sql_gateway.provider.result.return_value = [
+        {"id": 2, "name": "b"},
+        {"id": 1, "name": "a"},
+    ]
+    actual = await sql_gateway.add_many(
+        [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+    )
+    assert [x["id"] for x in actual] == [1, 2]
+
+
+async def test_upsert_many_same_id(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"id": 2, "name": "c"}, {"id": 1}]
+    actual = await sql_gateway.upsert_many(
+        [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 2, "name": "c"}]
+    )
+    assert actual == [{"id": 1}, {"id": 2, "name": "c"}, {"id": 2, "name": "c"}]
+    assert len(sql_gateway.provider.queries) == 1
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        (
+            "INSERT INTO author (id, name) VALUES (1, 'a'), (2, 'c') "
+            "ON CONFLICT (id) DO UPDATE SET id = excluded.id, name = excluded.name "
+            f"RETURNING {ALL_FIELDS}"
+        ),
+    )
+
+
+async def test_set_related_one_to_many_deleted(related_sql_gateway: SQLGateway):
+    current_books = [{"id": 1, "title": "a", "book_type": "one", "author_id": 2}]
+    # the book was deleted concurrently, so the UPDATE returns nothing
+    related_sql_gateway.provider.result.side_effect = [current_books, []]
+    with pytest.raises(DoesNotExist) as e:
+        await related_sql_gateway._set_related_one_to_many(
+            item={"id": 2, "books": [{"id": 1, "title": "b", "book_type": "one"}]},
+            result={"id": 2},
+            field_name="books",
+            fk_name="author_id",
+        )
+    assert e.value.id == 1
+
+
+async def test_upsert_many(sql_gateway):
+    records = [{"id": 1, "name": "foo"}, {"id": 2, "name": "bar"}]
+    sql_gateway.provider.result.return_value = records
+    assert await sql_gateway.upsert_many(records) == records
+    assert len(sql_gateway.provider.queries) == 1
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        (
+            "INSERT INTO author (id, name) VALUES (1, 'foo'), (2, 'bar') "
+            "ON CONFLICT (id) DO UPDATE SET id = excluded.id, name = excluded.name "
+            f"RETURNING {ALL_FIELDS}"
+        ),
+    )
+
+
+@mock.patch.object(SQLGateway, "add")
+async def test_upsert_many_no_id(add_m, sql_gateway):
+    add_m.return_value = {"id": 5, "name": "foo"}
+    assert await sql_gateway.upsert_many([{"name": "foo"}]) == [add_m.return_value]
+    assert len(sql_gateway.provider.queries) == 0
+
+
+async def test_stream(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"id": 1}, {"id": 2}, {"id": 3}]
+    actual = [
+        x
+        async for x in sql_gateway.stream(
+            [Filter(field="name", values=["foo"])], chunk_size=2
+        )
+    ]
+    assert actual == [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    assert len(sql_gateway.provider.queries) == 1
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        f"SELECT {ALL_FIELDS} FROM author WHERE author.name = 'foo'",
+    )
+
+
+async def test_stream_related(related_sql_gateway):
+    related_sql_gateway.provider.result.return_value = [{"id": 1}, {"id": 2}]
+    with mock.patch.object(TstRelatedSQLGateway, "get_related") as get_related_m:
+        chunks = [x async for x in related_sql_gateway.stream([], chunk_size=1)]
+    assert chunks == [[{"id": 1}], [{"id": 2}]]
+    assert get_related_m.await_count == 2
+
+
+async def test_execute_maps_in_one_batch(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"id": 1}, {"id": 2}]
+    with mock.patch.object(
+        Mapper, "to_internal_many", wraps=sql_gateway.mapper.to_internal_many
+    ) as to_internal_many_m:
+        assert await sql_gateway.filter([]) == [{"id": 1}, {"id": 2}]
+    to_internal_many_m.assert_called_once()
+
+
+async def test_add_many_maps_with_to_external(related_sql_gateway):
+    # BookMapper only implements to_external
+    related_sql_gateway.provider.result.return_value = [{"id": 1}]
+    await related_sql_gateway.add_many([{"title": "x", "author_id": 2, "other": 3}])
+    assert_query_equal(
+        related_sql_gateway.provider.queries[0][0],
+        "INSERT INTO book (title, book_type, author_id) "
+        f"VALUES ('x', NULL, 2) RETURNING {BOOK_FIELDS}",
+    )
+
+
 async def test_get_related_one_to_many(related_sql_gateway: SQLGateway):
     authors = [{"id": 2}, {"id": 3}]
     books = [
@@ -451,9 +962,13 @@ async def test_get_related_one_to_many(related_sql_gateway: SQLGateway):
             [{"id": 3, "title": "x", "book_type": "one", "author_id": 2}],
             [{"id": 3, "title": "a", "book_type": "one", "author_id": 2}],
             [
-                "UPDATE book SET id=3, title='x', book_type='one', "
-                "author_id=2 WHERE book.id = 3 "
-                f"RETURNING {BOOK_FIELDS}"
+                "UPDATE book SET id=CAST(data.id AS INTEGER), "
+                "title=CAST(data.title AS TEXT), "
+                "book_type=CAST(data.book_type AS myenum), "
+                "author_id=CAST(data.author_id AS INTEGER) "
+                "FROM (VALUES (3, 'x', 'one', 2)) "
+                "AS data (id, title, book_type, author_id) "
+                f"WHERE book.id = data.id RETURNING {BOOK_FIELDS}"
             ],
             [[{"id": 3, "title": "x", "book_type": "one", "author_id": 2}]],
         ),
@@ -464,7 +979,7 @@ async def test_get_related_one_to_many(related_sql_gateway: SQLGateway):
             [
                 "INSERT INTO book (title, book_type, author_id) VALUES ('x', 'one', 2) "
                 f"RETURNING {BOOK_FIELDS}",
-                "DELETE FROM book WHERE book.id = 15 RETURNING book.id",
+                "DELETE FROM book WHERE book.id = ANY (ARRAY[15]) RETURNING book.id",
             ],
             [
                 [{"id": 3, "title": "x", "book_type": "one", "author_id": 2}],
@@ -505,6 +1020,180 @@ async def test_set_related_one_to_many(
         assert_query_equal(actual_query, expected_query)
 
 
+async def test_set_related_one_to_many_batched(related_sql_gateway: SQLGateway):
+    current_books = [
+        {"id": i, "title": "a", "book_type": "one", "author_id": 2} for i in range(5)
+    ]
+    books = [
+        {"title": "x", "book_type": "one"},
+        {"id": 0, "title": "a", "book_type": "one"},
+        {"id": 1, "title": "b", "book_type": "one"},
+        {"title": "y", "book_type": "two"},
+        {"id": 2, "title": "c", "book_type": "one"},
+    ]
+    added = [
+        {"id": 5, "title": "x", "book_type": "one", "author_id": 2},
+        {"id": 6, "title": "y", "book_type": "two", "author_id": 2},
+    ]
+    updated = [
+        {"id": 1, "title": "b", "book_type": "one", "author_id": 2},
+        {"id": 2, "title": "c", "book_type": "one", "author_id": 2},
+    ]
+    related_sql_gateway.provider.result.side_effect = [
+        current_books,
+        added,
+        updated[::-1],
+        [{"id": 3}, {"id": 4}],
+    ]
+    result = {"id": 2}
+    await related_sql_gateway._set_related_one_to_many(
+        item={"id": 2, "books": books},
+        result=result,
+        field_name="books",
+        fk_name="author_id",
+    )
+
+    assert result["books"] == [
+        added[0],
+        current_books[0],
+        updated[0],
+        added[1],
+        updated[1],
+    ]
+    queries = related_sql_gateway.provider.queries
+    assert len(queries) == 4
+    assert_query_equal(
+        queries[1][0],
+        "INSERT INTO book (title, book_type, author_id) "
+        f"VALUES ('x', 'one', 2), ('y', 'two', 2) RETURNING {BOOK_FIELDS}",
+    )
+    assert "FROM (VALUES (1, 'b', 'one', 2), (2, 'c', 'one', 2))" in str(
+        queries[2][0].compile(dialect=DIALECT, compile_kwargs={"literal_binds": True})
+    )
+    assert_query_equal(
+        queries[3][0],
+        "DELETE FROM book WHERE book.id = ANY (ARRAY[3, 4]) RETURNING book.id",
+    )
+
+
+async def test_add_many_different_keys(sql_gateway):
+    sql_gateway.provider.result.side_effect = [
+        [{"id": 1, "name": "a"}, {"id": 3, "name": "c"}],
+        [{"id": 2, "name": "b"}],
+    ]
+    actual = await sql_gateway.add_many(
+        [{"name": "a"}, {"name": "b", "updated_at": None}, {"id": None, "name": "c"}]
+    )
+    assert [x["name"] for x in actual] == ["a", "b", "c"]
+    (queries,) = sql_gateway.provider.queries
+    assert len(queries) == 2
+
+
+async def test_get_many(sql_gateway):
+    sql_gateway.provider.result.return_value = [
+        {"id": 3, "name": "c"},
+        {"id": 1, "name": "a"},
+    ]
+    actual = await sql_gateway.get_many([1, 2, 3, 1])
+    assert [x and x["name"] for x in actual] == ["a", None, "c", "a"]
+    (queries,) = sql_gateway.provider.queries
+    assert_query_equal(
+        queries[0],
+        f"SELECT {ALL_FIELDS} FROM author WHERE author.id = ANY (ARRAY[1, 2, 3])",
+    )
+
+
+async def test_get_many_chunks(sql_gateway):
+    sql_gateway.provider.result.side_effect = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    actual = await sql_gateway.get_many([1, 2, 3], chunk_size=2)
+    assert actual == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert len(sql_gateway.provider.queries) == 2
+
+
+async def test_filter_relations(author_sql_gateway):
+    book = {"id": 3, "title": "x", "book_type": "one", "author_id": 2}
+    author_sql_gateway.provider.result.return_value = [
+        {"id": 2, "name": "foo", "updated_at": None, "books": [book]},
+        {"id": 4, "name": "bar", "updated_at": None, "books": []},
+    ]
+    actual = await author_sql_gateway.filter([Filter(field="id", values=[2, 4])])
+    assert [x["books"] for x in actual] == [[book], []]
+
+    # a single query, outside of a transaction
+    (queries,) = author_sql_gateway.provider.queries
+    assert len(queries) == 1
+    assert_query_equal(
+        queries[0],
+        f"SELECT {ALL_FIELDS}, {BOOKS_SUBQUERY} FROM author "
+        "WHERE author.id IN (2, 4)",
+    )
+
+
+async def test_filter_relations_projection(author_sql_gateway):
+    author_sql_gateway.provider.result.return_value = [{"id": 2, "name": "foo"}]
+    actual = await author_sql_gateway.filter([], PageOptions(fields=["name"]))
+    assert actual == [{"id": 2, "name": "foo"}]
+    assert_query_equal(
+        author_sql_gateway.provider.queries[0][0],
+        "SELECT author.id, author.name FROM author WHERE true "
+        "ORDER BY author.id ASC LIMIT 10 OFFSET 0",
+    )
+
+
+async def test_add_relations(author_sql_gateway):
+    book = {"id": 3, "title": "x", "book_type": "one", "author_id": 2}
+    author_sql_gateway.provider.result.side_effect = [
+        [{"id": 2, "name": "foo", "updated_at": None}],
+        [],
+        [book],
+    ]
+    actual = await author_sql_gateway.add(
+        {"name": "foo", "books": [{"id": 3, "title": "x", "book_type": "one"}]}
+    )
+    assert actual == {"id": 2, "name": "foo", "updated_at": None, "books": [book]}
+    (queries,) = author_sql_gateway.provider.queries
+    assert len(queries) == 3  # INSERT author, SELECT books, INSERT books
+
+
+async def test_add_without_relations(author_sql_gateway):
+    author_sql_gateway.provider.result.return_value = [{"id": 2, "name": "foo"}]
+    await author_sql_gateway.add({"name": "foo"})
+    (queries,) = author_sql_gateway.provider.queries
+    assert len(queries) == 1
+
+
+def test_relations_to_multitenant_gateway():
+    tenant_book = Table(
+        "tenant_book",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("author_id", Integer),
+        Column("tenant", Integer),
+    )
+
+    class TenantBookSQLGateway(SQLGateway, table=tenant_book, multitenant=True):
+        pass
+
+    with pytest.raises(ValueError):
+
+        class AuthorSQLGateway(
+            SQLGateway,
+            table=author,
+            relations=[OneToMany("books", TenantBookSQLGateway, "author_id")],
+        ):
+            pass
+
+
+def test_relation_decode():
+    relation = OneToMany("authors", TstSQLGateway, "id")
+    assert relation.decode(
+        [{"id": 1, "updated_at": "2020-01-01T00:00:00+00:00"}, {"updated_at": None}]
+    ) == [
+        {"id": 1, "updated_at": datetime(2020, 1, 1, tzinfo=timezone.utc)},
+        {"updated_at": None},
+    ]
+
+
 async def test_update_transactional(sql_gateway):
     existing = {"id": 2, "name": "foo"}
     expected = {"id": 2, "name": "bar"}
@@ -554,3 +1243,324 @@ async def test_exists(sql_gateway, filters, sql):
         sql_gateway.provider.queries[0][0],
         f"SELECT true AS exists FROM author{sql} LIMIT 1",
     )
+
+
+async def test_filter_records_shape_when_tracing(sql_gateway, monkeypatch):
+    tracer = Tracer(enabled=True)
+    monkeypatch.setattr("src.core.gateway.sql.sql_gateway.tracer", tracer)
+
+    with tracer.span("use case", "manage"):
+        await sql_gateway.filter(
+            [Filter(field="name", values=["foo", "bar"])],
+            PageOptions(order_by="name"),
+        )
+
+    span = next(x for x in tracer.spans if x.name == "use case")
+    assert span.attributes["filter_shape"] == {
+        "table": "author",
+        "filters": [["name", "in"]],
+        "order_by": "name",
+    }
+
+
+TSQUERY = "websearch_to_tsquery(CAST('english' AS REGCONFIG), 'kubernetes -java')"
+
+
+async def test_filter_text_search(article_sql_gateway):
+    await article_sql_gateway.filter(
+        [TextSearchFilter(field="search_vector", values=["kubernetes -java"])]
+    )
+    assert_query_equal(
+        article_sql_gateway.provider.queries[0][0],
+        "SELECT article.id, article.body FROM article "
+        f"WHERE article.search_vector @@ {TSQUERY}",
+    )
+
+
+async def test_filter_text_search_text_column(sql_gateway):
+    await sql_gateway.filter(
+        [TextSearchFilter(field="name", values=["kubernetes -java"])]
+    )
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        f"SELECT {ALL_FIELDS} FROM author WHERE "
+        f"to_tsvector(CAST('english' AS REGCONFIG), author.name) @@ {TSQUERY}",
+    )
+
+
+async def test_filter_text_search_rank(article_sql_gateway):
+    await article_sql_gateway.filter(
+        [TextSearchFilter(field="search_vector", values=["kubernetes -java"])],
+        params=PageOptions(limit=5, rank=True),
+    )
+    assert_query_equal(
+        article_sql_gateway.provider.queries[0][0],
+        "SELECT article.id, article.body FROM article "
+        f"WHERE article.search_vector @@ {TSQUERY} "
+        f"ORDER BY ts_rank(article.search_vector, {TSQUERY}) DESC, "
+        "article.id ASC LIMIT 5 OFFSET 0",
+    )
+
+
+async def test_filter_rank_requires_text_search(article_sql_gateway):
+    with pytest.raises(ValueError, match="requires a TextSearchFilter"):
+        await article_sql_gateway.filter([], params=PageOptions(rank=True))
+
+
+async def test_filter_rank_with_cursor(article_sql_gateway):
+    params = PageOptions(rank=True, cursor=encode_cursor(Cursor("id", 1, 1)))
+    with pytest.raises(ValueError, match="cursor"):
+        await article_sql_gateway.filter(
+            [TextSearchFilter(field="search_vector", values=["kubernetes"])], params
+        )
+
+
+async def test_add_does_not_return_filter_only_columns(article_sql_gateway):
+    article_sql_gateway.provider.result.return_value = [{"id": 1, "body": "foo"}]
+    await article_sql_gateway.add({"body": "foo", "search_vector": "ignored"})
+    assert_query_equal(
+        article_sql_gateway.provider.queries[0][0],
+        "INSERT INTO article (body) VALUES ('foo') "
+        "RETURNING article.id, article.body",
+    )
+
+
+@pytest.mark.parametrize(
+    "operator,value,expected",
+    [
+        (ComparisonOperator.STARTSWITH, "ac", "author.name ILIKE 'ac%%' ESCAPE '/'"),
+        (ComparisonOperator.CONTAINS, "ac", "author.name ILIKE '%%ac%%' ESCAPE '/'"),
+        (
+            ComparisonOperator.STARTSWITH,
+            "5%_/",
+            "author.name ILIKE '5/%%/_//%%' ESCAPE '/'",
+        ),
+        (ComparisonOperator.ILIKE, "a_c%%", "author.name ILIKE 'a_c%%%%'"),
+    ],
+)
+async def test_filter_pattern(sql_gateway, operator, value, expected):
+    await sql_gateway.filter(
+        [ComparisonFilter(field="name", operator=operator, values=[value])]
+    )
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        f"SELECT {ALL_FIELDS} FROM author WHERE {expected}",
+    )
+
+
+async def test_distinct(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"name": "ab"}, {"name": "ac"}]
+    filters = [
+        ComparisonFilter(
+            field="name", operator=ComparisonOperator.STARTSWITH, values=["a"]
+        )
+    ]
+
+    assert await sql_gateway.distinct("name", filters, limit=5) == ["ab", "ac"]
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        "SELECT DISTINCT author.name FROM author "
+        "WHERE author.name ILIKE 'a%%' ESCAPE '/' AND author.name IS NOT NULL "
+        "ORDER BY author.name LIMIT 5",
+    )
+
+
+async def test_distinct_unknown_field(article_sql_gateway):
+    with pytest.raises(ValueError, match="Unknown field"):
+        await article_sql_gateway.distinct("search_vector", [])
+
+
+async def test_facets(related_sql_gateway):
+    related_sql_gateway.provider.result.return_value = [
+        {"book_type": "one", "author_id": None, "_count": 3, "_grouping": 0b01},
+        {"book_type": None, "author_id": 1, "_count": 2, "_grouping": 0b10},
+        {"book_type": None, "author_id": None, "_count": 1, "_grouping": 0b01},
+    ]
+
+    actual = await related_sql_gateway.facets(
+        [Filter(field="title", values=["x"])], ["book_type", "author_id"]
+    )
+
+    assert actual == {"book_type": {"one": 3, None: 1}, "author_id": {1: 2}}
+    assert_query_equal(
+        related_sql_gateway.provider.queries[0][0],
+        "SELECT book.book_type, book.author_id, count(*) AS _count, "
+        "grouping(book.book_type, book.author_id) AS _grouping FROM book "
+        "WHERE book.title = 'x' "
+        "GROUP BY GROUPING SETS((book.book_type), (book.author_id)) "
+        "ORDER BY _count DESC",
+    )
+
+
+async def test_facets_no_fields(related_sql_gateway):
+    assert await related_sql_gateway.facets([], []) == {}
+    assert not related_sql_gateway.provider.queries
+
+
+POSTING_FIELDS = (
+    "posting.id, posting.source, posting.external_id, posting.url, posting.title, "
+    "posting.status, posting.created_at"
+)
+
+
+def test_unique_keys(posting_sql_gateway):
+    assert [(x.name, x.columns) for x in posting_sql_gateway.builder.unique_keys] == [
+        ("uq_posting_source_external_id", ("source", "external_id")),
+        ("uq_posting_url", ("url",)),
+    ]
+
+
+async def test_ingest(posting_sql_gateway):
+    posting_sql_gateway.provider.result.return_value = [{"id": 2}]
+    item = {
+        "id": 1,
+        "url": "x",
+        "title": "a",
+        "status": "new",
+        "created_at": datetime(2020, 1, 1, tzinfo=timezone.utc),
+    }
+
+    assert await posting_sql_gateway.ingest(item, keep=["status"]) == {"id": 2}
+    assert_query_equal(
+        posting_sql_gateway.provider.queries[0][0],
+        "INSERT INTO posting (id, url, title, status, created_at) "
+        "VALUES (1, 'x', 'a', 'new', '2020-01-01 00:00:00+00:00') "
+        "ON CONFLICT (url) WHERE url IS NOT NULL DO UPDATE SET title = excluded.title "
+        f"RETURNING {POSTING_FIELDS}",
+    )
+
+
+async def test_ingest_first_key_with_values(posting_sql_gateway):
+    posting_sql_gateway.provider.result.return_value = [{"id": 1}]
+    item = {"source": "s", "external_id": "e", "url": "x", "title": "a"}
+
+    await posting_sql_gateway.ingest(item)
+
+    assert_query_equal(
+        posting_sql_gateway.provider.queries[0][0],
+        "INSERT INTO posting (source, external_id, url, title) "
+        "VALUES ('s', 'e', 'x', 'a') ON CONFLICT (source, external_id) "
+        "DO UPDATE SET url = excluded.url, title = excluded.title "
+        f"RETURNING {POSTING_FIELDS}",
+    )
+
+
+async def test_ingest_without_key(posting_sql_gateway):
+    posting_sql_gateway.provider.result.return_value = [{"id": 1}]
+
+    await posting_sql_gateway.ingest({"source": "s", "url": None, "title": "a"})
+
+    assert_query_equal(
+        posting_sql_gateway.provider.queries[0][0],
+        "INSERT INTO posting (source, url, title) VALUES ('s', NULL, 'a') "
+        f"RETURNING {POSTING_FIELDS}",
+    )
+
+
+async def test_ingest_nothing_to_update(posting_sql_gateway):
+    posting_sql_gateway.provider.result.return_value = [{"id": 1}]
+
+    await posting_sql_gateway.ingest({"url": "x"})
+
+    assert_query_equal(
+        posting_sql_gateway.provider.queries[0][0],
+        "INSERT INTO posting (url) VALUES ('x') ON CONFLICT (url) "
+        "WHERE url IS NOT NULL DO UPDATE SET url = excluded.url "
+        f"RETURNING {POSTING_FIELDS}",
+    )
+
+
+async def test_ingest_many(posting_sql_gateway):
+    posting_sql_gateway.provider.result.side_effect = [[{"id": 1}], [{"id": 2}]]
+    items = [
+        {"url": "x", "title": "a"},
+        {"url": None, "title": "b"},
+        {"url": "x", "title": "c"},
+    ]
+
+    actual = await posting_sql_gateway.ingest_many(items, keep=["status"])
+
+    assert actual == [{"id": 1}, {"id": 2}]
+    # one transaction: the items without a key, then one upsert per key
+    (queries,) = posting_sql_gateway.provider.queries
+    assert_query_equal(
+        queries[0],
+        "INSERT INTO posting (url, title) VALUES (NULL, 'b') "
+        f"RETURNING {POSTING_FIELDS}",
+    )
+    assert_query_equal(
+        queries[1],
+        "INSERT INTO posting (url, title) VALUES ('x', 'c') ON CONFLICT (url) "
+        "WHERE url IS NOT NULL DO UPDATE SET title = excluded.title "
+        f"RETURNING {POSTING_FIELDS}",
+    )
+
+
+async def test_ingest_many_groups_by_key(posting_sql_gateway):
+    posting_sql_gateway.provider.result.return_value = []
+    items = [
+        {"url": "x", "title": "a"},
+        {"source": "s", "external_id": "e", "title": "b"},
+        {"url": "y", "title": "c"},
+    ]
+
+    await posting_sql_gateway.ingest_many(items, batch_size=1)
+
+    sql = [str(x) for x in posting_sql_gateway.provider.queries[0]]
+    assert len(sql) == 3
+    assert sum("ON CONFLICT (url)" in x for x in sql) == 2
+    assert sum("ON CONFLICT (source, external_id)" in x for x in sql) == 1
+
+
+async def test_ingest_many_empty(posting_sql_gateway):
+    assert await posting_sql_gateway.ingest_many([]) == []
+    assert len(posting_sql_gateway.provider.queries) == 0
+
+
+async def test_copy_in(sql_gateway):
+    items = [{"name": "a", "foo": 1}, {"name": "b"}]
+
+    assert await sql_gateway.copy_in(items) == 2
+    # unknown keys are dropped, and every row has the same columns
+    assert sql_gateway.provider.copied == [("author", [{"name": "a"}, {"name": "b"}])]
+
+
+def test_copy_rows_applies_defaults():
+    counter = Table(
+        "counter",
+        MetaData(),
+        Column("id", Integer, primary_key=True, default=lambda: 7),
+        Column("value", Integer, default=0),
+        Column("label", Text, server_default="x"),
+    )
+
+    actual = SQLBuilder(counter).copy_rows([{"value": 1}, {"id": 2}])
+
+    assert actual == [{"id": 7, "value": 1}, {"id": 2, "value": 0}]
+
+
+async def test_copy_in_empty(sql_gateway):
+    assert await sql_gateway.copy_in([]) == 0
+    assert not sql_gateway.provider.copied
+
+
+async def test_copy_in_related(author_sql_gateway):
+    author_sql_gateway.provider.result.return_value = [{"id": 1, "name": "a"}]
+
+    assert await author_sql_gateway.copy_in([{"name": "a", "books": []}]) == 1
+    # related records are set by add_many, which doesn't COPY
+    assert not author_sql_gateway.provider.copied
+
+
+async def test_copy_out(sql_gateway):
+    sql_gateway.provider.result.return_value = [{"id": 1, "name": "a"}]
+
+    chunks = [
+        x async for x in sql_gateway.copy_out([Filter(field="name", values=["a"])])
+    ]
+
+    assert chunks == [[{"id": 1, "name": "a"}]]
+    assert_query_equal(
+        sql_gateway.provider.queries[0][0],
+        f"SELECT {ALL_FIELDS} FROM author WHERE author.name = 'a'",
+    )
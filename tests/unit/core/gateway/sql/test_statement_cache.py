@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, Text, text
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from src.core.gateway.sql.sql_builder import SQLBuilder
+from src.core.gateway.sql.statement_cache import StatementCache, _compile_uncached
+from src.core.repository.base.filter import ComparisonFilter, ComparisonOperator, Filter
+from src.core.repository.base.pagination import PageOptions
+
+DIALECT = asyncpg_dialect()
+
+author = Table(
+    "author",
+    MetaData(),
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("name", Text, nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+)
+
+builder = SQLBuilder(author)
+ts = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def cache():
+    return StatementCache(DIALECT)
+
+
+QUERY_PAIRS = [
+    (
+        builder.select([Filter(field="name", values=["a"])]),
+        builder.select([Filter(field="name", values=["b"])]),
+    ),
+    (
+        builder.select([Filter(field="id", values=[1, 2])], PageOptions(limit=5)),
+        builder.select(
+            [Filter(field="id", values=[3, 4])], PageOptions(limit=7, offset=3)
+        ),
+    ),
+    (
+        builder.select(
+            [ComparisonFilter(field="id", values=[1], operator=ComparisonOperator.GT)]
+        ),
+        builder.select(
+            [ComparisonFilter(field="id", values=[9], operator=ComparisonOperator.GT)]
+        ),
+    ),
+    (
+        builder.insert({"name": "a", "updated_at": ts}),
+        builder.insert({"name": "b", "updated_at": ts}),
+    ),
+    (builder.upsert({"id": 1, "name": "a"}), builder.upsert({"id": 2, "name": "b"})),
+    (
+        builder.update(1, {"id": 1, "name": "a"}, if_unmodified_since=ts),
+        builder.update(2, {"id": 2, "name": "b"}, if_unmodified_since=ts),
+    ),
+    (builder.delete(1), builder.delete(2)),
+    (builder.delete_many([1]), builder.delete_many([2, 3])),
+    (
+        builder.count([Filter(field="name", values=["a"])]),
+        builder.count([Filter(field="name", values=["b"])]),
+    ),
+    (
+        builder.exists([Filter(field="name", values=["a"])]),
+        builder.exists([Filter(field="name", values=["b"])]),
+    ),
+]
+
+
+@pytest.mark.parametrize("first,second", QUERY_PAIRS)
+def test_compile_same_shape(cache, first, second):
+    assert cache.compile(first) == _compile_uncached(first, DIALECT, None)
+    assert cache.compile(second) == _compile_uncached(second, DIALECT, None)
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+
+def test_compile_expanding_lengths_are_different_shapes(cache):
+    for values in ([1, 2], [1, 2, 3], [4, 5]):
+        query = builder.select([Filter(field="id", values=values)])
+        assert cache.compile(query) == _compile_uncached(query, DIALECT, None)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_compile_bind_params(cache):
+    query = text("UPDATE author SET name='bar' WHERE id=:id RETURNING name")
+    assert cache.compile(query, {"id": 1})[1:] == (1,)
+    assert cache.compile(query, {"id": 2})[1:] == (2,)
+    assert cache.hits == 1
+
+
+def test_lru_eviction():
+    cache = StatementCache(DIALECT, maxsize=1)
+    cache.compile(builder.delete(1))
+    cache.compile(builder.count([]))
+    cache.compile(builder.delete(1))
+    info = cache.info()
+    assert (info.hits, info.misses, info.size) == (0, 3, 1)
+
+
+def test_disabled():
+    cache = StatementCache(DIALECT, maxsize=0)
+    query = builder.delete(1)
+    assert cache.compile(query) == _compile_uncached(query, DIALECT, None)
+    assert len(cache) == 0
+
+
+def test_info_hit_ratio(cache):
+    cache.compile(builder.delete(1))
+    cache.compile(builder.delete(2))
+    assert cache.info().hit_ratio == 0.5
+    cache.clear()
+    assert cache.info().hit_ratio == 0.0
@@ -4,9 +4,15 @@ from uuid import uuid4
 
 import pytest
 
-from src.core.domain.exceptions import AlreadyExists, DoesNotExist
+from src.core.domain.exceptions import AlreadyExists, Conflict, DoesNotExist
 from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
-from src.core.repository.base.filter import Filter
+from src.core.repository.base.filter import (
+    ComparisonFilter,
+    ComparisonOperator,
+    Filter,
+    TextSearchFilter,
+)
+from src.core.repository.base.gateway import Gateway
 from src.core.repository.base.pagination import PageOptions
 
 ids = [uuid4() for i in range(3)]
@@ -55,6 +61,24 @@ async def test_get(in_memory_gateway, id, expected):
     assert actual == expected
 
 
+async def test_get_many(in_memory_gateway):
+    missing = uuid4()
+    actual = await in_memory_gateway.get_many([ids[2], missing, ids[0], ids[2]])
+    assert [x and x["name"] for x in actual] == ["c", None, "a", "c"]
+
+
+async def test_get_many_default(in_memory_gateway):
+    # the default implementation filters on id, in chunks
+    with mock.patch.object(
+        in_memory_gateway, "filter", wraps=in_memory_gateway.filter
+    ) as filter_m:
+        actual = await Gateway.get_many(
+            in_memory_gateway, [ids[2], ids[0], ids[2], ids[1]], chunk_size=2
+        )
+    assert [x["name"] for x in actual] == ["c", "a", "c", "b"]
+    assert filter_m.await_count == 2
+
+
 # Test `add` method
 async def test_add(in_memory_gateway):
     id = uuid4()
@@ -69,6 +93,29 @@ async def test_add_already_exists(in_memory_gateway):
         await in_memory_gateway.add({"id": ids[0], "name": "duplicate"})
 
 
+async def test_add_many(in_memory_gateway):
+    records = [{"id": uuid4(), "name": "d"}, {"id": uuid4(), "name": "e"}]
+    assert await in_memory_gateway.add_many(records) == records
+    assert len(in_memory_gateway.data) == 5
+
+
+@pytest.mark.parametrize("duplicate", [ids[0], "new"])
+async def test_add_many_already_exists(in_memory_gateway, duplicate):
+    records = [{"id": "new", "name": "d"}, {"id": duplicate, "name": "e"}]
+    with pytest.raises(AlreadyExists):
+        await in_memory_gateway.add_many(records)
+    # nothing was added
+    assert len(in_memory_gateway.data) == 3
+
+
+async def test_upsert_many(in_memory_gateway):
+    new_id = uuid4()
+    records = [{"id": ids[0], "name": "x"}, {"id": new_id, "name": "y"}]
+    await in_memory_gateway.upsert_many(records)
+    assert in_memory_gateway.data[ids[0]]["name"] == "x"
+    assert in_memory_gateway.data[new_id]["name"] == "y"
+
+
 # Test `update` method
 async def test_update(in_memory_gateway):
     record = {"id": ids[2], "name": "updated", "updated_at": datetime.now(timezone.utc)}
@@ -81,12 +128,48 @@ async def test_update_does_not_exist(in_memory_gateway):
         await in_memory_gateway.update({"id": uuid4(), "name": "nonexistent"})
 
 
+async def test_patch(in_memory_gateway):
+    actual = await in_memory_gateway.patch(ids[2], {"name": "patched"})
+    assert actual["name"] == "patched"
+    assert actual["updated_at"] > datetime(2020, 1, 3, tzinfo=timezone.utc)
+    assert in_memory_gateway.data[ids[2]] == actual
+
+
+async def test_patch_does_not_exist(in_memory_gateway):
+    with pytest.raises(DoesNotExist):
+        await in_memory_gateway.patch(uuid4(), {"name": "nonexistent"})
+
+
+async def test_patch_conflict(in_memory_gateway):
+    with pytest.raises(Conflict):
+        await in_memory_gateway.patch(
+            ids[2], {"name": "x"}, datetime(2010, 1, 1, tzinfo=timezone.utc)
+        )
+
+
 # Test `remove` method
 @pytest.mark.parametrize("id, expected", [(ids[2], True), (uuid4(), False)])
 async def test_remove(in_memory_gateway, id, expected):
     assert await in_memory_gateway.remove(id) == expected
 
 
+async def test_update_where(in_memory_gateway):
+    actual = await in_memory_gateway.update_where(
+        [Filter(field="name", values=["a", "b"])], {"name": "x"}
+    )
+    assert actual == [ids[0], ids[1]]
+    assert [x["name"] for x in in_memory_gateway.data.values()] == ["x", "x", "c"]
+    assert in_memory_gateway.data[ids[0]]["updated_at"] > datetime(
+        2020, 1, 3, tzinfo=timezone.utc
+    )
+
+
+async def test_remove_where(in_memory_gateway):
+    actual = await in_memory_gateway.remove_where([Filter(field="name", values=["b"])])
+    assert actual == [ids[1]]
+    assert list(in_memory_gateway.data) == [ids[0], ids[2]]
+
+
 # Test `filter` method
 async def test_filter(in_memory_gateway):
     actual = await in_memory_gateway.filter([Filter(field="name", values=["b"])])
@@ -105,6 +188,165 @@ async def test_filter_with_params(in_memory_gateway):
     assert [item["id"] for item in actual] == [ids[0], ids[1]]
 
 
+@pytest.mark.parametrize(
+    "order_by,ascending", [("id", True), ("name", True), ("updated_at", False)]
+)
+async def test_filter_with_cursor(in_memory_gateway, order_by, ascending):
+    params = PageOptions(limit=2, order_by=order_by, ascending=ascending)
+    expected = await in_memory_gateway.filter(
+        [], params=PageOptions(**{**vars(params), "limit": 3})
+    )
+    first = await in_memory_gateway.filter([], params=params)
+    params.cursor = in_memory_gateway.cursor_for(first[-1], params)
+    second = await in_memory_gateway.filter([], params=params)
+    assert first + second == expected
+
+
+async def test_filter_with_cursor_nulls_last(in_memory_gateway):
+    await in_memory_gateway.update({"id": ids[0], "updated_at": None})
+    params = PageOptions(limit=1, order_by="updated_at")
+    seen = []
+    while True:
+        page = await in_memory_gateway.filter([], params=params)
+        if not page:
+            break
+        seen.append(page[0]["id"])
+        params.cursor = in_memory_gateway.cursor_for(page[0], params)
+    assert seen == [ids[1], ids[2], ids[0]]
+
+
+async def test_stream(in_memory_gateway):
+    chunks = [x async for x in in_memory_gateway.stream([], chunk_size=2)]
+    assert [len(x) for x in chunks] == [2, 1]
+    assert {x["id"] for chunk in chunks for x in chunk} == set(ids)
+
+
+async def test_filter_with_fields(in_memory_gateway):
+    params = PageOptions(limit=1, order_by="updated_at", fields=["name"])
+    actual = await in_memory_gateway.filter([], params=params)
+    assert actual == [
+        {
+            "id": ids[0],
+            "name": "a",
+            "updated_at": datetime(2020, 1, 1, tzinfo=timezone.utc),
+        }
+    ]
+
+
+async def test_filter_with_unknown_field(in_memory_gateway):
+    params = PageOptions(limit=1, fields=["nmae"])
+    with pytest.raises(ValueError, match="Unknown field: nmae"):
+        await in_memory_gateway.filter([], params=params)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("kubernetes", [0, 1]),
+        ("Kubernetes -python", [0]),
+        ('"python developer"', [1]),
+        ("java or python", [1, 2]),
+        ("-kubernetes", [2]),
+    ],
+)
+async def test_filter_text_search(query, expected):
+    gateway = InMemoryGateway(
+        [
+            {"id": ids[0], "title": "Go developer", "description": "Kubernetes"},
+            {"id": ids[1], "title": "Python developer", "description": "kubernetes"},
+            {"id": ids[2], "title": "Java developer", "description": None},
+        ]
+    )
+    actual = await gateway.filter(
+        [TextSearchFilter(field="search_vector", values=[query])]
+    )
+    assert {x["id"] for x in actual} == {ids[i] for i in expected}
+
+
+@pytest.mark.parametrize(
+    "operator, value, expected",
+    [
+        (ComparisonOperator.GT, datetime(2020, 1, 1, tzinfo=timezone.utc), [1, 2]),
+        (ComparisonOperator.NE, "acme", [0, 2]),
+        (ComparisonOperator.STARTSWITH, "Ac", [0, 1]),
+        (ComparisonOperator.CONTAINS, "ME c", [0]),
+        (ComparisonOperator.ILIKE, "acme_c%", [0]),
+        (ComparisonOperator.ILIKE, "100\\%", [2]),
+    ],
+)
+async def test_filter_comparison(operator, value, expected):
+    gateway = InMemoryGateway(
+        [
+            {"id": ids[0], "name": "Acme corp", "updated_at": None},
+            {
+                "id": ids[1],
+                "name": "acme",
+                "updated_at": datetime(2020, 1, 2, tzinfo=timezone.utc),
+            },
+            {
+                "id": ids[2],
+                "name": "100%",
+                "updated_at": datetime(2020, 1, 3, tzinfo=timezone.utc),
+            },
+        ]
+    )
+    field = "updated_at" if isinstance(value, datetime) else "name"
+    actual = await gateway.filter(
+        [ComparisonFilter(field=field, operator=operator, values=[value])]
+    )
+    assert {x["id"] for x in actual} == {ids[i] for i in expected}
+
+
+# Test `distinct` method
+async def test_distinct(in_memory_gateway):
+    await in_memory_gateway.add({"id": uuid4(), "name": "a"})
+    await in_memory_gateway.add({"id": uuid4(), "name": None})
+
+    assert await in_memory_gateway.distinct("name", []) == ["a", "b", "c"]
+    assert await in_memory_gateway.distinct("name", [], limit=2) == ["a", "b"]
+
+
+# Test `ingest` method
+async def test_ingest():
+    gateway = InMemoryGateway(
+        [{"id": ids[0], "url": "x", "title": "a", "status": "applied"}],
+        unique_keys=[("source", "external_id"), ("url",)],
+    )
+
+    updated = await gateway.ingest(
+        {"id": ids[1], "url": "x", "title": "b", "status": "new"}, keep=["status"]
+    )
+    added = await gateway.ingest({"id": ids[2], "url": None, "title": "c"})
+
+    assert updated == {"id": ids[0], "url": "x", "title": "b", "status": "applied"}
+    assert added["id"] == ids[2]
+    assert len(gateway.data) == 2
+
+
+async def test_ingest_not_implemented():
+    with pytest.raises(NotImplementedError):
+        await Gateway.ingest(InMemoryGateway([]), {"id": 1})
+
+
+# Test `facets` method
+async def test_facets(in_memory_gateway):
+    await in_memory_gateway.add({"id": uuid4(), "name": "b", "updated_at": None})
+
+    actual = await in_memory_gateway.facets(
+        [Filter(field="name", values=["a", "b"])], ["name", "updated_at"]
+    )
+
+    assert actual == {
+        "name": {"b": 2, "a": 1},
+        "updated_at": {
+            datetime(2020, 1, 1, tzinfo=timezone.utc): 1,
+            datetime(2020, 1, 2, tzinfo=timezone.utc): 1,
+            None: 1,
+        },
+    }
+    assert list(actual["name"]) == ["b", "a"]
+
+
 # Test `count` method
 async def test_count(in_memory_gateway):
     actual = await in_memory_gateway.count([Filter(field="name", values=["a"])])
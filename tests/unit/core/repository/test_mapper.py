@@ -0,0 +1,40 @@
+from types import MappingProxyType
+
+from src.core.repository.base.mapper import Mapper
+
+
+class UpperMapper(Mapper):
+    """Only implements the per-item (async) API"""
+
+    async def to_internal(self, external):
+        return {"name": external["name"].upper()}
+
+    async def to_external(self, internal):
+        return {"name": internal["name"].lower()}
+
+
+class BatchUpperMapper(UpperMapper):
+    def to_internal_many(self, externals):
+        return [{"name": x["name"].upper(), "batched": True} for x in externals]
+
+
+async def test_map_internal_identity():
+    rows = [MappingProxyType({"id": 1})]
+    actual = await Mapper().map_internal(rows)
+    assert actual == [{"id": 1}]
+    assert isinstance(actual[0], dict)
+
+
+async def test_map_external_identity():
+    assert await Mapper().map_external([{"id": 1}]) == [{"id": 1}]
+
+
+async def test_map_falls_back_to_per_item():
+    mapper = UpperMapper()
+    assert await mapper.map_internal([{"name": "a"}]) == [{"name": "A"}]
+    assert await mapper.map_external([{"name": "A"}]) == [{"name": "a"}]
+
+
+async def test_map_internal_batched():
+    actual = await BatchUpperMapper().map_internal([{"name": "a"}])
+    assert actual == [{"name": "A", "batched": True}]
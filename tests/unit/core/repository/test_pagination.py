@@ -1,8 +1,15 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
 
 import pytest
 
-from src.core.repository.base.pagination import Page, PageOptions
+from src.core.repository.base.pagination import (
+    Cursor,
+    Page,
+    PageOptions,
+    decode_cursor,
+    encode_cursor,
+)
 
 
 # Test PageOptions
@@ -76,3 +83,33 @@ def test_page_options_cursor():
     new_cursor = now + timedelta(days=1)
     options.cursor = new_cursor
     assert options.cursor == new_cursor
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        Cursor("id", 5, 5),
+        Cursor("created_at", datetime(2023, 1, 1, 12, tzinfo=timezone.utc), uuid4()),
+        Cursor("date_applied", date(2023, 1, 1), uuid4()),
+        Cursor("updated_at", None, uuid4()),
+        Cursor("title", "foo", uuid4()),
+    ],
+)
+def test_cursor_roundtrip(cursor):
+    encoded = encode_cursor(cursor)
+
+    assert isinstance(encoded, str)
+    assert decode_cursor(encoded, cursor.order_by) == cursor
+
+
+@pytest.mark.parametrize(
+    "encoded", ["", "garbage", encode_cursor(Cursor("id", 1, 1))[:-2]]
+)
+def test_decode_cursor_invalid(encoded):
+    with pytest.raises(ValueError):
+        decode_cursor(encoded)
+
+
+def test_decode_cursor_order_by_mismatch():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(Cursor("id", 1, 1)), order_by="name")
@@ -1,10 +1,11 @@
+from enum import Enum
 from typing import List
 from unittest import mock
 from uuid import uuid4
 
 import pytest
 
-from src.core.domain.exceptions import DoesNotExist
+from src.core.domain.exceptions import AlreadyExists, DoesNotExist
 from src.core.domain.root_entity import RootEntity
 from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
 from src.core.repository.base.filter import Filter
@@ -55,11 +56,108 @@ async def test_get_does_not_exist(user_repository):
         await user_repository.get(uuid4())
 
 
+async def test_patch(user_repository: UserRepository, users):
+    actual = await user_repository.patch(users[0].id, {"id": users[0].id, "name": "x"})
+    assert actual.name == "x"
+    assert actual.created_at == users[0].created_at
+    assert actual.updated_at > users[0].updated_at
+
+
+@pytest.mark.parametrize(
+    "values", [{"name": 2}, {"id": uuid4()}, {"created_at": "2020-01-01"}]
+)
+async def test_patch_validates(user_repository: UserRepository, users, values):
+    with pytest.raises(ValueError):
+        await user_repository.patch(users[0].id, values)
+
+
+@mock.patch.object(InMemoryGateway, "patch")
+async def test_patch_only_given_fields(patch_m, user_repository, users):
+    patch_m.return_value = users[0].to_dict()
+    await user_repository.patch(users[0].id, {"name": "x", "unknown": 1})
+    patch_m.assert_awaited_once_with(users[0].id, {"name": "x"}, None)
+
+
+async def test_patch_does_not_exist(user_repository: UserRepository):
+    with pytest.raises(DoesNotExist):
+        await user_repository.patch(uuid4(), {"name": "x"})
+
+
+async def test_update_where(user_repository: UserRepository, users):
+    actual = await user_repository.update_where(
+        [Filter(field="name", values=["a", "c"])], {"name": "x"}
+    )
+    assert actual == [users[0].id, users[2].id]
+    assert (await user_repository.get(users[2].id)).name == "x"
+
+
+@pytest.mark.parametrize(
+    "values", [{"name": 2}, {"id": uuid4()}, {"created_at": "2020-01-01"}]
+)
+async def test_update_where_validates(user_repository: UserRepository, values):
+    with pytest.raises(ValueError):
+        await user_repository.update_where([], values)
+
+
+async def test_remove_where(user_repository: UserRepository, users):
+    actual = await user_repository.remove_where([Filter(field="name", values=["b"])])
+    assert actual == [users[1].id]
+    assert (await user_repository.count([])) == 2
+
+
+async def test_get_many(user_repository: UserRepository, users):
+    actual = await user_repository.get_many([users[2].id, users[0].id, users[2].id])
+    assert actual == [users[2], users[0], users[2]]
+
+
+async def test_get_many_missing(user_repository: UserRepository, users):
+    missing = [uuid4(), uuid4()]
+    with pytest.raises(DoesNotExist) as e:
+        await user_repository.get_many([missing[0], users[0].id, missing[1]])
+    assert e.value.ids == missing
+    assert str(missing[1]) in str(e.value)
+
+
+async def test_get_many_skip_missing(user_repository: UserRepository, users):
+    actual = await user_repository.get_many([uuid4(), users[1].id], skip_missing=True)
+    assert actual == [users[1]]
+
+
+class TrustedUserRepository(Repository[User]):
+    trusted = True
+
+
+async def test_get_validates():
+    repository = UserRepository(InMemoryGateway(data=[{"id": 1, "name": 2}]))
+    with pytest.raises(Exception):
+        await repository.get(1)
+
+
+async def test_get_trusted(users):
+    repository = TrustedUserRepository(
+        InMemoryGateway(data=[user.to_dict() for user in users])
+    )
+    with mock.patch.object(User, "__init__") as init_m:
+        actual = await repository.get(users[0].id)
+        page = await repository.filter([], PageOptions())
+    init_m.assert_not_called()
+    assert actual == users[0]
+    assert sorted(page.items, key=lambda x: x.id) == sorted(users, key=lambda x: x.id)
+
+
+async def test_update_trusted_validates(users):
+    repository = TrustedUserRepository(
+        InMemoryGateway(data=[user.to_dict() for user in users])
+    )
+    with pytest.raises(Exception):
+        await repository.update(users[0].id, {"name": 2})
+
+
 @mock.patch.object(Repository, "filter")
 async def test_all(filter_m, user_repository, page_options):
     filter_m.return_value = Page(total=0, items=[])
     assert await user_repository.all(page_options) is filter_m.return_value
-    filter_m.assert_awaited_once_with([], params=page_options)
+    filter_m.assert_awaited_once_with([], params=page_options, total=True)
 
 
 async def test_add(user_repository: UserRepository):
@@ -122,6 +220,39 @@ async def test_upsert_adds(user_repository: UserRepository):
     assert actual.name == "new_user"
 
 
+async def test_add_many(user_repository: UserRepository, users):
+    actual = await user_repository.add_many([{"name": "d"}, User.create(name="e")])
+    assert [x.name for x in actual] == ["d", "e"]
+    assert all(isinstance(x, User) for x in actual)
+    assert await user_repository.count([]) == 5
+
+
+async def test_add_many_already_exists(user_repository: UserRepository, users):
+    with pytest.raises(AlreadyExists):
+        await user_repository.add_many([User.create(name="d"), users[0]])
+    assert await user_repository.count([]) == 3
+
+
+async def test_upsert_many(user_repository: UserRepository, users):
+    actual = await user_repository.upsert_many(
+        [users[0].update(name="x"), User.create(name="y")]
+    )
+    assert [x.name for x in actual] == ["x", "y"]
+    assert (await user_repository.get(users[0].id)).name == "x"
+
+
+async def test_stream(user_repository: UserRepository, users):
+    chunks = [
+        x
+        async for x in user_repository.stream(
+            [Filter(field="name", values=["a", "c"])], chunk_size=1
+        )
+    ]
+    assert sorted(x.name for chunk in chunks for x in chunk) == ["a", "c"]
+    assert [len(x) for x in chunks] == [1, 1]
+    assert all(isinstance(x, User) for chunk in chunks for x in chunk)
+
+
 @mock.patch.object(InMemoryGateway, "count")
 async def test_filter(count_m, user_repository: UserRepository, users):
     actual = await user_repository.filter([Filter(field="name", values=["b"])])
@@ -144,12 +275,54 @@ async def test_filter_with_pagination(
     assert not count_m.called
 
 
+async def test_filter_next_cursor(user_repository: UserRepository, users):
+    params = PageOptions(limit=2, order_by="name")
+    first = await user_repository.filter([], params)
+    assert [x.name for x in first.items] == ["a", "b"]
+    assert first.total == 3
+    assert first.next_cursor is not None
+
+    params.cursor = first.next_cursor
+    second = await user_repository.filter([], params)
+    assert [x.name for x in second.items] == ["c"]
+    assert second.total == 3
+    assert second.next_cursor is None
+
+
+@mock.patch.object(InMemoryGateway, "count")
+async def test_filter_without_total(count_m, user_repository: UserRepository, users):
+    params = PageOptions(limit=2, order_by="name")
+    first = await user_repository.filter([], params, total=False)
+    assert [x.name for x in first.items] == ["a", "b"]
+    assert first.total is None
+    assert first.has_more is True
+
+    params.cursor = first.next_cursor
+    second = await user_repository.filter([], params, total=False)
+    assert [x.name for x in second.items] == ["c"]
+    assert second.has_more is False
+    assert second.next_cursor is None
+    assert not count_m.called
+
+
+async def test_values(user_repository: UserRepository, users):
+    actual = await user_repository.values(
+        [], ["name"], PageOptions(limit=2, order_by="name")
+    )
+    assert actual.items == [
+        {"id": users[0].id, "name": "a"},
+        {"id": users[1].id, "name": "b"},
+    ]
+    assert actual.total == 3
+    assert actual.next_cursor is not None
+
+
 @mock.patch.object(Repository, "filter")
 async def test_by(filter_m, user_repository: UserRepository, page_options):
     filter_m.return_value = Page(total=0, items=[])
     assert await user_repository.by("name", "b", page_options) is filter_m.return_value
     filter_m.assert_awaited_once_with(
-        [Filter(field="name", values=["b"])], params=page_options
+        [Filter(field="name", values=["b"])], params=page_options, total=True
     )
 
 
@@ -163,3 +336,56 @@ async def test_exists(gateway_exists, user_repository):
 async def test_count(count_m, user_repository):
     count_m.return_value = 1
     assert await user_repository.count([]) == 1
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class Paint(RootEntity):
+    color: Color | None
+
+
+class PaintRepository(Repository[Paint]):
+    pass
+
+
+async def test_facets():
+    # e.g. a gateway without a mapper returns the enum values
+    repository = PaintRepository(
+        InMemoryGateway(
+            [{"id": uuid4(), "color": x} for x in ["red", "blue", "red", None]]
+        )
+    )
+
+    actual = await repository.facets([], ["color"])
+
+    assert actual == {"color": {Color.RED: 2, Color.BLUE: 1, None: 1}}
+
+
+async def test_facets_unknown_field(user_repository):
+    with pytest.raises(ValueError, match="Unknown fields: x"):
+        await user_repository.facets([], ["name", "x"])
+
+
+class Posting(RootEntity):
+    url: str | None
+    status: str = "new"
+
+
+class PostingRepository(Repository[Posting]):
+    pass
+
+
+async def test_ingest():
+    repository = PostingRepository(InMemoryGateway([], unique_keys=[("url",)]))
+    first = await repository.ingest({"url": "x"})
+    await repository.patch(first.id, {"status": "applied"})
+
+    again = await repository.ingest({"url": "x"}, keep=["status"])
+
+    assert again.id == first.id
+    assert again.created_at == first.created_at
+    assert again.status == "applied"
+    assert again.updated_at >= first.updated_at
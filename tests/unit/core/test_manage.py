@@ -0,0 +1,64 @@
+from uuid import uuid4
+
+import pytest
+
+from src.core.domain.root_entity import RootEntity
+from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
+from src.core.manage import Manage
+from src.core.repository.base.filter import Filter
+from src.core.repository.base.repository import Repository
+
+
+class User(RootEntity):
+    name: str
+
+
+class UserRepository(Repository[User]):
+    pass
+
+
+class ManageUser(Manage[User]):
+    pass
+
+
+@pytest.fixture
+def users():
+    return [User.create(id=uuid4(), name=x) for x in "abc"]
+
+
+@pytest.fixture
+def manage_user(users):
+    gateway = InMemoryGateway(data=[x.to_dict() for x in users])
+    return ManageUser(UserRepository(gateway))
+
+
+async def test_update_where(manage_user, users):
+    ids = await manage_user.update_where(
+        [Filter(field="name", values=["a"])], {"name": "x"}
+    )
+
+    assert ids == [users[0].id]
+    assert (await manage_user.retrieve(users[0].id)).name == "x"
+
+
+async def test_update_where_all(manage_user):
+    assert len(await manage_user.update_where([], {"name": "x"}, all=True)) == 3
+
+
+async def test_destroy_where_all(manage_user):
+    assert len(await manage_user.destroy_where([], all=True)) == 3
+    assert await manage_user.count([]) == 0
+
+
+async def test_update_where_without_filters(manage_user, users):
+    with pytest.raises(ValueError):
+        await manage_user.update_where([], {"name": "x"})
+
+    assert (await manage_user.retrieve(users[0].id)).name == "a"
+
+
+async def test_destroy_where_without_filters(manage_user):
+    with pytest.raises(ValueError):
+        await manage_user.destroy_where([])
+
+    assert await manage_user.count([]) == 3
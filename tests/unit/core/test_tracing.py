@@ -0,0 +1,126 @@
+import io
+import json
+from uuid import uuid4
+
+import pytest
+
+from src.core.domain.context import ctx
+from src.core.domain.root_entity import RootEntity
+from src.core.gateway.in_memory.in_memory_gateway import InMemoryGateway
+from src.core.manage import Manage
+from src.core.repository.base.repository import Repository
+from src.core.tracing import Tracer, tracer
+
+
+class User(RootEntity):
+    name: str
+
+
+class UserRepository(Repository[User]):
+    pass
+
+
+class ManageUser(Manage[User]):
+    pass
+
+
+@pytest.fixture
+def local_tracer():
+    return Tracer(enabled=True)
+
+
+@pytest.fixture
+def correlation_id():
+    value = uuid4()
+    ctx.correlation_id = value
+    yield value
+    ctx.correlation_id = None
+
+
+@pytest.fixture
+def enabled_tracer():
+    tracer.enabled = True
+    yield tracer
+    tracer.enabled = False
+    tracer.clear()
+
+
+def test_disabled_tracer_records_nothing():
+    local = Tracer()
+
+    @local.traced("db")
+    def f():
+        return 1
+
+    assert f() == 1
+    assert not local.spans
+
+
+async def test_nested_spans(local_tracer, correlation_id):
+    @local_tracer.traced("db")
+    def query():
+        return [1]
+
+    @local_tracer.traced("repository")
+    async def get():
+        return query()
+
+    assert await get() == [1]
+    inner, outer = local_tracer.spans
+    assert inner.parent_id == outer.id
+    assert outer.parent_id is None
+    assert outer.children_duration == inner.duration
+    assert inner.correlation_id == correlation_id
+    assert local_tracer.breakdown(correlation_id).keys() == {"db", "repository"}
+
+
+def test_span_records_error(local_tracer):
+    @local_tracer.traced("db")
+    def fail():
+        raise KeyError()
+
+    with pytest.raises(KeyError):
+        fail()
+
+    (span,) = local_tracer.spans
+    assert span.error == "KeyError"
+
+
+def test_buffer_is_bounded():
+    local = Tracer(buffer_size=2, enabled=True)
+    for name in ("a", "b", "c"):
+        with local.span(name, "db"):
+            pass
+
+    assert [x.name for x in local.spans] == ["b", "c"]
+
+
+def test_dump_and_export(local_tracer, correlation_id, tmp_path):
+    with local_tracer.span("a", "db"):
+        pass
+    fp = io.StringIO()
+    local_tracer.dump(fp)
+    (line,) = fp.getvalue().splitlines()
+    assert json.loads(line)["correlation_id"] == str(correlation_id)
+
+    path = tmp_path / "trace.jsonl"
+    local_tracer.export(path)
+    local_tracer.export(path)  # nothing left to append
+
+    assert len(path.read_text().splitlines()) == 1
+    assert not local_tracer.spans
+
+
+async def test_use_case_breakdown(enabled_tracer, correlation_id):
+    users = [User.create(name=x) for x in "abc"]
+    manage = ManageUser(UserRepository(InMemoryGateway([x.to_dict() for x in users])))
+
+    await manage.retrieve(users[0].id)
+
+    names = [x.name for x in enabled_tracer.spans]
+    assert names == ["Repository._build", "Repository.get", "Manage.retrieve"]
+    assert enabled_tracer.breakdown(correlation_id).keys() == {
+        "validation",
+        "repository",
+        "manage",
+    }
@@ -0,0 +1,82 @@
+from unittest import mock
+
+import pytest
+from typer.testing import CliRunner
+
+import cli
+from src.application.domain.entity.job import JobStatus
+from src.core.repository.base.filter import Filter
+from src.core.repository.base.pagination import Page
+
+
+@pytest.fixture
+def runner():
+    return CliRunner()
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["update-jobs", "--set-status", "archived"], ["delete-jobs"]],
+)
+def test_bulk_command_without_filters_refuses(runner, args):
+    with mock.patch.object(cli, "manage_job") as manage_m:
+        result = runner.invoke(cli.app, args)
+
+    assert result.exit_code == 1
+    assert "--all" in result.output
+    assert not manage_m.method_calls
+
+
+def test_update_jobs_all(runner):
+    with mock.patch.object(cli, "manage_job") as manage_m:
+        manage_m.update_where = mock.AsyncMock(return_value=[1, 2])
+        result = runner.invoke(
+            cli.app, ["update-jobs", "--set-status", "archived", "--all"]
+        )
+
+    assert result.exit_code == 0
+    assert "Updated 2 jobs." in result.output
+    manage_m.update_where.assert_awaited_once_with(
+        [], {"status": JobStatus.ARCHIVED}, all=True
+    )
+
+
+def test_update_jobs_filtered(runner):
+    with mock.patch.object(cli, "manage_job") as manage_m:
+        manage_m.update_where = mock.AsyncMock(return_value=[])
+        result = runner.invoke(
+            cli.app,
+            ["update-jobs", "--set-status", "archived", "--status", "rejected"],
+        )
+
+    assert result.exit_code == 0
+    manage_m.update_where.assert_awaited_once_with(
+        [Filter(field="status", values=[JobStatus.REJECTED])],
+        {"status": JobStatus.ARCHIVED},
+        all=False,
+    )
+
+
+def test_list_jobs_pages_without_total(runner):
+    pages = [
+        Page(
+            total=None,
+            items=[{"id": 1, "title": "a", "company": "b", "status": "added"}],
+            next_cursor="x",
+        ),
+        Page(
+            total=None,
+            items=[{"id": 2, "title": "c", "company": "d", "status": "added"}],
+        ),
+    ]
+    with mock.patch.object(cli, "manage_job") as manage_m:
+        manage_m.values = mock.AsyncMock(side_effect=pages)
+        result = runner.invoke(cli.app, ["list-jobs"])
+
+    assert result.exit_code == 0
+    assert "Retrieved 2 jobs." in result.output
+    assert [x.kwargs["total"] for x in manage_m.values.await_args_list] == [
+        False,
+        False,
+    ]
+    assert manage_m.values.await_args_list[1].kwargs["params"].cursor == "x"